@@ -38,6 +38,11 @@ class Consulta(models.Model):
         verbose_name="Observações",
         help_text="Observações adicionais sobre a consulta (opcional).",
     )
+    version = models.PositiveIntegerField(
+        default=1,
+        verbose_name="Versão",
+        help_text="Incrementada a cada atualização (controle de concorrência).",
+    )
     created_at = models.DateTimeField(
         auto_now_add=True,
         verbose_name="Criado em",
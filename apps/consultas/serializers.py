@@ -4,23 +4,41 @@ Serializers para o app de Consultas Médicas.
 Decisão técnica: Validação detalhada para garantir integridade dos dados.
 Consultas não podem ser agendadas no passado (exceto em atualizações)
 e o profissional vinculado precisa existir.
+
+As listagens são servidas por ConsultaListValuesSerializer, que monta as
+linhas direto de `.values()`; ConsultaListSerializer só define o formato
+(e o schema OpenAPI) dessas linhas.
+
+O profissional aninhado (`profissional_detail`) só vem com
+`?expand=profissional` (ver core.expand).
 """
 
+from django.db.models import BooleanField, Case, F, Value, When
 from django.utils import timezone
 from rest_framework import serializers
 
+from apps.profissionais.models import Profissional
 from apps.profissionais.serializers import ProfissionalSerializer
+from core.serializers import (
+    ExpandableFieldsMixin,
+    TimedListSerializer,
+    TimedSerializerMixin,
+)
+from core.tracing import span
 from core.utils.sanitization import sanitize_string
+from core.utils.timing import timed_phase
 
 from .models import Consulta
 
 
-class ConsultaSerializer(serializers.ModelSerializer):
+class ConsultaSerializer(
+    ExpandableFieldsMixin, TimedSerializerMixin, serializers.ModelSerializer
+):
     """
     Serializer para CRUD de Consulta.
 
     Inclui validação de data e sanitização de observações.
-    Na leitura, retorna os dados completos do profissional.
+    Com `?expand=profissional`, retorna os dados completos do profissional.
     """
 
     profissional_detail = ProfissionalSerializer(source="profissional", read_only=True)
@@ -33,10 +51,13 @@ class ConsultaSerializer(serializers.ModelSerializer):
             "profissional",
             "profissional_detail",
             "observacoes",
+            "version",
             "created_at",
             "updated_at",
         ]
-        read_only_fields = ["id", "created_at", "updated_at"]
+        read_only_fields = ["id", "version", "created_at", "updated_at"]
+        expandable_fields = {"profissional": "profissional_detail"}
+        list_serializer_class = TimedListSerializer
 
     def validate_data(self, value):
         """Valida que a data da consulta não está no passado."""
@@ -53,6 +74,9 @@ class ConsultaSerializer(serializers.ModelSerializer):
         return value
 
 
+# Só formato e schema: as respostas vêm do ConsultaListValuesSerializer, que
+# deriva daqui os campos e as expansões (`Meta.expandable_fields`, lido
+# também por core.expand).
 class ConsultaListSerializer(serializers.ModelSerializer):
     """
     Serializer simplificado para listagem de consultas.
@@ -78,3 +102,106 @@ class ConsultaListSerializer(serializers.ModelSerializer):
             "is_future",
             "created_at",
         ]
+        expandable_fields = {"profissional": "profissional_detail"}
+
+
+class ConsultaListValuesSerializer:
+    """
+    Listagem de consultas montada a partir de `.values()`.
+
+    Decisão técnica: O ConsultaListSerializer instancia uma Consulta e um
+    Profissional por linha, passa cada valor pelos campos do DRF e avalia
+    a property `is_future` (um `timezone.now()` por linha). Aqui o SELECT
+    traz só as colunas listadas, `is_future` é calculado no SQL contra um
+    único `now`, e cada linha vira um dict diretamente; só as datas passam
+    pelo DateTimeField, para manter o mesmo formato (fuso e sufixo Z) da
+    listagem serializada.
+
+    Com `fields` (sparse fieldsets), o SELECT e as linhas se limitam aos
+    campos pedidos. Com `profissional_detail` (`?expand=profissional`), os
+    profissionais da página vêm de uma única busca em lote pelos ids.
+
+    Uso:
+        rows = ConsultaListValuesSerializer.values(queryset, fields)
+        data = ConsultaListValuesSerializer(page, fields, context=context).data
+    """
+
+    # Campos padrão: os da listagem; os aninhados só com `?expand=`
+    FIELDS = list(ConsultaListSerializer.Meta.fields)
+    EXPANDABLE_FIELDS = ConsultaListSerializer.Meta.expandable_fields
+    EXPANDED_FIELDS = set(EXPANDABLE_FIELDS.values())
+    DATETIME_FIELDS = {"data", "created_at"}
+
+    _datetime = serializers.DateTimeField()
+
+    def __init__(self, rows, fields=None, context=None):
+        self.rows = rows
+        self.fields = self.FIELDS if fields is None else fields
+        self.context = context or {}
+
+    @classmethod
+    def available_fields(cls, expand=()):
+        """Campos da listagem com as expansões pedidas, na ordem da resposta."""
+        return cls.FIELDS + [
+            field for name, field in cls.EXPANDABLE_FIELDS.items() if name in expand
+        ]
+
+    @classmethod
+    def values(cls, queryset, fields=None, now=None):
+        """Queryset de dicts com as colunas da listagem (paginável)."""
+        now = now or timezone.now()
+        expressions = {
+            "profissional_nome": F("profissional__nome_social"),
+            "profissional_profissao": F("profissional__profissao"),
+            "is_future": Case(
+                When(data__gt=now, then=Value(True)),
+                default=Value(False),
+                output_field=BooleanField(),
+            ),
+        }
+        fields = cls.FIELDS if fields is None else fields
+        columns = [
+            name
+            for name in fields
+            if name not in expressions and name not in cls.EXPANDED_FIELDS
+        ]
+        if "profissional_detail" in fields and "profissional" not in columns:
+            columns.append("profissional")
+        return queryset.values(
+            *columns,
+            **{name: expressions[name] for name in fields if name in expressions},
+        )
+
+    def to_representation(self, row, profissionais=None):
+        to_datetime = self._datetime.to_representation
+        representation = {}
+        for name in self.fields:
+            if name == "profissional_detail":
+                representation[name] = profissionais.get(row["profissional"])
+            elif name in self.DATETIME_FIELDS:
+                representation[name] = to_datetime(row[name])
+            else:
+                representation[name] = row[name]
+        return representation
+
+    def _profissionais(self, rows):
+        """Profissionais serializados das linhas, em uma única query."""
+        if "profissional_detail" not in self.fields:
+            return None
+        ids = {row["profissional"] for row in rows}
+        profissionais = list(Profissional.objects.in_bulk(ids).values())
+        # to_representation: a fase `serialize` já está sendo medida em `data`
+        serialized = ProfissionalSerializer(
+            many=True, context=self.context
+        ).to_representation(profissionais)
+        return {item["id"]: item for item in serialized}
+
+    @property
+    def data(self):
+        with (
+            timed_phase(self.context.get("request"), "serialize"),
+            span(f"serialize {type(self).__name__}[]"),
+        ):
+            rows = list(self.rows)
+            profissionais = self._profissionais(rows)
+            return [self.to_representation(row, profissionais) for row in rows]
@@ -22,6 +22,8 @@ from enum import Enum
 
 from decouple import config
 
+from core.tracing import traced
+
 logger = logging.getLogger("apps")
 
 # Configuração da API Assas
@@ -90,6 +92,7 @@ class AssasService:
             "access_token": self.api_key,
         }
 
+    @traced()
     def create_customer(self, name: str, cpf: str, email: str) -> dict:
         """
         Cria um cliente na Assas.
@@ -107,6 +110,7 @@ class AssasService:
             "status": "ACTIVE",
         }
 
+    @traced()
     def create_payment(self, payment_data: PaymentData) -> dict:
         """
         Cria uma cobrança na Assas.
@@ -133,6 +137,7 @@ class AssasService:
             "bankSlipUrl": "https://sandbox.asaas.com/b/mock_boleto",
         }
 
+    @traced()
     def configure_split(self, payment_id: str, splits: list[SplitData]) -> dict:
         """
         Configura split de pagamento.
@@ -161,6 +166,7 @@ class AssasService:
             "status": "CONFIGURED",
         }
 
+    @traced()
     def get_payment_status(self, payment_id: str) -> dict:
         """
         Consulta status de um pagamento.
@@ -177,6 +183,7 @@ class AssasService:
             "confirmedDate": str(date.today()),
         }
 
+    @traced()
     def process_webhook(self, payload: dict) -> dict:
         """
         Processa webhook recebido da Assas.
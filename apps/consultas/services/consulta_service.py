@@ -16,11 +16,14 @@ import logging
 from django.db import transaction
 from django.utils import timezone
 
+from core.concurrency import versioned_delete, versioned_update
+from core.db_router import primary_db
 from core.domain import (
     AgendamentoRetroativoException,
     NotFoundException,
     ValidationException,
 )
+from core.tracing import traced
 
 from ..models import Consulta
 
@@ -37,15 +40,22 @@ class ConsultaService:
     """
 
     @staticmethod
-    def list_consultas(queryset=None):
+    @traced()
+    def list_consultas(queryset=None, with_profissional=True):
         """
         Retorna a lista de consultas com select_related para performance.
+
+        Com `with_profissional=False` (profissional não aninhado na
+        resposta), dispensa o JOIN.
         """
         if queryset is None:
             queryset = Consulta.objects.all()
+        if not with_profissional:
+            return queryset
         return queryset.select_related("profissional")
 
     @staticmethod
+    @traced()
     def get_consulta(consulta_id):
         """
         Busca uma consulta por ID.
@@ -57,6 +67,8 @@ class ConsultaService:
             raise NotFoundException("Consulta", consulta_id)
 
     @staticmethod
+    @traced()
+    @primary_db
     @transaction.atomic
     def agendar_consulta(data):
         """
@@ -82,39 +94,49 @@ class ConsultaService:
         return consulta
 
     @staticmethod
-    @transaction.atomic
+    @traced()
+    @primary_db
+    # Sem transaction.atomic: a escrita é um único UPDATE, já atômico
     def atualizar_consulta(consulta, data):
         """
         Atualiza os dados de uma consulta existente.
 
         Validações de domínio:
         - Se a data mudar, deve ser futura
+        - Grava só as colunas que mudaram, condicionado à versão lida
+          (PreconditionFailedException se outra requisição gravou antes)
         """
         data_consulta = data.get("data")
-        if data_consulta and data_consulta < timezone.now():
+        if (
+            data_consulta
+            and data_consulta != consulta.data
+            and data_consulta < timezone.now()
+        ):
             raise ValidationException(
                 "Não é possível alterar uma consulta para uma data retroativa.",
                 field="data",
             )
 
-        for field, value in data.items():
-            setattr(consulta, field, value)
-        consulta.save()
+        versioned_update(consulta, data)
         logger.info("Serviço: Consulta ID=%d atualizada.", consulta.id)
         return consulta
 
     @staticmethod
+    @traced()
+    @primary_db
     @transaction.atomic
     def cancelar_consulta(consulta):
         """
-        Remove uma consulta do sistema.
+        Remove uma consulta do sistema, condicionado à versão lida
+        (PreconditionFailedException se outra requisição gravou antes).
         """
         consulta_id = consulta.id
-        consulta.delete()
+        versioned_delete(consulta)
         logger.info("Serviço: Consulta ID=%d cancelada.", consulta_id)
         return True
 
     @staticmethod
+    @traced()
     def buscar_por_profissional(profissional_id):
         """
         Busca todas as consultas de um profissional específico.
@@ -11,13 +11,19 @@ Cobertura expandida:
 - Proteção de autenticação (JWT)
 - Testes da camada de serviço isolada
 - Paginação, filtros e ordenação
+- Número de queries da atualização (uma leitura, um UPDATE parcial)
+- Listagem rápida via `.values()` com o mesmo formato da serializada
+- Profissional aninhado opt-in (?expand=profissional) com busca em lote
 """
 
 from datetime import timedelta
+from unittest import mock
 
 from rest_framework_simplejwt.tokens import RefreshToken
 
 from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.utils import timezone
 from rest_framework import status
@@ -27,7 +33,9 @@ from apps.profissionais.models import Profissional
 from core.domain import AgendamentoRetroativoException
 
 from .models import Consulta
+from .serializers import ConsultaListSerializer, ConsultaListValuesSerializer
 from .services.consulta_service import ConsultaService
+from .views import ConsultaViewSet
 
 
 class ConsultaBaseTestCase(APITestCase):
@@ -103,7 +111,8 @@ class ConsultaCreateTests(ConsultaBaseTestCase):
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
         self.assertEqual(response.data["profissional"], self.profissional.pk)
         self.assertIn("id", response.data)
-        self.assertIn("profissional_detail", response.data)
+        # O profissional aninhado é opt-in (?expand=profissional)
+        self.assertNotIn("profissional_detail", response.data)
 
     def test_criar_consulta_sem_data(self):
         """Deve retornar erro quando data não é fornecida."""
@@ -251,7 +260,8 @@ class ConsultaReadTests(ConsultaBaseTestCase):
         response = self.client.get(self.detail_url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data["id"], self.consulta.pk)
-        self.assertIn("profissional_detail", response.data)
+        self.assertEqual(response.data["profissional"], self.profissional.pk)
+        self.assertNotIn("profissional_detail", response.data)
 
     def test_detalhar_consulta_inexistente(self):
         """Deve retornar 404 para consulta inexistente."""
@@ -336,8 +346,8 @@ class ConsultaReadTests(ConsultaBaseTestCase):
         self.assertGreaterEqual(response.data["count"], 1)
 
     def test_detalhe_consulta_inclui_dados_profissional(self):
-        """Detalhe deve incluir dados completos do profissional."""
-        response = self.client.get(self.detail_url)
+        """Com ?expand=profissional, o detalhe inclui o profissional completo."""
+        response = self.client.get(self.detail_url, {"expand": "profissional"})
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         detail = response.data["profissional_detail"]
         self.assertIn("nome_social", detail)
@@ -437,6 +447,42 @@ class ConsultaUpdateTests(ConsultaBaseTestCase):
             response_after.data["updated_at"],
         )
 
+    def _consulta_queries(self, captured):
+        return [
+            query["sql"] for query in captured if "consultas_consulta" in query["sql"]
+        ]
+
+    def test_atualizar_busca_uma_vez_e_grava_so_campos_alterados(self):
+        """PATCH deve fazer um único SELECT e um UPDATE só do campo alterado."""
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.patch(
+                self.detail_url, {"observacoes": "Uma escrita"}, format="json"
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        queries = self._consulta_queries(ctx.captured_queries)
+        selects = [sql for sql in queries if sql.startswith("SELECT")]
+        updates = [sql for sql in queries if sql.startswith("UPDATE")]
+        self.assertEqual(len(selects), 1)
+        self.assertEqual(len(updates), 1)
+        self.assertIn('"observacoes"', updates[0])
+        self.assertNotIn('"data"', updates[0])
+        self.assertNotIn('"profissional_id"', updates[0])
+
+    def test_atualizar_sem_mudancas_nao_grava(self):
+        """PUT com os mesmos valores não deve emitir UPDATE nem mudar a versão."""
+        unchanged = {
+            "data": self.consulta.data.isoformat(),
+            "profissional": self.consulta.profissional.pk,
+            "observacoes": self.consulta.observacoes,
+        }
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.put(self.detail_url, unchanged, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        queries = self._consulta_queries(ctx.captured_queries)
+        self.assertFalse([sql for sql in queries if sql.startswith("UPDATE")])
+        self.consulta.refresh_from_db()
+        self.assertEqual(self.consulta.version, 1)
+
 
 # =============================================================================
 # TESTES DE EXCLUSÃO (DELETE)
@@ -622,3 +668,160 @@ class ConsultaMethodTests(ConsultaBaseTestCase):
         """POST em endpoint de detalhe deve retornar 405."""
         response = self.client.post(self.detail_url, {}, format="json")
         self.assertEqual(response.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+
+
+# =============================================================================
+# TESTES DA LISTAGEM RÁPIDA (VALUES)
+# =============================================================================
+class ConsultaListValuesTests(ConsultaBaseTestCase):
+    """A listagem via `.values()` deve ter o mesmo formato da serializada."""
+
+    def setUp(self):
+        super().setUp()
+        # Consulta passada: is_future precisa sair False do SQL
+        Consulta.objects.create(
+            data=timezone.now() - timedelta(days=3),
+            profissional=self.profissional2,
+            observacoes="Já realizada.",
+        )
+
+    def test_linhas_iguais_as_do_serializer(self):
+        """Cada linha deve ser idêntica à do ConsultaListSerializer."""
+        queryset = ConsultaService.list_consultas()
+        expected = ConsultaListSerializer(queryset, many=True).data
+        rows = ConsultaListValuesSerializer.values(queryset)
+        self.assertEqual(
+            ConsultaListValuesSerializer(rows).data,
+            [dict(row) for row in expected],
+        )
+
+    def test_campos_derivados_do_serializer_da_listagem(self):
+        """Os campos da listagem rápida vêm do ConsultaListSerializer."""
+        self.assertEqual(
+            ConsultaListValuesSerializer.available_fields(),
+            ConsultaListSerializer.Meta.fields,
+        )
+        self.assertEqual(
+            ConsultaListValuesSerializer.available_fields({"profissional"}),
+            ConsultaListSerializer.Meta.fields + ["profissional_detail"],
+        )
+
+    def test_profissional_detail_sem_expand_e_campo_desconhecido(self):
+        """Sem expand, pedir o profissional aninhado em fields resulta em 400."""
+        response = self.client.get(self.list_url, {"fields": "id,profissional_detail"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_is_future_calculado_no_sql(self):
+        """is_future deve refletir a data de cada consulta."""
+        response = self.client.get(self.list_url, {"ordering": "data"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        flags = [row["is_future"] for row in response.data["results"]]
+        self.assertFalse(flags[0])
+        self.assertTrue(all(flags[1:]))
+
+    def test_listagem_nao_carrega_colunas_fora_da_listagem(self):
+        """O SELECT da listagem não deve trazer endereco nem contato."""
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(self.list_url)
+        select = [
+            query["sql"]
+            for query in ctx.captured_queries
+            if query["sql"].startswith('SELECT "consultas_consulta"."id"')
+        ]
+        self.assertEqual(len(select), 1)
+        self.assertNotIn('"endereco"', select[0])
+        self.assertNotIn('"updated_at"', select[0])
+
+    def test_listagem_sem_paginacao_repassa_o_contexto(self):
+        """Sem paginação, o profissional expandido também deve ser serializado."""
+        with mock.patch.object(ConsultaViewSet, "pagination_class", None):
+            response = self.client.get(self.list_url, {"expand": "profissional"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), Consulta.objects.count())
+        self.assertIn("nome_social", response.data[0]["profissional_detail"])
+
+    def test_por_profissional_usa_listagem_rapida(self):
+        """A busca por profissional deve retornar as mesmas colunas da listagem."""
+        url = reverse("consulta-por-profissional", args=[self.profissional.pk])
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["count"], 1)
+        self.assertEqual(
+            response.data["results"][0]["profissional_nome"],
+            self.profissional.nome_social,
+        )
+
+
+# =============================================================================
+# TESTES DE EXPANSÃO (?expand=profissional)
+# =============================================================================
+class ConsultaExpandTests(ConsultaBaseTestCase):
+    """O profissional aninhado é opt-in e, em listagens, buscado em lote."""
+
+    def _profissional_queries(self, captured):
+        return [
+            query["sql"]
+            for query in captured
+            if query["sql"].startswith('SELECT "profissionais_profissional"')
+        ]
+
+    def test_detalhe_padrao_sem_join(self):
+        """Sem expand, o detalhe não faz JOIN com o profissional."""
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(self.detail_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn("profissional_detail", response.data)
+        self.assertFalse(
+            any(
+                "profissionais_profissional" in query["sql"]
+                for query in ctx.captured_queries
+            )
+        )
+
+    def test_listagem_expandida_busca_profissionais_em_lote(self):
+        """Com expand, a listagem faz uma única busca pelos profissionais."""
+        for i in range(4):
+            Consulta.objects.create(
+                data=self.future_date + timedelta(days=i + 1),
+                profissional=self.profissional2 if i % 2 else self.profissional,
+            )
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(self.list_url, {"expand": "profissional"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(self._profissional_queries(ctx.captured_queries)), 1)
+        for row in response.data["results"]:
+            self.assertEqual(row["profissional_detail"]["id"], row["profissional"])
+
+    def test_listagem_padrao_sem_profissional_aninhado(self):
+        """Sem expand, as linhas da listagem não trazem o profissional aninhado."""
+        response = self.client.get(self.list_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn("profissional_detail", response.data["results"][0])
+
+    def test_expand_com_fields_sem_o_id_do_profissional(self):
+        """O profissional aninhado não depende do campo profissional na resposta."""
+        response = self.client.get(
+            self.list_url,
+            {"expand": "profissional", "fields": "id,profissional_detail"},
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        row = response.data["results"][0]
+        self.assertEqual(list(row), ["id", "profissional_detail"])
+        consulta = Consulta.objects.get(pk=row["id"])
+        self.assertEqual(row["profissional_detail"]["id"], consulta.profissional_id)
+
+    def test_criacao_com_expand(self):
+        """A resposta de criação também aceita expand."""
+        response = self.client.post(
+            f"{self.list_url}?expand=profissional", self.valid_data, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            response.data["profissional_detail"]["nome_social"],
+            self.profissional.nome_social,
+        )
+
+    def test_expand_desconhecido_retorna_400(self):
+        """Expansões não declaradas no serializer devem ser recusadas."""
+        response = self.client.get(self.detail_url, {"expand": "paciente"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -14,15 +14,25 @@ import logging
 
 from django_filters.rest_framework import DjangoFilterBackend
 from drf_spectacular.utils import extend_schema, extend_schema_view
-from rest_framework_simplejwt.authentication import JWTAuthentication
 
 from rest_framework import filters, viewsets
 from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
+from core.authentication import CachedJWTAuthentication
+from core.concurrency import OptimisticConcurrencyMixin
+from core.db_router import ReadReplicaViewMixin
+from core.expand import EXPAND_PARAMETER, ExpandMixin
+from core.idempotency import IdempotentCreateMixin
+from core.sparse_fields import SPARSE_FIELDS_PARAMETERS, SparseFieldsetMixin
+
 from .models import Consulta
-from .serializers import ConsultaListSerializer, ConsultaSerializer
+from .serializers import (
+    ConsultaListSerializer,
+    ConsultaListValuesSerializer,
+    ConsultaSerializer,
+)
 from .services.consulta_service import ConsultaService
 
 logger = logging.getLogger("apps")
@@ -33,26 +43,31 @@ logger = logging.getLogger("apps")
         summary="Listar consultas",
         description="Retorna a lista paginada de consultas médicas.",
         tags=["Consultas"],
+        parameters=[*SPARSE_FIELDS_PARAMETERS, EXPAND_PARAMETER],
     ),
     create=extend_schema(
         summary="Agendar consulta",
         description="Agenda uma nova consulta médica vinculada a um profissional.",
         tags=["Consultas"],
+        parameters=[EXPAND_PARAMETER],
     ),
     retrieve=extend_schema(
         summary="Detalhar consulta",
         description="Retorna os detalhes de uma consulta específica.",
         tags=["Consultas"],
+        parameters=[*SPARSE_FIELDS_PARAMETERS, EXPAND_PARAMETER],
     ),
     update=extend_schema(
         summary="Atualizar consulta",
         description="Atualiza todos os dados de uma consulta.",
         tags=["Consultas"],
+        parameters=[EXPAND_PARAMETER],
     ),
     partial_update=extend_schema(
         summary="Atualizar parcialmente consulta",
         description="Atualiza parcialmente os dados de uma consulta.",
         tags=["Consultas"],
+        parameters=[EXPAND_PARAMETER],
     ),
     destroy=extend_schema(
         summary="Cancelar consulta",
@@ -60,7 +75,14 @@ logger = logging.getLogger("apps")
         tags=["Consultas"],
     ),
 )
-class ConsultaViewSet(viewsets.ModelViewSet):
+class ConsultaViewSet(
+    ReadReplicaViewMixin,
+    OptimisticConcurrencyMixin,
+    SparseFieldsetMixin,
+    ExpandMixin,
+    IdempotentCreateMixin,
+    viewsets.ModelViewSet,
+):
     """
     ViewSet para CRUD completo de Consultas Médicas.
 
@@ -75,10 +97,30 @@ class ConsultaViewSet(viewsets.ModelViewSet):
     """
 
     # Autenticação e Permissões explícitas
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [CachedJWTAuthentication]
     permission_classes = [IsAuthenticated]
 
-    queryset = Consulta.objects.select_related("profissional").all()
+    # Throttling: listagens com busca/filtros custam mais que um detalhe
+    throttle_scope = "consultas"
+    throttle_costs = {"list": 3, "por_profissional": 3}
+
+    # Orçamento de queries por action (core.query_budget), com caches frios:
+    # 2 de autenticação e revogação + as da própria action
+    # (listagens com ?expand=profissional: +1 da busca em lote)
+    query_budgets = {
+        "list": 5,
+        "create": 6,
+        "retrieve": 3,
+        "update": 5,
+        "partial_update": 4,
+        "destroy": 6,
+        "por_profissional": 5,
+    }
+
+    # Listagens montadas de `.values()` (ConsultaListValuesSerializer)
+    values_list_actions = ("list", "por_profissional")
+
+    queryset = Consulta.objects.all()
     filter_backends = [
         DjangoFilterBackend,
         filters.SearchFilter,
@@ -90,12 +132,47 @@ class ConsultaViewSet(viewsets.ModelViewSet):
     ordering = ["-data"]
 
     def get_serializer_class(self):
-        if self.action == "list" or self.action == "por_profissional":
+        if self.action in self.values_list_actions:
             return ConsultaListSerializer
         return ConsultaSerializer
 
+    def available_fields(self):
+        if self.action in self.values_list_actions:
+            return ConsultaListValuesSerializer.available_fields(self.expand)
+        return super().available_fields()
+
+    def narrow_queryset(self, queryset):
+        # Nas listagens, o `.values()` já escolhe as colunas dos campos pedidos
+        if self.action in self.values_list_actions:
+            return queryset
+        return super().narrow_queryset(queryset)
+
     def get_queryset(self):
-        return ConsultaService.list_consultas(super().get_queryset())
+        # O JOIN com o profissional só quando ele vai aninhado (?expand=)
+        return ConsultaService.list_consultas(
+            super().get_queryset(), with_profissional="profissional" in self.expand
+        )
+
+    def list(self, request, *args, **kwargs):
+        return self._values_list_response(self.filter_queryset(self.get_queryset()))
+
+    def _values_list_response(self, queryset):
+        """
+        Listagem rápida a partir de `.values()` (ConsultaListValuesSerializer),
+        no mesmo formato do ConsultaListSerializer.
+        """
+        fields = self.sparse_fields
+        if fields is None:
+            fields = self.available_fields()
+        rows = ConsultaListValuesSerializer.values(queryset, fields)
+        context = self.get_serializer_context()
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            data = ConsultaListValuesSerializer(page, fields, context=context).data
+            return self.get_paginated_response(data)
+        return Response(
+            ConsultaListValuesSerializer(rows, fields, context=context).data
+        )
 
     def perform_create(self, serializer):
         try:
@@ -108,8 +185,9 @@ class ConsultaViewSet(viewsets.ModelViewSet):
 
     def perform_update(self, serializer):
         try:
+            # Reaproveita a instância já buscada (e checada) pelo `update` do DRF
             consulta = ConsultaService.atualizar_consulta(
-                self.get_object(), serializer.validated_data
+                serializer.instance, serializer.validated_data
             )
             serializer.instance = consulta
         except ValueError as e:
@@ -128,10 +206,4 @@ class ConsultaViewSet(viewsets.ModelViewSet):
     def por_profissional(self, request, profissional_id=None):
         """Busca consultas vinculadas a um ID de profissional."""
         consultas = ConsultaService.buscar_por_profissional(profissional_id)
-        page = self.paginate_queryset(consultas)
-        if page is not None:
-            serializer = self.get_serializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
-
-        serializer = self.get_serializer(consultas, many=True)
-        return Response(serializer.data)
+        return self._values_list_response(consultas)
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-19 10:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("profissionais", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="profissional",
+            name="version",
+            field=models.PositiveIntegerField(
+                default=1,
+                help_text="Incrementada a cada atualização (controle de concorrência).",
+                verbose_name="Versão",
+            ),
+        ),
+    ]
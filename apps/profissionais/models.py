@@ -40,6 +40,11 @@ class Profissional(models.Model):
         verbose_name="Contato",
         help_text="Informação de contato (e-mail ou telefone).",
     )
+    version = models.PositiveIntegerField(
+        default=1,
+        verbose_name="Versão",
+        help_text="Incrementada a cada atualização (controle de concorrência).",
+    )
     created_at = models.DateTimeField(
         auto_now_add=True,
         verbose_name="Criado em",
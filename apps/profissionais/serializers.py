@@ -4,16 +4,24 @@ Serializers para o app de Profissionais da Saúde.
 Decisão técnica: Sanitização de inputs é feita diretamente no serializer
 usando o utilitário bleach, garantindo que dados maliciosos sejam removidos
 antes de chegarem ao banco de dados.
+
+As representações de leitura vêm do cache de fragmentos
+(core.fragment_cache), chaveado por id e updated_at: o mesmo profissional
+aninhado em várias consultas é serializado uma vez.
 """
 
 from rest_framework import serializers
 
+from core.fragment_cache import FragmentCacheMixin, FragmentListSerializer
+from core.serializers import TimedSerializerMixin
 from core.utils.sanitization import sanitize_string
 
 from .models import Profissional
 
 
-class ProfissionalSerializer(serializers.ModelSerializer):
+class ProfissionalSerializer(
+    FragmentCacheMixin, TimedSerializerMixin, serializers.ModelSerializer
+):
     """
     Serializer para CRUD de Profissional.
 
@@ -29,10 +37,12 @@ class ProfissionalSerializer(serializers.ModelSerializer):
             "profissao",
             "endereco",
             "contato",
+            "version",
             "created_at",
             "updated_at",
         ]
-        read_only_fields = ["id", "created_at", "updated_at"]
+        read_only_fields = ["id", "version", "created_at", "updated_at"]
+        list_serializer_class = FragmentListSerializer
 
     def validate_nome_social(self, value):
         """Valida e sanitiza o nome social."""
@@ -75,7 +85,9 @@ class ProfissionalSerializer(serializers.ModelSerializer):
         return value
 
 
-class ProfissionalListSerializer(serializers.ModelSerializer):
+class ProfissionalListSerializer(
+    FragmentCacheMixin, TimedSerializerMixin, serializers.ModelSerializer
+):
     """
     Serializer simplificado para listagem de profissionais.
     Retorna apenas campos essenciais para performance.
@@ -92,3 +104,6 @@ class ProfissionalListSerializer(serializers.ModelSerializer):
             "contato",
             "total_consultas",
         ]
+        # Anotação que muda sem alterar o profissional: fora do fragmento
+        fragment_exclude = ["total_consultas"]
+        list_serializer_class = FragmentListSerializer
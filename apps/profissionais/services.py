@@ -16,10 +16,13 @@ import logging
 from django.db import transaction
 from django.db.models import Count
 
+from core.concurrency import versioned_delete, versioned_update
+from core.db_router import primary_db
 from core.domain import (
     NotFoundException,
     ProfissionalComConsultasException,
 )
+from core.tracing import traced
 
 from .models import Profissional
 from .validators import ProfissionalValidator
@@ -37,6 +40,7 @@ class ProfissionalService:
     """
 
     @staticmethod
+    @traced()
     def list_profissionais(queryset=None):
         """
         Retorna a lista de profissionais com anotações de performance.
@@ -46,6 +50,7 @@ class ProfissionalService:
         return queryset.annotate(total_consultas=Count("consultas"))
 
     @staticmethod
+    @traced()
     def get_profissional(profissional_id):
         """
         Busca um profissional por ID.
@@ -57,6 +62,8 @@ class ProfissionalService:
             raise NotFoundException("Profissional", profissional_id)
 
     @staticmethod
+    @traced()
+    @primary_db
     @transaction.atomic
     def create_profissional(data):
         """
@@ -75,35 +82,40 @@ class ProfissionalService:
         return profissional
 
     @staticmethod
-    @transaction.atomic
+    @traced()
+    @primary_db
+    # Sem transaction.atomic: a escrita é um único UPDATE, já atômico
     def update_profissional(profissional, data):
         """
         Atualiza os dados de um profissional existente.
 
-        Executa validações de domínio nos campos alterados.
+        Executa validações de domínio nos campos alterados. Grava só as
+        colunas que mudaram, condicionado à versão lida
+        (PreconditionFailedException se outra requisição gravou antes).
         """
         ProfissionalValidator.validate_all(data)
 
-        for field, value in data.items():
-            setattr(profissional, field, value)
-        profissional.save()
+        versioned_update(profissional, data)
         logger.info("Serviço: Profissional ID=%d atualizado.", profissional.id)
         return profissional
 
     @staticmethod
+    @traced()
+    @primary_db
     @transaction.atomic
     def delete_profissional(profissional):
         """
         Remove um profissional do sistema.
 
         Lança ProfissionalComConsultasException se houver consultas
-        vinculadas (regra de integridade referencial de negócio).
+        vinculadas (regra de integridade referencial de negócio) e
+        PreconditionFailedException se o profissional mudou desde a leitura.
         """
         total_consultas = profissional.consultas.count()
         if total_consultas > 0:
             raise ProfissionalComConsultasException(profissional.id, total_consultas)
 
         profissional_id = profissional.id
-        profissional.delete()
+        versioned_delete(profissional)
         logger.info("Serviço: Profissional ID=%d removido.", profissional_id)
         return True
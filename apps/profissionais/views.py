@@ -18,15 +18,19 @@ Arquitetura:
 import logging
 
 from drf_spectacular.utils import extend_schema, extend_schema_view
-from rest_framework_simplejwt.authentication import JWTAuthentication
 
 from rest_framework import status, viewsets
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
+from core.authentication import CachedJWTAuthentication
+from core.concurrency import OptimisticConcurrencyMixin
+from core.db_router import ReadReplicaViewMixin
 from core.domain import (
     ProfissionalComConsultasException,
 )
+from core.idempotency import IdempotentCreateMixin
+from core.sparse_fields import SPARSE_FIELDS_PARAMETERS, SparseFieldsetMixin
 
 from .models import Profissional
 from .serializers import ProfissionalListSerializer, ProfissionalSerializer
@@ -40,6 +44,7 @@ logger = logging.getLogger("apps")
         summary="Listar profissionais",
         description="Retorna a lista paginada de profissionais da saúde cadastrados.",
         tags=["Profissionais"],
+        parameters=SPARSE_FIELDS_PARAMETERS,
     ),
     create=extend_schema(
         summary="Cadastrar profissional",
@@ -50,6 +55,7 @@ logger = logging.getLogger("apps")
         summary="Detalhar profissional",
         description="Retorna os detalhes de um profissional específico.",
         tags=["Profissionais"],
+        parameters=SPARSE_FIELDS_PARAMETERS,
     ),
     update=extend_schema(
         summary="Atualizar profissional",
@@ -67,7 +73,13 @@ logger = logging.getLogger("apps")
         tags=["Profissionais"],
     ),
 )
-class ProfissionalViewSet(viewsets.ModelViewSet):
+class ProfissionalViewSet(
+    ReadReplicaViewMixin,
+    OptimisticConcurrencyMixin,
+    SparseFieldsetMixin,
+    IdempotentCreateMixin,
+    viewsets.ModelViewSet,
+):
     """
     ViewSet para CRUD completo de Profissionais da Saúde.
 
@@ -81,9 +93,24 @@ class ProfissionalViewSet(viewsets.ModelViewSet):
     """
 
     # Autenticação e Permissões explícitas
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [CachedJWTAuthentication]
     permission_classes = [IsAuthenticated]
 
+    # Throttling: listagens com busca/filtros custam mais que um detalhe
+    throttle_scope = "profissionais"
+    throttle_costs = {"list": 2}
+
+    # Orçamento de queries por action (core.query_budget), com caches frios:
+    # 2 de autenticação e revogação + as da própria action
+    query_budgets = {
+        "list": 4,
+        "create": 5,
+        "retrieve": 3,
+        "update": 4,
+        "partial_update": 4,
+        "destroy": 9,
+    }
+
     queryset = Profissional.objects.all()
     filterset_fields = ["profissao"]
     search_fields = ["nome_social", "profissao"]
@@ -96,7 +123,11 @@ class ProfissionalViewSet(viewsets.ModelViewSet):
         return ProfissionalSerializer
 
     def get_queryset(self):
-        return ProfissionalService.list_profissionais(super().get_queryset())
+        queryset = super().get_queryset()
+        # A contagem de consultas (JOIN + GROUP BY) só quando vai na resposta
+        if not self.wants_field("total_consultas"):
+            return queryset
+        return ProfissionalService.list_profissionais(queryset)
 
     def perform_create(self, serializer):
         profissional = ProfissionalService.create_profissional(
@@ -106,8 +137,9 @@ class ProfissionalViewSet(viewsets.ModelViewSet):
         serializer.instance = profissional
 
     def perform_update(self, serializer):
+        # Reaproveita a instância já buscada (e checada) pelo `update` do DRF
         profissional = ProfissionalService.update_profissional(
-            self.get_object(), serializer.validated_data
+            serializer.instance, serializer.validated_data
         )
         serializer.instance = profissional
 
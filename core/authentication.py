@@ -0,0 +1,323 @@
+"""
+Classes de autenticação da API.
+
+Decisão técnica: Estender o JWTAuthentication do simplejwt em um único ponto
+permite instrumentar a autenticação (fase `auth` do Server-Timing) sem
+alterar cada ViewSet além do import.
+
+CachedJWTAuthentication evita, a cada requisição, a verificação da
+assinatura HMAC e o `SELECT` em auth_user: clientes móveis reutilizam o
+mesmo access token por até ACCESS_TOKEN_LIFETIME. Um LRU limitado por
+worker guarda sha256(token) → (usuário, token validado, expiração). A
+entrada vale até a expiração do token, limitada a JWT_AUTH_CACHE_TTL_SECONDS:
+a invalidação por signal só alcança o worker que salvou o usuário, então o
+TTL limita por quanto tempo os demais workers aceitam um usuário desativado.
+
+Com JWT_STATELESS_USER (opt-in), o usuário da requisição é um ClaimsUser
+montado a partir das claims do token (id, username, is_staff,
+is_superuser), sem o `SELECT` em auth_user. O modelo completo só é carregado
+quando a view acessa algo fora das claims (ver ClaimsUser). A claim
+`perm_version` (impressão digital de is_active, is_staff, is_superuser e
+hash da senha) é comparada à versão atual do usuário, guardada no cache do
+Django por JWT_PERM_VERSION_CACHE_SECONDS: desativar o usuário, mudar o
+papel ou trocar a senha invalida os tokens emitidos antes. Um token
+desatualizado é recusado e o cliente precisa autenticar de novo.
+
+Tokens revogados (logout, rotação de refresh) são recusados com base no
+Bloom filter de core.revocation, sem query na maioria das requisições.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from rest_framework_simplejwt.authentication import (
+    JWTAuthentication as BaseJWTAuthentication,
+)
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.utils.functional import cached_property
+
+from core.revocation import RevocationFilter
+from core.utils.timing import timed_phase
+
+
+class JWTAuthentication(BaseJWTAuthentication):
+    """JWTAuthentication do simplejwt com medição da fase de autenticação."""
+
+    def authenticate(self, request):
+        with timed_phase(request, "auth"):
+            return super().authenticate(request)
+
+
+PERM_VERSION_CLAIM = "perm_version"
+_PERM_VERSION_CACHE_KEY = "auth:perm_version:{}"
+
+
+def permission_version(user):
+    """Impressão digital do que um token stateless afirma sobre o usuário."""
+    raw = ":".join(
+        str(value)
+        for value in (
+            user.pk,
+            user.is_active,
+            user.is_staff,
+            user.is_superuser,
+            user.password,
+        )
+    )
+    return hashlib.sha256(raw.encode()).hexdigest()[:16]
+
+
+def add_user_claims(token, user):
+    """Adiciona ao token as claims usadas pelo ClaimsUser."""
+    token["username"] = user.get_username()
+    token["is_staff"] = user.is_staff
+    token["is_superuser"] = user.is_superuser
+    token[PERM_VERSION_CLAIM] = permission_version(user)
+    return token
+
+
+class ClaimsUser(TokenUser):
+    """
+    Usuário da requisição montado a partir das claims do token.
+
+    Atende IsAuthenticated, throttling por usuário e o log de acesso sem
+    consultar o banco. Qualquer atributo fora das claims (email, grupos,
+    permissões) carrega o modelo sob demanda, uma única vez.
+    Para chaves estrangeiras, use `user.model`.
+    """
+
+    def __str__(self):
+        return self.username
+
+    @cached_property
+    def model(self):
+        """Instância completa do usuário (uma query, na primeira vez)."""
+        return get_user_model().objects.get(**{api_settings.USER_ID_FIELD: self.id})
+
+    @property
+    def groups(self):
+        return self.model.groups
+
+    @property
+    def user_permissions(self):
+        return self.model.user_permissions
+
+    def get_group_permissions(self, obj=None):
+        return self.model.get_group_permissions(obj)
+
+    def get_all_permissions(self, obj=None):
+        return self.model.get_all_permissions(obj)
+
+    def has_perm(self, perm, obj=None):
+        return self.model.has_perm(perm, obj)
+
+    def has_perms(self, perm_list, obj=None):
+        return self.model.has_perms(perm_list, obj)
+
+    def has_module_perms(self, module):
+        return self.model.has_module_perms(module)
+
+    def __getattr__(self, attr):
+        if attr.startswith("_") or attr == "token":
+            raise AttributeError(attr)
+        if attr in self.token:
+            return self.token[attr]
+        return getattr(self.model, attr)
+
+
+class TokenAuthCache:
+    """
+    LRU thread-safe de tokens já verificados, um por worker.
+
+    Tamanho em JWT_AUTH_CACHE_SIZE (0 desliga o cache).
+    """
+
+    _instance = None
+    _lock = threading.Lock()
+
+    def __new__(cls):
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = super().__new__(cls)
+                    cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self):
+        if self._initialized:
+            return
+        self._initialized = True
+        self._entries = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+        self._data_lock = threading.Lock()
+
+    @property
+    def max_size(self):
+        return getattr(settings, "JWT_AUTH_CACHE_SIZE", 0)
+
+    def get(self, key):
+        """Retorna (usuário, token validado) ainda válidos, ou None."""
+        with self._data_lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+            user, validated_token, expires_at = entry
+            if time.time() >= expires_at:
+                del self._entries[key]
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return user, validated_token
+
+    def set(self, key, user, validated_token):
+        max_size = self.max_size
+        if max_size <= 0:
+            return
+        ttl = getattr(settings, "JWT_AUTH_CACHE_TTL_SECONDS", 300)
+        expires_at = min(validated_token["exp"], time.time() + ttl)
+        with self._data_lock:
+            self._entries[key] = (user, validated_token, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate_user(self, user_id):
+        """Remove todas as entradas de um usuário (desativação, troca de senha)."""
+        with self._data_lock:
+            stale = [
+                key for key, (user, _, _) in self._entries.items() if user.pk == user_id
+            ]
+            for key in stale:
+                del self._entries[key]
+
+    def stats(self):
+        with self._data_lock:
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self._hits,
+                "misses": self._misses,
+            }
+
+    def reset(self):
+        """Limpa o cache e os contadores (útil para testes)."""
+        with self._data_lock:
+            self._entries.clear()
+            self._hits = 0
+            self._misses = 0
+
+
+def check_not_revoked(validated_token):
+    """Recusa tokens revogados (ver core.revocation)."""
+    if not getattr(settings, "TOKEN_REVOCATION_ENABLED", False):
+        return
+    if RevocationFilter().is_revoked(validated_token.get("jti")):
+        raise AuthenticationFailed("Token revogado.", code="token_revoked")
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication que reaproveita tokens já verificados.
+
+    Em cache hit não há verificação de assinatura nem query de usuário;
+    a checagem de revogação (Bloom filter em memória) vale nos dois casos.
+    A instância do usuário é compartilhada entre as requisições do worker
+    que usam o mesmo token e deve ser tratada como somente leitura.
+    """
+
+    def authenticate(self, request):
+        with timed_phase(request, "auth"):
+            header = self.get_header(request)
+            if header is None:
+                return None
+
+            raw_token = self.get_raw_token(header)
+            if raw_token is None:
+                return None
+
+            token_cache = TokenAuthCache()
+            key = cached = None
+            if token_cache.max_size > 0:
+                key = hashlib.sha256(raw_token).hexdigest()
+                cached = token_cache.get(key)
+
+            if cached is not None:
+                user, validated_token = cached
+            else:
+                validated_token = self.get_validated_token(raw_token)
+                user = self.get_user(validated_token)
+                if key is not None:
+                    token_cache.set(key, user, validated_token)
+
+            # Também em cache hit: a revogação pode ser posterior ao cache
+            check_not_revoked(validated_token)
+            return user, validated_token
+
+    def get_user(self, validated_token):
+        if not getattr(settings, "JWT_STATELESS_USER", False):
+            return super().get_user(validated_token)
+
+        claimed = validated_token.get(PERM_VERSION_CLAIM)
+        if claimed is None:
+            # Token emitido antes do modo stateless: sem claims suficientes
+            return super().get_user(validated_token)
+
+        user = ClaimsUser(validated_token)
+        key = _PERM_VERSION_CACHE_KEY.format(user.id)
+        current = cache.get(key)
+        if current is None:
+            model = super().get_user(validated_token)
+            current = permission_version(model)
+            cache.set(
+                key, current, getattr(settings, "JWT_PERM_VERSION_CACHE_SECONDS", 60)
+            )
+            # Já carregado: evita uma segunda query se a view precisar
+            user.__dict__["model"] = model
+
+        if claimed != current:
+            raise AuthenticationFailed(
+                "Token desatualizado: autentique-se novamente.", code="token_outdated"
+            )
+        return user
+
+
+class OptionalJWTAuthentication(CachedJWTAuthentication):
+    """
+    Autenticação que nunca recusa a requisição: token inválido, expirado ou
+    revogado vira requisição anônima. Para endpoints abertos que só usam o
+    token quando ele é válido (ex: logout).
+    """
+
+    def authenticate(self, request):
+        try:
+            return super().authenticate(request)
+        except AuthenticationFailed:
+            return None
+
+
+def _invalidate_cached_tokens(sender, instance, **kwargs):
+    TokenAuthCache().invalidate_user(instance.pk)
+    cache.delete(_PERM_VERSION_CACHE_KEY.format(instance.pk))
+
+
+# Qualquer alteração do usuário (is_active, senha, permissões) descarta
+# os tokens em cache deste worker
+post_save.connect(_invalidate_cached_tokens, sender=settings.AUTH_USER_MODEL)
+post_delete.connect(_invalidate_cached_tokens, sender=settings.AUTH_USER_MODEL)
+
+
+def token_cache_stats():
+    """Estatísticas do cache de tokens deste worker (exposto em /api/metrics/)."""
+    return TokenAuthCache().stats()
@@ -0,0 +1,135 @@
+"""
+Snapshot de métricas de negócio para health check e métricas.
+
+Decisão técnica: As contagens de negócio (profissionais, consultas, consultas
+futuras) são `COUNT(*)` que crescem com o volume de dados. Como o health check
+é chamado a cada 30s por container (Docker HEALTHCHECK + ALB), executá-las
+de forma síncrona sobrecarrega o banco justamente durante incidentes.
+
+O snapshot é mantido em memória com TTL configurável e recalculado fora do
+caminho da requisição: quando expira, a requisição devolve o valor atual
+(stale-while-revalidate) e dispara o refresh em uma thread de background.
+"""
+
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import connections
+
+from core.db_router import use_replica
+
+logger = logging.getLogger("core.middleware")
+
+
+class BusinessMetricsSnapshot:
+    """
+    Snapshot thread-safe das métricas de negócio, com refresh em background.
+
+    Uso:
+        snapshot = BusinessMetricsSnapshot()
+        metrics, age_seconds = snapshot.get()
+
+    Enquanto nenhum snapshot foi calculado, `get()` retorna (None, None)
+    e agenda o primeiro refresh.
+    """
+
+    _instance = None
+    _lock = threading.Lock()
+
+    def __new__(cls):
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = super().__new__(cls)
+                    cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self):
+        if self._initialized:
+            return
+        self._initialized = True
+        self._metrics = None
+        self._refreshed_at = None
+        self._refreshing = False
+        self._data_lock = threading.Lock()
+
+    @property
+    def ttl(self):
+        return getattr(settings, "HEALTH_METRICS_TTL_SECONDS", 60)
+
+    def get(self):
+        """
+        Retorna (métricas, idade do snapshot em segundos).
+
+        Nunca consulta o banco no thread da requisição: se o snapshot
+        estiver expirado (ou ausente), agenda um refresh em background.
+        """
+        with self._data_lock:
+            metrics = self._metrics
+            refreshed_at = self._refreshed_at
+            stale = refreshed_at is None or time.time() - refreshed_at >= self.ttl
+            should_refresh = stale and not self._refreshing
+            if should_refresh:
+                self._refreshing = True
+
+        if should_refresh:
+            self._start_background_refresh()
+
+        if refreshed_at is None:
+            return None, None
+        return dict(metrics), round(time.time() - refreshed_at, 2)
+
+    def refresh(self):
+        """Recalcula o snapshot de forma síncrona."""
+        from django.utils import timezone
+
+        from apps.consultas.models import Consulta
+        from apps.profissionais.models import Profissional
+
+        # Contagens toleram o atraso de replicação
+        with use_replica():
+            metrics = {
+                "total_profissionais": Profissional.objects.count(),
+                "total_consultas": Consulta.objects.count(),
+                "consultas_futuras": Consulta.objects.filter(
+                    data__gte=timezone.now()
+                ).count(),
+            }
+
+        with self._data_lock:
+            self._metrics = metrics
+            self._refreshed_at = time.time()
+        return metrics
+
+    def reset(self):
+        """Descarta o snapshot atual (útil para testes)."""
+        with self._data_lock:
+            self._metrics = None
+            self._refreshed_at = None
+            self._refreshing = False
+
+    def _start_background_refresh(self):
+        if not getattr(settings, "HEALTH_METRICS_BACKGROUND_REFRESH", True):
+            with self._data_lock:
+                self._refreshing = False
+            return
+
+        thread = threading.Thread(
+            target=self._refresh_in_background,
+            name="business-metrics-refresh",
+            daemon=True,
+        )
+        thread.start()
+
+    def _refresh_in_background(self):
+        try:
+            self.refresh()
+        except Exception:
+            logger.exception("Falha ao atualizar snapshot de métricas de negócio")
+        finally:
+            with self._data_lock:
+                self._refreshing = False
+            # As conexões pertencem a esta thread; fechá-las evita vazamento
+            connections.close_all()
@@ -0,0 +1,160 @@
+"""
+Controle de concorrência otimista com coluna `version` e If-Match/ETag.
+
+Decisão técnica: A atualização fazia ler-modificar-`save()` de todas as
+colunas, então duas edições concorrentes do mesmo registro terminavam com
+a última sobrescrevendo a primeira em silêncio. Cada modelo editável tem
+agora uma coluna `version`, e a escrita é condicional:
+
+    UPDATE ... SET ..., version = version + 1 WHERE id = %s AND version = %s
+
+Zero linhas afetadas significa que outra requisição gravou antes:
+PreconditionFailedException (412). Nenhum lock de linha é mantido durante a
+requisição; a janela de conflito é detectada no próprio UPDATE.
+
+A escrita inclui só as colunas que de fato mudaram (mais `version` e
+`updated_at`); sem mudanças, não há UPDATE nem nova versão, e o
+`updated_at` não muda à toa nos índices.
+
+O ETag das respostas de detalhe, criação e atualização é a versão
+(`"3"`). O cliente envia de volta em If-Match no PUT/PATCH/DELETE; sem o
+header, vale a versão lida na própria requisição (o que ainda detecta
+escritas concorrentes entre a leitura e o UPDATE). O DELETE é condicional
+da mesma forma.
+"""
+
+from django.db.models import F
+from django.utils import timezone
+from rest_framework.permissions import SAFE_METHODS
+
+from core.domain import PreconditionFailedException
+
+ETAG_ACTIONS = {"retrieve", "create", "update", "partial_update"}
+
+
+def etag_for(version):
+    """ETag forte a partir da versão do registro."""
+    return f'"{version}"'
+
+
+def parse_if_match(value):
+    """
+    Versões aceitas pelo If-Match, ou None quando não há restrição
+    (header ausente ou `*`). Valores inválidos resultam em conjunto vazio,
+    que não casa com nenhuma versão.
+    """
+    if not value:
+        return None
+    versions = set()
+    for tag in value.split(","):
+        tag = tag.strip()
+        if tag == "*":
+            return None
+        # Proxies com compressão enfraquecem o ETag (W/"3"): aceito como o forte
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if len(tag) >= 2 and tag[0] == tag[-1] == '"' and tag[1:-1].isdigit():
+            versions.add(int(tag[1:-1]))
+    return versions
+
+
+def check_if_match(request, instance):
+    """Recusa a escrita se o If-Match não corresponde à versão atual."""
+    versions = parse_if_match(request.headers.get("If-Match"))
+    if versions is not None and instance.version not in versions:
+        raise PreconditionFailedException(
+            instance._meta.verbose_name, instance.pk, instance.version
+        )
+
+
+def changed_fields(instance, data):
+    """Subconjunto de `data` com valores diferentes dos da instância."""
+    changed = {}
+    for name, value in data.items():
+        field = instance._meta.get_field(name)
+        if field.is_relation:
+            # Compara pela coluna (profissional_id): não carrega o objeto
+            current = getattr(instance, field.attname)
+            value_key = getattr(value, "pk", value)
+            if current != value_key:
+                changed[name] = value
+        elif getattr(instance, name) != value:
+            changed[name] = value
+    return changed
+
+
+def versioned_update(instance, data):
+    """
+    Grava em `instance` as mudanças de `data` com um único UPDATE,
+    condicional à versão lida, só das colunas alteradas.
+
+    Lança PreconditionFailedException se o registro mudou desde a leitura.
+    Sem mudanças, retorna a instância sem tocar no banco. Atualiza a
+    instância em memória (campos, versão e updated_at).
+    """
+    data = changed_fields(instance, data)
+    if not data:
+        return instance
+
+    expected = instance.version
+    now = timezone.now()
+    model = type(instance)
+    updated = model._default_manager.filter(pk=instance.pk, version=expected).update(
+        **data, version=F("version") + 1, updated_at=now
+    )
+    if not updated:
+        raise PreconditionFailedException(
+            model._meta.verbose_name, instance.pk, expected
+        )
+
+    for field, value in data.items():
+        setattr(instance, field, value)
+    instance.version = expected + 1
+    instance.updated_at = now
+    return instance
+
+
+def versioned_delete(instance):
+    """
+    Remove `instance` com um DELETE condicional à versão lida.
+
+    Lança PreconditionFailedException se o registro mudou (ou foi removido)
+    desde a leitura: o If-Match checado em `get_object` não cobre a janela
+    entre a leitura e o DELETE.
+    """
+    expected = instance.version
+    model = type(instance)
+    deleted, _ = model._default_manager.filter(
+        pk=instance.pk, version=expected
+    ).delete()
+    if not deleted:
+        raise PreconditionFailedException(
+            model._meta.verbose_name, instance.pk, expected
+        )
+
+
+class OptimisticConcurrencyMixin:
+    """
+    Mixin de viewsets: ETag nas respostas e If-Match nas escritas.
+
+    A checagem do If-Match em `get_object` acontece antes da validação do
+    corpo; a garantia contra corridas vem do UPDATE condicional do serviço.
+    """
+
+    def get_object(self):
+        instance = super().get_object()
+        if self.request.method not in SAFE_METHODS:
+            check_if_match(self.request, instance)
+        return instance
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        data = getattr(response, "data", None)
+        if (
+            getattr(self, "action", None) in ETAG_ACTIONS
+            and 200 <= response.status_code < 300
+            and isinstance(data, dict)
+            and "version" in data
+        ):
+            response["ETag"] = etag_for(data["version"])
+        return response
@@ -0,0 +1,62 @@
+"""
+Estatísticas das conexões com o banco por worker.
+
+Decisão técnica: Com o pool do psycopg 3 (DB_POOL_ENABLED), as estatísticas
+vêm do próprio pool: conexões em uso, ociosas, requisições esperando por
+uma conexão e tempo total/médio de espera. Sem pool (conexões persistentes
+ou por requisição), expõe quantas conexões o worker já abriu, o que mostra
+se a reutilização via CONN_MAX_AGE está funcionando.
+
+Exposto em /api/metrics/ e no readiness probe.
+"""
+
+import threading
+from collections import defaultdict
+
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+_opened = defaultdict(int)
+_opened_lock = threading.Lock()
+
+
+def _count_connection(sender, connection, **kwargs):
+    with _opened_lock:
+        _opened[connection.alias] += 1
+
+
+connection_created.connect(_count_connection)
+
+
+def pool_stats():
+    """Estatísticas de conexão de cada alias configurado."""
+    return {alias: _alias_stats(connections[alias]) for alias in connections}
+
+
+def _alias_stats(connection):
+    pool = getattr(connection, "pool", None)
+    if pool is not None:
+        raw = pool.get_stats()
+        size = raw.get("pool_size", 0)
+        available = raw.get("pool_available", 0)
+        requests = raw.get("requests_num", 0)
+        wait_ms = raw.get("requests_wait_ms", 0)
+        return {
+            "mode": "pool",
+            "min_size": pool.min_size,
+            "max_size": pool.max_size,
+            "in_use": size - available,
+            "idle": available,
+            "waiting": raw.get("requests_waiting", 0),
+            "wait_ms_total": wait_ms,
+            "avg_wait_ms": round(wait_ms / requests, 2) if requests else 0.0,
+            "timeouts": raw.get("requests_errors", 0),
+        }
+
+    conn_max_age = connection.settings_dict.get("CONN_MAX_AGE", 0)
+    return {
+        "mode": "persistent" if conn_max_age else "per-request",
+        "conn_max_age": conn_max_age,
+        "health_checks": connection.settings_dict.get("CONN_HEALTH_CHECKS", False),
+        "connections_opened": _opened[connection.alias],
+    }
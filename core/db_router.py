@@ -0,0 +1,145 @@
+"""
+Roteamento de leituras para a réplica com read-your-writes.
+
+Decisão técnica: Listagens e detalhes dominam o tráfego e podem ser
+servidos por uma réplica de leitura, aliviando o primário. O roteamento é
+opt-in por contexto (ContextVar), e não global: só leituras marcadas
+explicitamente (viewsets com ReadReplicaViewMixin, métricas de negócio)
+vão para a réplica; todo o resto, inclusive as escritas, usa o primário.
+
+Read-your-writes: depois de uma escrita bem-sucedida, a resposta leva o
+cookie/header `X-Primary-Until` com o fim da janela de
+READ_REPLICA_STICKY_SECONDS. Enquanto a janela estiver aberta, leituras
+desse cliente vão para o primário, escondendo o atraso de replicação.
+O cliente só consegue forçar o primário com esse valor, nunca a réplica.
+
+Desligado quando READ_REPLICA_ALIAS é None (sem réplica configurada).
+"""
+
+import functools
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from rest_framework.permissions import SAFE_METHODS
+
+PRIMARY_ALIAS = "default"
+STICKY_COOKIE = "primary_until"
+STICKY_HEADER = "X-Primary-Until"
+_STICKY_META_KEY = "HTTP_X_PRIMARY_UNTIL"
+
+# True quando as leituras do contexto atual podem ir para a réplica
+_read_from_replica = ContextVar("read_from_replica", default=False)
+
+
+def replica_alias():
+    """Alias da réplica de leitura, ou None se o roteamento está desligado."""
+    return getattr(settings, "READ_REPLICA_ALIAS", None)
+
+
+@contextmanager
+def use_replica():
+    """Envia as leituras do bloco para a réplica (se configurada)."""
+    token = _read_from_replica.set(True)
+    try:
+        yield
+    finally:
+        _read_from_replica.reset(token)
+
+
+@contextmanager
+def use_primary():
+    """Força leituras do bloco no primário, mesmo dentro de `use_replica`."""
+    token = _read_from_replica.set(False)
+    try:
+        yield
+    finally:
+        _read_from_replica.reset(token)
+
+
+def primary_db(func):
+    """Decorator de serviços: leituras e escritas da chamada no primário."""
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with use_primary():
+            return func(*args, **kwargs)
+
+    return wrapper
+
+
+class ReadReplicaRouter:
+    """
+    Router que envia leituras marcadas para a réplica e escritas ao primário.
+
+    As escritas retornam o primário explicitamente: sem isso, o Django
+    salvaria uma instância lida da réplica de volta na própria réplica.
+    """
+
+    def db_for_read(self, model, **hints):
+        alias = replica_alias()
+        if alias and _read_from_replica.get():
+            return alias
+        return PRIMARY_ALIAS if alias else None
+
+    def db_for_write(self, model, **hints):
+        return PRIMARY_ALIAS if replica_alias() else None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        alias = replica_alias()
+        if not alias:
+            return None
+        # Réplica e primário têm os mesmos dados
+        databases = {PRIMARY_ALIAS, alias}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+
+def is_sticky_to_primary(request):
+    """Indica se o cliente escreveu há menos de READ_REPLICA_STICKY_SECONDS."""
+    value = request.COOKIES.get(STICKY_COOKIE) or request.META.get(_STICKY_META_KEY)
+    try:
+        return float(value) > time.time()
+    except (TypeError, ValueError):
+        return False
+
+
+def mark_sticky_to_primary(response):
+    """Abre a janela de read-your-writes na resposta de uma escrita."""
+    seconds = getattr(settings, "READ_REPLICA_STICKY_SECONDS", 5)
+    until = str(int(time.time() + seconds) + 1)
+    response[STICKY_HEADER] = until
+    response.set_cookie(
+        STICKY_COOKIE, until, max_age=seconds + 1, httponly=True, samesite="Lax"
+    )
+
+
+class ReadReplicaViewMixin:
+    """
+    Mixin de viewsets: métodos seguros leem da réplica, escritas abrem a
+    janela de read-your-writes.
+
+    Autenticação, permissões e throttling (`initial`) continuam no
+    primário: um usuário recém-criado ainda pode não existir na réplica.
+    """
+
+    def initial(self, request, *args, **kwargs):
+        with use_primary():
+            super().initial(request, *args, **kwargs)
+
+    def dispatch(self, request, *args, **kwargs):
+        if not replica_alias():
+            return super().dispatch(request, *args, **kwargs)
+
+        if request.method in SAFE_METHODS:
+            if is_sticky_to_primary(request):
+                return super().dispatch(request, *args, **kwargs)
+            with use_replica():
+                return super().dispatch(request, *args, **kwargs)
+
+        response = super().dispatch(request, *args, **kwargs)
+        if response.status_code < 400:
+            mark_sticky_to_primary(response)
+        return response
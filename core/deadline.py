@@ -0,0 +1,182 @@
+"""
+Deadlines por requisição, propagados até o banco de dados.
+
+Decisão técnica: Sem deadline, uma busca lenta segura o worker e a conexão
+com o banco muito depois de o cliente ter desistido. Cada requisição recebe
+um orçamento de tempo (padrão por rota, opcionalmente reduzido pelo header
+`X-Request-Timeout` do cliente) guardado em uma ContextVar.
+
+O execute wrapper `enforce_deadline` (instalado em todas as conexões via
+core.utils.db) recusa queries com o orçamento esgotado e, no PostgreSQL,
+aplica o restante como `statement_timeout`, para que o próprio banco
+cancele a query que estourar o prazo:
+- dentro de transação: `SET LOCAL`, descartado no fim da transação;
+- em autocommit: `SET` na sessão, desfeito com `RESET` no fim da
+  requisição (a conexão pode ser reutilizada com CONN_MAX_AGE). Em ASGI o
+  `RESET` roda via sync_to_async, na thread dona da conexão (`aend_deadline`).
+
+O timeout só é reenviado quando o orçamento restante cai mais de 10% em
+relação ao último valor aplicado, evitando um round trip extra por query.
+
+Estouros viram DeadlineExceeded (ou QueryCanceled do PostgreSQL), que o
+custom_exception_handler traduz para 504.
+"""
+
+import functools
+import logging
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import sync_to_async
+
+logger = logging.getLogger("core.middleware")
+
+# Estado do deadline da requisição atual (None fora de requisições)
+_deadline = ContextVar("deadline", default=None)
+
+# SQLSTATE do PostgreSQL para query cancelada por statement_timeout
+QUERY_CANCELED_SQLSTATE = "57014"
+
+_REAPPLY_RATIO = 0.9
+
+
+class DeadlineExceeded(Exception):
+    """O orçamento de tempo da requisição se esgotou."""
+
+    def __init__(self, budget):
+        self.budget = budget
+        super().__init__(f"Prazo da requisição ({budget:.1f}s) esgotado.")
+
+
+class _DeadlineState:
+    __slots__ = ("expires_at", "budget", "session_connections")
+
+    def __init__(self, expires_at, budget):
+        self.expires_at = expires_at
+        self.budget = budget
+        # Conexões com statement_timeout de sessão a desfazer no fim
+        self.session_connections = []
+
+
+def start_deadline(budget, started_at=None):
+    """Define o deadline da requisição atual; retorna o token para `end_deadline`."""
+    started_at = time.monotonic() if started_at is None else started_at
+    return _deadline.set(_DeadlineState(started_at + budget, budget))
+
+
+def end_deadline(token):
+    """Encerra o deadline e desfaz statement_timeouts de sessão aplicados."""
+    _reset_session_timeouts(_pop_deadline(token))
+
+
+async def aend_deadline(token):
+    """
+    `end_deadline` em código async: o RESET é I/O bloqueante em conexões
+    criadas pela thread de sync_to_async, então roda nela, fora do loop.
+    """
+    connections = _pop_deadline(token)
+    if connections:
+        await sync_to_async(_reset_session_timeouts, thread_sensitive=True)(connections)
+
+
+def _pop_deadline(token):
+    """Encerra o deadline; retorna as conexões com timeout de sessão."""
+    state = _deadline.get()
+    _deadline.reset(token)
+    return state.session_connections if state is not None else []
+
+
+def remaining():
+    """Segundos restantes do orçamento, ou None sem deadline."""
+    state = _deadline.get()
+    if state is None:
+        return None
+    return state.expires_at - time.monotonic()
+
+
+def check_deadline():
+    """Levanta DeadlineExceeded se o orçamento da requisição se esgotou."""
+    state = _deadline.get()
+    if state is not None and time.monotonic() >= state.expires_at:
+        raise DeadlineExceeded(state.budget)
+
+
+def is_query_canceled(exc):
+    """Indica se a exceção é um cancelamento por statement_timeout."""
+    cause = getattr(exc, "__cause__", None) or exc
+    return getattr(cause, "pgcode", None) == QUERY_CANCELED_SQLSTATE
+
+
+def enforce_deadline(execute, sql, params, many, context):
+    """Execute wrapper que aplica o deadline da requisição às queries."""
+    state = _deadline.get()
+    if state is None:
+        return execute(sql, params, many, context)
+
+    left = state.expires_at - time.monotonic()
+    if left <= 0:
+        raise DeadlineExceeded(state.budget)
+
+    connection = context["connection"]
+    if connection.vendor == "postgresql":
+        _apply_statement_timeout(connection, context["cursor"], state, left)
+    return execute(sql, params, many, context)
+
+
+def _apply_statement_timeout(connection, cursor, state, left):
+    timeout_ms = max(int(left * 1000), 1)
+    scope = "transaction" if connection.in_atomic_block else "session"
+    applied = getattr(connection, "_deadline_timeout", None)
+    if applied is not None:
+        applied_scope, applied_ms, applied_state, hook = applied
+        if (
+            applied_state is state
+            and applied_scope == scope
+            and timeout_ms >= applied_ms * _REAPPLY_RATIO
+            and (hook is None or _hook_pending(connection, hook))
+        ):
+            return
+
+    # Cursor DB-API direto: não passa de novo pelos execute wrappers
+    if scope == "session":
+        cursor.cursor.execute(f"SET statement_timeout = {timeout_ms}")
+        if connection not in state.session_connections:
+            state.session_connections.append(connection)
+        hook = None
+    else:
+        cursor.cursor.execute(f"SET LOCAL statement_timeout = {timeout_ms}")
+        # O SET LOCAL morre com a transação ou com o savepoint em que foi
+        # feito; o hook de on_commit registrado junto tem o mesmo destino
+        hook = functools.partial(_forget_timeout, connection)
+        connection.on_commit(hook)
+    connection._deadline_timeout = (scope, timeout_ms, state, hook)
+
+
+def _hook_pending(connection, hook):
+    """
+    Indica se o hook ainda está pendente. O Django descarta os hooks de
+    on_commit no rollback da transação e no do savepoint em que foram
+    registrados, exatamente quando o SET LOCAL também é desfeito.
+    """
+    return any(pending is hook for _, pending, _ in connection.run_on_commit)
+
+
+def _forget_timeout(connection):
+    connection._deadline_timeout = None
+
+
+def _reset_session_timeouts(connections):
+    for connection in connections:
+        _reset_session_timeout(connection)
+
+
+def _reset_session_timeout(connection):
+    _forget_timeout(connection)
+    if connection.connection is None:
+        return
+    try:
+        with connection.connection.cursor() as cursor:
+            cursor.execute("RESET statement_timeout")
+    except Exception:
+        # Conexão quebrada: o Django a descarta no fim da requisição
+        logger.warning("Falha ao restaurar statement_timeout", exc_info=True)
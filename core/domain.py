@@ -63,3 +63,39 @@ class ProfissionalComConsultasException(ConflictException):
             f"Exclua as consultas primeiro."
         )
         super().__init__(message)
+
+
+class IdempotencyKeyInProgressException(ConflictException):
+    """Requisição com a mesma Idempotency-Key ainda em andamento."""
+
+    def __init__(self, key):
+        self.key = key
+        super().__init__(
+            "Uma requisição com esta Idempotency-Key ainda está em andamento."
+        )
+        self.code = "idempotency_in_progress"
+
+
+class IdempotencyKeyReusedException(DomainException):
+    """Idempotency-Key reutilizada com um corpo de requisição diferente."""
+
+    def __init__(self, key):
+        self.key = key
+        super().__init__(
+            "Idempotency-Key já utilizada com outro corpo de requisição.",
+            code="idempotency_key_reused",
+        )
+
+
+class PreconditionFailedException(DomainException):
+    """Versão esperada (If-Match) diferente da versão atual do registro."""
+
+    def __init__(self, entity_name, entity_id, expected_version):
+        self.entity_name = entity_name
+        self.entity_id = entity_id
+        self.expected_version = expected_version
+        super().__init__(
+            f"{entity_name} ID={entity_id} foi alterado por outra requisição "
+            f"(versão esperada: {expected_version}). Recarregue e tente novamente.",
+            code="precondition_failed",
+        )
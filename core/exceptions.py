@@ -6,7 +6,8 @@ que todas as respostas de erro sigam um formato JSON consistente,
 facilitando o consumo pela frontend e debugging.
 
 Também traduz exceções de domínio (core.domain) em respostas HTTP
-adequadas, mantendo a camada de serviço desacoplada do protocolo HTTP.
+adequadas, mantendo a camada de serviço desacoplada do protocolo HTTP,
+e estouros de deadline (core.deadline) em 504.
 """
 
 import logging
@@ -15,10 +16,12 @@ from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.views import exception_handler
 
+from core.deadline import DeadlineExceeded, is_query_canceled
 from core.domain import (
     ConflictException,
     DomainException,
     NotFoundException,
+    PreconditionFailedException,
     ValidationException,
 )
 
@@ -34,8 +37,23 @@ def custom_exception_handler(exc, context):
     - ValidationException → 400 Bad Request
     - NotFoundException → 404 Not Found
     - ConflictException → 409 Conflict
+    - PreconditionFailedException → 412 Precondition Failed
     - DomainException → 422 Unprocessable Entity
+    - DeadlineExceeded / statement_timeout do PostgreSQL → 504 Gateway Timeout
     """
+    if isinstance(exc, DeadlineExceeded) or is_query_canceled(exc):
+        error_data = {
+            "error": True,
+            "status_code": 504,
+            "code": "deadline_exceeded",
+            "message": "A requisição excedeu o tempo limite.",
+            "details": {},
+        }
+        logger.warning(
+            "Deadline excedido: %s | View: %s", exc, context.get("view", "unknown")
+        )
+        return Response(error_data, status=status.HTTP_504_GATEWAY_TIMEOUT)
+
     # Primeiro, tentar tratar exceções de domínio
     if isinstance(exc, NotFoundException):
         error_data = {
@@ -59,6 +77,17 @@ def custom_exception_handler(exc, context):
         logger.warning("Domínio: %s", exc.message)
         return Response(error_data, status=status.HTTP_409_CONFLICT)
 
+    if isinstance(exc, PreconditionFailedException):
+        error_data = {
+            "error": True,
+            "status_code": 412,
+            "code": exc.code,
+            "message": exc.message,
+            "details": {},
+        }
+        logger.warning("Domínio: %s", exc.message)
+        return Response(error_data, status=status.HTTP_412_PRECONDITION_FAILED)
+
     if isinstance(exc, ValidationException):
         error_data = {
             "error": True,
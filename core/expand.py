@@ -0,0 +1,63 @@
+"""
+Expansão opt-in de relações: `?expand=`.
+
+Decisão técnica: O detalhe de uma consulta sempre trazia o profissional
+completo aninhado, o que custava um JOIN e a serialização do profissional
+em toda leitura e escrita, mesmo para clientes que só usam o id. Agora a
+resposta padrão leva só a chave estrangeira, e `?expand=profissional`
+inclui o objeto aninhado. Em um único objeto ele vem do `select_related`;
+em listagens, de uma única busca em lote pelos ids da página (`in_bulk`),
+sem JOIN nem N+1.
+
+Os nomes aceitos vêm de `Meta.expandable_fields` do serializer da action
+(ver core.serializers.ExpandableFieldsMixin); nomes desconhecidos
+resultam em 400.
+"""
+
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import OpenApiParameter
+
+from core.domain import ValidationException
+from core.sparse_fields import split_param
+
+EXPAND_PARAM = "expand"
+
+EXPAND_PARAMETER = OpenApiParameter(
+    EXPAND_PARAM,
+    OpenApiTypes.STR,
+    description="Relações a incluir aninhadas, separadas por vírgula "
+    "(ex: profissional).",
+)
+
+
+class ExpandMixin:
+    """Mixin de viewsets: lê `?expand=` e o repassa ao contexto do serializer."""
+
+    @property
+    def expand(self):
+        """Nomes pedidos em `?expand=` (frozenset, vazio por padrão)."""
+        if not hasattr(self, "_expand"):
+            self._expand = self._parse_expand()
+        return self._expand
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context["expand"] = self.expand
+        return context
+
+    def _parse_expand(self):
+        request = getattr(self, "request", None)
+        if request is None:
+            return frozenset()
+        names = split_param(request.query_params.get(EXPAND_PARAM, ""))
+        if not names:
+            return frozenset()
+
+        meta = getattr(self.get_serializer_class(), "Meta", None)
+        allowed = getattr(meta, "expandable_fields", {})
+        unknown = sorted(set(names) - set(allowed))
+        if unknown:
+            raise ValidationException(
+                f"Expansões desconhecidas: {', '.join(unknown)}.", field=EXPAND_PARAM
+            )
+        return frozenset(names)
@@ -0,0 +1,254 @@
+"""
+Cache de fragmentos serializados (representações de instâncias).
+
+Decisão técnica: O mesmo profissional é serializado de novo em cada
+detalhe de consulta expandido, em cada detalhe de profissional e em cada
+linha de listagem, sempre passando pelos campos do DRF. A representação
+pronta (dict) fica em cache com a chave
+
+    (serializer + campos, id, updated_at)
+
+Como `updated_at` muda a cada escrita (inclusive no UPDATE condicional de
+core.concurrency), uma alteração gera uma chave nova e a entrada antiga
+simplesmente deixa de ser usada: não há invalidação explícita.
+
+Duas camadas: um LRU limitado por worker (FRAGMENT_CACHE_LOCAL_SIZE), sem
+serialização nem rede, na frente do cache do Django
+(FRAGMENT_CACHE_TTL_SECONDS), compartilhado entre workers quando o backend
+é compartilhado. Listagens buscam as entradas da página de uma vez
+(`get_many`) antes de montar as linhas.
+
+Campos que não dependem só da linha (anotações como `total_consultas`)
+ficam fora do fragmento (`Meta.fragment_exclude`) e são calculados a cada
+resposta. Instâncias sem `updated_at` carregado (`.only()`) não usam o
+cache, para não disparar a carga do campo adiado.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.fields import SkipField
+from rest_framework.relations import PKOnlyObject
+
+from core.serializers import TimedListSerializer
+
+_KEY_PREFIX = "fragment"
+
+
+class FragmentCache:
+    """
+    Fragmentos serializados em duas camadas: LRU do worker + cache do Django.
+
+    Configuração (settings):
+    - FRAGMENT_CACHE_ENABLED: liga o cache nos serializers
+    - FRAGMENT_CACHE_LOCAL_SIZE: entradas no LRU do worker (0 desliga)
+    - FRAGMENT_CACHE_TTL_SECONDS: validade no cache do Django (0 desliga)
+    """
+
+    _instance = None
+    _lock = threading.Lock()
+
+    def __new__(cls):
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = super().__new__(cls)
+                    cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self):
+        if self._initialized:
+            return
+        self._initialized = True
+        self._entries = OrderedDict()
+        self._local_hits = 0
+        self._shared_hits = 0
+        self._misses = 0
+        self._data_lock = threading.Lock()
+
+    @property
+    def local_size(self):
+        return getattr(settings, "FRAGMENT_CACHE_LOCAL_SIZE", 0)
+
+    @property
+    def shared_ttl(self):
+        return getattr(settings, "FRAGMENT_CACHE_TTL_SECONDS", 0)
+
+    def get_many(self, keys):
+        """Retorna {chave: fragmento} das chaves em cache (LRU e depois Django)."""
+        found = {}
+        missing = []
+        with self._data_lock:
+            for key in keys:
+                fragment = self._entries.get(key)
+                if fragment is None:
+                    missing.append(key)
+                    continue
+                self._entries.move_to_end(key)
+                found[key] = fragment
+            self._local_hits += len(found)
+
+        shared = cache.get_many(missing) if missing and self.shared_ttl > 0 else {}
+        with self._data_lock:
+            self._shared_hits += len(shared)
+            self._misses += len(missing) - len(shared)
+        for key, fragment in shared.items():
+            self._store_local(key, fragment)
+        found.update(shared)
+        return found
+
+    def get(self, key):
+        return self.get_many([key]).get(key)
+
+    def set_many(self, fragments):
+        """Grava {chave: fragmento} nas duas camadas."""
+        for key, fragment in fragments.items():
+            self._store_local(key, fragment)
+        if fragments and self.shared_ttl > 0:
+            cache.set_many(fragments, self.shared_ttl)
+
+    def set(self, key, fragment):
+        self.set_many({key: fragment})
+
+    def stats(self):
+        with self._data_lock:
+            return {
+                "enabled": getattr(settings, "FRAGMENT_CACHE_ENABLED", False),
+                "size": len(self._entries),
+                "max_size": self.local_size,
+                "local_hits": self._local_hits,
+                "shared_hits": self._shared_hits,
+                "misses": self._misses,
+            }
+
+    def reset(self):
+        """Limpa o LRU do worker e os contadores (útil para testes)."""
+        with self._data_lock:
+            self._entries.clear()
+            self._local_hits = 0
+            self._shared_hits = 0
+            self._misses = 0
+
+    def _store_local(self, key, fragment):
+        max_size = self.local_size
+        if max_size <= 0:
+            return
+        with self._data_lock:
+            self._entries[key] = fragment
+            self._entries.move_to_end(key)
+            while len(self._entries) > max_size:
+                self._entries.popitem(last=False)
+
+
+class FragmentCacheMixin:
+    """
+    Mixin de ModelSerializer: `to_representation` a partir do cache de
+    fragmentos. Use com `Meta.list_serializer_class = FragmentListSerializer`
+    para buscar os fragmentos de uma listagem de uma vez.
+    """
+
+    # Colunas que a chave exige carregadas (ver core.sparse_fields)
+    fragment_columns = ("updated_at",)
+
+    def fragment_key(self, instance):
+        """Chave do fragmento, ou None se a instância não pode usar o cache."""
+        if not getattr(settings, "FRAGMENT_CACHE_ENABLED", False):
+            return None
+        if instance.pk is None or "updated_at" in instance.get_deferred_fields():
+            return None
+        if instance.updated_at is None:
+            return None
+        updated_at = int(instance.updated_at.timestamp() * 1_000_000)
+        return f"{_KEY_PREFIX}:{self._fragment_variant()}:{instance.pk}:{updated_at}"
+
+    # Preenchidos pelo FragmentListSerializer durante uma listagem
+    _prefetched_fragments = None
+    _pending_fragments = None
+
+    def to_representation(self, instance):
+        key = self.fragment_key(instance)
+        if key is None:
+            return super().to_representation(instance)
+
+        if self._prefetched_fragments is not None:
+            fragment = self._prefetched_fragments.get(key)
+        else:
+            fragment = FragmentCache().get(key)
+
+        if fragment is None:
+            representation = super().to_representation(instance)
+            excluded = self._fragment_exclude()
+            fragment = {
+                name: value
+                for name, value in representation.items()
+                if name not in excluded
+            }
+            if self._pending_fragments is not None:
+                self._pending_fragments[key] = fragment
+            else:
+                FragmentCache().set(key, fragment)
+            return representation
+
+        representation = {}
+        for field in self._readable_fields:
+            name = field.field_name
+            if name in fragment:
+                representation[name] = fragment[name]
+                continue
+            # Campo fora do fragmento: mesma lógica do Serializer do DRF
+            try:
+                attribute = field.get_attribute(instance)
+            except SkipField:
+                continue
+            check_for_none = (
+                attribute.pk if isinstance(attribute, PKOnlyObject) else attribute
+            )
+            representation[name] = (
+                None if check_for_none is None else field.to_representation(attribute)
+            )
+        return representation
+
+    def _fragment_exclude(self):
+        return set(getattr(self.Meta, "fragment_exclude", ()))
+
+    def _fragment_variant(self):
+        # Sparse fieldsets e ?expand= mudam os campos: cada conjunto é uma variante
+        variant = getattr(self, "_fragment_variant_cache", None)
+        if variant is None:
+            names = ",".join(self.fields)
+            digest = hashlib.sha1(names.encode()).hexdigest()[:10]
+            variant = f"{type(self).__name__}:{digest}"
+            self._fragment_variant_cache = variant
+        return variant
+
+
+class FragmentListSerializer(TimedListSerializer):
+    """
+    ListSerializer que busca os fragmentos da página de uma vez (`get_many`)
+    e grava os que faltavam também de uma vez (`set_many`).
+    """
+
+    def to_representation(self, data):
+        items = list(data.all() if hasattr(data, "all") else data)
+        child = self.child
+        keys = [key for key in (child.fragment_key(item) for item in items) if key]
+        if not keys:
+            return super().to_representation(items)
+
+        child._prefetched_fragments = FragmentCache().get_many(keys)
+        child._pending_fragments = {}
+        try:
+            representation = super().to_representation(items)
+            FragmentCache().set_many(child._pending_fragments)
+        finally:
+            child._prefetched_fragments = None
+            child._pending_fragments = None
+        return representation
+
+
+def fragment_cache_stats():
+    """Estatísticas do cache de fragmentos deste worker (exposto em /api/metrics/)."""
+    return FragmentCache().stats()
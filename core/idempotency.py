@@ -0,0 +1,155 @@
+"""
+Suporte ao header Idempotency-Key nos endpoints de criação.
+
+Decisão técnica: Clientes móveis em redes instáveis repetem o POST quando a
+resposta se perde, criando registros duplicados. Com `Idempotency-Key`, a
+primeira requisição reserva a chave (linha em IdempotencyKey sem status),
+executa a criação e grava status e corpo da resposta; repetições com a
+mesma chave recebem a resposta gravada, com `Idempotent-Replayed: true`,
+sem executar o serviço de novo.
+
+- Duplicatas concorrentes: a restrição única faz só uma reservar a chave;
+  as demais recebem 409 enquanto a original não termina.
+- Reserva com prazo (IDEMPOTENCY_IN_PROGRESS_TIMEOUT_SECONDS): se o worker
+  morre no meio, uma repetição depois do prazo assume a chave, em vez de
+  receber 409 até a chave expirar.
+- A criação e a gravação da resposta ficam na mesma transação, condicionada
+  a ainda deter a reserva: uma queda entre as duas desfaz a criação, e uma
+  reserva assumida por outra requisição faz esta desistir (409).
+- Mesma chave com outro corpo: 422 (provável bug do cliente).
+- Só respostas 2xx são gravadas: em erro a reserva é removida e o cliente
+  pode corrigir e repetir com a mesma chave.
+- Chaves valem por IDEMPOTENCY_KEY_TTL_HOURS (comando
+  purge_idempotency_keys remove as expiradas).
+"""
+
+import hashlib
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework.response import Response
+
+from core.domain import (
+    IdempotencyKeyInProgressException,
+    IdempotencyKeyReusedException,
+    ValidationException,
+)
+from core.models import IdempotencyKey
+
+HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+MAX_KEY_LENGTH = 255
+
+
+def _request_hash(request):
+    body = json.dumps(request.data, sort_keys=True, cls=DjangoJSONEncoder)
+    return hashlib.sha256(
+        f"{request.method}:{request.path}:{body}".encode()
+    ).hexdigest()
+
+
+def _owner(request):
+    user = request.user
+    return str(user.pk) if user and user.is_authenticated else "anonymous"
+
+
+class IdempotentCreateMixin:
+    """
+    Mixin de viewsets: torna `create` idempotente com o header
+    Idempotency-Key. Sem o header, o comportamento é o padrão.
+    """
+
+    def create(self, request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if not key:
+            return super().create(request, *args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            raise ValidationException(
+                f"{HEADER} deve ter no máximo {MAX_KEY_LENGTH} caracteres.",
+                field=HEADER,
+            )
+
+        record = self._reserve_key(request, key)
+        if record.status_code is not None:
+            response = Response(record.response_body, status=record.status_code)
+            response[REPLAYED_HEADER] = "true"
+            return response
+
+        # Só altera a linha quem ainda detém a reserva (mesmo locked_until)
+        held = IdempotencyKey.objects.filter(
+            pk=record.pk, status_code__isnull=True, locked_until=record.locked_until
+        )
+        try:
+            with transaction.atomic():
+                response = super().create(request, *args, **kwargs)
+                if 200 <= response.status_code < 300:
+                    stored = held.update(
+                        status_code=response.status_code,
+                        response_body=response.data,
+                        locked_until=None,
+                    )
+                    if not stored:
+                        # Reserva vencida e assumida: desfaz esta criação
+                        raise IdempotencyKeyInProgressException(key)
+        except Exception:
+            held.delete()
+            raise
+
+        if not 200 <= response.status_code < 300:
+            held.delete()
+        return response
+
+    def _reserve_key(self, request, key):
+        """Reserva a chave ou devolve o registro existente (para replay)."""
+        lookup = {
+            "scope": f"{self.basename}:create",
+            "owner": _owner(request),
+            "key": key,
+        }
+        request_hash = _request_hash(request)
+        ttl = timedelta(hours=getattr(settings, "IDEMPOTENCY_KEY_TTL_HOURS", 24))
+        lease = timedelta(
+            seconds=getattr(settings, "IDEMPOTENCY_IN_PROGRESS_TIMEOUT_SECONDS", 150)
+        )
+
+        for _ in range(2):
+            now = timezone.now()
+            try:
+                with transaction.atomic():
+                    return IdempotencyKey.objects.create(
+                        **lookup,
+                        request_hash=request_hash,
+                        locked_until=now + lease,
+                        expires_at=now + ttl,
+                    )
+            except IntegrityError:
+                existing = IdempotencyKey.objects.filter(**lookup).first()
+
+            if existing is None:
+                # Reserva removida entre o insert e a leitura: tenta de novo
+                continue
+            if existing.expires_at <= timezone.now():
+                existing.delete()
+                continue
+            if existing.request_hash != request_hash:
+                raise IdempotencyKeyReusedException(key)
+            if existing.status_code is not None:
+                return existing
+            if existing.locked_until and existing.locked_until > now:
+                raise IdempotencyKeyInProgressException(key)
+
+            # Reserva vencida (worker morto): assume a chave se ninguém o fez antes
+            taken = IdempotencyKey.objects.filter(
+                pk=existing.pk,
+                status_code__isnull=True,
+                locked_until=existing.locked_until,
+            ).update(locked_until=now + lease)
+            if taken:
+                existing.locked_until = now + lease
+                return existing
+
+        raise IdempotencyKeyInProgressException(key)
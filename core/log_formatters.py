@@ -0,0 +1,40 @@
+"""
+Formatters de logging.
+
+Decisão técnica: Logs de acesso em JSON (um objeto por linha) podem ser
+consultados por campo (rota, status, duração) no CloudWatch Logs Insights
+ou no Loki, sem regex sobre texto livre. Os campos estruturados chegam no
+record via `extra={"access": {...}}`. A serialização só acontece quando
+algum handler de fato emite o record.
+"""
+
+import json
+import logging
+from datetime import datetime, timezone
+
+
+class JSONFormatter(logging.Formatter):
+    """
+    Formata cada record como um objeto JSON em uma linha.
+
+    Campos fixos: timestamp (ISO 8601, UTC), level, logger, message e
+    correlation_id. Os campos de `record.access`, quando presentes, entram
+    no nível raiz do objeto.
+    """
+
+    def format(self, record):
+        data = {
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc)
+            .isoformat(timespec="milliseconds")
+            .replace("+00:00", "Z"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "correlation_id": getattr(record, "correlation_id", "-"),
+        }
+        access = getattr(record, "access", None)
+        if access:
+            data.update(access)
+        if record.exc_info:
+            data["exception"] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False, default=str)
@@ -0,0 +1,251 @@
+"""
+Handlers de logging: pipeline não bloqueante e rotação segura entre processos.
+
+Decisão técnica: Com os handlers padrão, cada log de acesso formata a
+mensagem e escreve no console e no arquivo dentro da thread da requisição.
+No modo `LOG_PIPELINE=queue`, os loggers usam o QueueLogHandler, que apenas
+enfileira o record; um único writer por worker (QueueListener) faz a
+formatação e o I/O nos handlers de destino (console, file_access, ...).
+
+O que depende do contexto da requisição (filtro de Correlation ID) roda
+antes de enfileirar, na thread da requisição; o resto roda no writer.
+
+Com a fila cheia, a política LOG_QUEUE_FULL_POLICY decide entre descartar
+(`drop`, padrão: a requisição nunca espera pelo log) ou esperar até
+LOG_QUEUE_BLOCK_TIMEOUT_SECONDS (`block`). Descartes são contados e
+expostos em /api/metrics/.
+
+Os workers do gunicorn escrevem nos mesmos arquivos, então a rotação usa o
+ConcurrentRotatingFileHandler (lock de arquivo entre processos), nos dois
+modos.
+"""
+
+import atexit
+import copy
+import logging
+import os
+import queue
+import threading
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+try:
+    import fcntl
+except ImportError:  # Windows: sem lock entre processos
+    fcntl = None
+
+
+def _get_handler_by_name(name):
+    getter = getattr(logging, "getHandlerByName", None)  # Python 3.12+
+    if getter is not None:
+        return getter(name)
+    return logging._handlers.get(name)
+
+
+def _resolve_targets(names):
+    handlers = []
+    for name in names:
+        handler = _get_handler_by_name(name)
+        if handler is None:
+            raise ValueError(
+                f"Handler de destino '{name}' não configurado antes do "
+                "QueueLogHandler (o dictConfig cria handlers em ordem alfabética)"
+            )
+        handlers.append(handler)
+    return tuple(handlers)
+
+
+class _DispatchingListener(QueueListener):
+    """QueueListener que entrega cada record só aos handlers de destino dele."""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue, respect_handler_level=True)
+
+    def handle(self, record):
+        for handler in record.log_targets:
+            if record.levelno >= handler.level:
+                handler.handle(record)
+
+
+class LogPipeline:
+    """Fila e writer únicos do processo, compartilhados por todos os loggers."""
+
+    def __init__(self, maxsize):
+        self.queue = queue.Queue(maxsize)
+        self.listener = _DispatchingListener(self.queue)
+        self.dropped = 0
+        self._dropped_lock = threading.Lock()
+
+    def start(self):
+        self.listener.start()
+
+    def stop(self):
+        """Esvazia a fila e encerra o writer (usado no atexit)."""
+        if self.listener._thread is None:
+            return
+        self.queue.put(self.listener._sentinel)
+        self.listener._thread.join()
+        self.listener._thread = None
+
+    def flush(self):
+        """Bloqueia até o writer processar todos os records enfileirados."""
+        self.queue.join()
+
+    def record_drop(self):
+        with self._dropped_lock:
+            self.dropped += 1
+
+    def stats(self):
+        return {"queue_size": self.queue.qsize(), "dropped": self.dropped}
+
+
+_pipeline = None
+_pipeline_lock = threading.Lock()
+
+
+def get_pipeline(maxsize=10000):
+    """
+    Retorna o pipeline do processo atual, iniciando o writer na primeira vez.
+
+    O writer é iniciado sob demanda (e não na configuração do logging) para
+    que cada worker do gunicorn, criado por fork, tenha a sua própria thread.
+    """
+    global _pipeline
+    if _pipeline is None:
+        with _pipeline_lock:
+            if _pipeline is None:
+                pipeline = LogPipeline(maxsize)
+                pipeline.start()
+                _pipeline = pipeline
+    return _pipeline
+
+
+def pipeline_stats():
+    """Estatísticas do pipeline, ou None no modo síncrono."""
+    return _pipeline.stats() if _pipeline is not None else None
+
+
+def _reset_after_fork():
+    # A thread do writer não sobrevive ao fork; o filho cria o seu pipeline
+    global _pipeline, _pipeline_lock
+    _pipeline = None
+    _pipeline_lock = threading.Lock()
+
+
+def _stop_pipeline():
+    if _pipeline is not None:
+        _pipeline.stop()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+atexit.register(_stop_pipeline)
+
+
+class QueueLogHandler(QueueHandler):
+    """
+    Handler que enfileira records para os handlers `targets` (por nome).
+
+    Configurado via `"()"` no LOGGING para não acionar o tratamento
+    especial que o dictConfig do Python 3.12 dá a subclasses de QueueHandler.
+    Os destinos são resolvidos na construção e mantidos por referência forte:
+    o registro de handlers do logging é fraco, e handlers que não estão
+    ligados a nenhum logger seriam coletados.
+    """
+
+    def __init__(self, targets, maxsize=10000, full_policy="drop", block_timeout=1.0):
+        super().__init__(None)
+        self.targets = _resolve_targets(targets)
+        self.maxsize = maxsize
+        self.full_policy = full_policy
+        self.block_timeout = block_timeout
+
+    def prepare(self, record):
+        """
+        Congela a mensagem sem formatá-la.
+
+        Ao contrário do QueueHandler padrão, não aplica o formatter aqui:
+        a formatação fica para o writer. Só `msg % args` é resolvido, para
+        que objetos mutáveis nos args não mudem antes da escrita.
+        """
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        record.log_targets = self.targets
+        return record
+
+    def enqueue(self, record):
+        pipeline = get_pipeline(self.maxsize)
+        try:
+            pipeline.queue.put_nowait(record)
+        except queue.Full:
+            if self.full_policy == "block":
+                try:
+                    pipeline.queue.put(record, timeout=self.block_timeout)
+                    return
+                except queue.Full:
+                    pass
+            pipeline.record_drop()
+
+
+class ConcurrentRotatingFileHandler(RotatingFileHandler):
+    """
+    RotatingFileHandler seguro com vários processos escrevendo no arquivo.
+
+    Cada escrita (e a eventual rotação) acontece sob um `flock` em
+    `<arquivo>.lock`. Se outro processo rotacionou o arquivo, o handler
+    reabre o arquivo atual antes de escrever, em vez de continuar gravando
+    no backup renomeado.
+    """
+
+    def __init__(self, filename, *args, **kwargs):
+        super().__init__(filename, *args, **kwargs)
+        self._lock_path = f"{self.baseFilename}.lock"
+        self._lock_file = None
+        self._lock_pid = None
+
+    def emit(self, record):
+        try:
+            self._acquire_file_lock()
+            try:
+                self._reopen_if_rotated()
+                super().emit(record)
+            finally:
+                self._release_file_lock()
+        except Exception:
+            self.handleError(record)
+
+    def _acquire_file_lock(self):
+        if fcntl is None:
+            return
+        # Locks de flock são compartilhados entre processos após um fork
+        if self._lock_file is None or self._lock_pid != os.getpid():
+            self._lock_file = open(self._lock_path, "a")
+            self._lock_pid = os.getpid()
+        fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+
+    def _release_file_lock(self):
+        if fcntl is not None and self._lock_file is not None:
+            fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+
+    def _reopen_if_rotated(self):
+        if self.stream is None:
+            return
+        try:
+            current = os.stat(self.baseFilename)
+        except FileNotFoundError:
+            current = None
+        opened = os.fstat(self.stream.fileno())
+        if current is None or (current.st_ino, current.st_dev) != (
+            opened.st_ino,
+            opened.st_dev,
+        ):
+            self.stream.close()
+            self.stream = self._open()
+
+    def close(self):
+        with self.lock:
+            if self._lock_file is not None:
+                self._lock_file.close()
+                self._lock_file = None
+            super().close()
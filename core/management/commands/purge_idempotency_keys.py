@@ -0,0 +1,28 @@
+"""
+Remove chaves de idempotência expiradas.
+
+Decisão técnica: Depois de IDEMPOTENCY_KEY_TTL_HOURS a chave não é mais
+reaproveitada (uma repetição vira uma nova criação), então a linha e o
+corpo da resposta guardado podem ser descartados. Pensado para rodar
+periodicamente, junto com os demais comandos purge_*.
+
+Uso:
+    python manage.py purge_idempotency_keys
+"""
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.models import IdempotencyKey
+
+
+class Command(BaseCommand):
+    help = "Remove chaves de idempotência cuja validade já passou."
+
+    def handle(self, *args, **options):
+        deleted, _ = IdempotencyKey.objects.filter(
+            expires_at__lte=timezone.now()
+        ).delete()
+        self.stdout.write(
+            self.style.SUCCESS(f"{deleted} chave(s) de idempotência removida(s).")
+        )
@@ -0,0 +1,30 @@
+"""
+Remove tokens revogados já expirados.
+
+Decisão técnica: Depois da expiração, o próprio JWT é recusado pela
+validação de `exp`, então a linha em RevokedToken não protege mais nada e
+só aumenta o Bloom filter reconstruído por cada worker. Pensado para rodar
+periodicamente (cron / tarefa agendada do ECS).
+
+Uso:
+    python manage.py purge_revoked_tokens
+"""
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.models import RevokedToken
+
+
+class Command(BaseCommand):
+    help = "Remove tokens revogados cuja expiração já passou."
+
+    def handle(self, *args, **options):
+        deleted, _ = RevokedToken.objects.filter(
+            expires_at__lte=timezone.now()
+        ).delete()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{deleted} token(s) revogado(s) expirado(s) removido(s)."
+            )
+        )
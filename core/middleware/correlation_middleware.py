@@ -5,6 +5,13 @@ Decisão técnica: Cada requisição recebe um ID único (UUID4) que é propagad
 nos logs e retornado no header da resposta. Isso permite rastrear uma
 requisição de ponta a ponta em ambientes distribuídos.
 
+O ID é armazenado em um `contextvars.ContextVar` (e não em threading.local):
+sob ASGI várias requisições compartilham a mesma thread do event loop, e o
+Django executa código síncrono em threads de `sync_to_async`. ContextVars são
+isolados por requisição nos dois modelos e propagados automaticamente para
+`sync_to_async`/`asyncio.create_task`. Para executores e threads próprias,
+use os helpers de `core.utils.context`.
+
 Integração:
 - Logs: O correlation_id é incluído em todas as mensagens de log
 - Response Headers: Retornado como X-Correlation-ID
@@ -12,18 +19,20 @@ Integração:
 """
 
 import logging
-import threading
 import uuid
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
 
 logger = logging.getLogger("core.middleware")
 
-# Thread-local storage para o correlation ID
-_correlation_id = threading.local()
+# Context-local storage para o correlation ID
+_correlation_id = ContextVar("correlation_id", default=None)
 
 
 def get_correlation_id():
-    """Retorna o correlation ID da requisição atual (thread-safe)."""
-    return getattr(_correlation_id, "value", None)
+    """Retorna o correlation ID da requisição atual (seguro para threads e async)."""
+    return _correlation_id.get()
 
 
 class CorrelationIdMiddleware:
@@ -36,32 +45,54 @@ class CorrelationIdMiddleware:
     O ID é disponibilizado via:
     - `get_correlation_id()` para uso em qualquer parte do código
     - Header `X-Correlation-ID` na resposta
+
+    Suporta execução síncrona (WSGI) e assíncrona (ASGI) sem adaptação.
     """
 
     HEADER_NAME = "X-Correlation-ID"
     META_KEY = "HTTP_X_CORRELATION_ID"
 
+    sync_capable = True
+    async_capable = True
+
     def __init__(self, get_response):
         self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
 
     def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+
+        token = self._bind(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            _correlation_id.reset(token)
+        return self._add_header(request, response)
+
+    async def __acall__(self, request):
+        token = self._bind(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _correlation_id.reset(token)
+        return self._add_header(request, response)
+
+    def _bind(self, request):
         # Reutilizar ID do upstream ou gerar novo
-        correlation_id = request.META.get(self.META_KEY, str(uuid.uuid4()))
-
-        # Armazenar no thread-local
-        _correlation_id.value = correlation_id
+        correlation_id = request.META.get(self.META_KEY) or str(uuid.uuid4())
 
         # Disponibilizar no request para views/serializers
         request.correlation_id = correlation_id
 
-        response = self.get_response(request)
+        # Armazenar no contexto da requisição
+        return _correlation_id.set(correlation_id)
 
+    def _add_header(self, request, response):
         # Incluir no header da resposta
-        response[self.HEADER_NAME] = correlation_id
-
-        # Limpar thread-local
-        _correlation_id.value = None
-
+        response[self.HEADER_NAME] = request.correlation_id
         return response
 
 
@@ -78,5 +109,8 @@ class CorrelationIdFilter(logging.Filter):
     """
 
     def filter(self, record):
-        record.correlation_id = get_correlation_id() or "-"
+        # Records que passaram pelo QueueLogHandler já trazem o ID capturado
+        # na thread da requisição; o writer da fila não tem esse contexto.
+        if getattr(record, "correlation_id", None) in (None, "-"):
+            record.correlation_id = get_correlation_id() or "-"
         return True
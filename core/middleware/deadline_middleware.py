@@ -0,0 +1,99 @@
+"""
+Middleware de deadline por requisição.
+
+Decisão técnica: O orçamento de tempo depende da rota (ex: a listagem de
+consultas, com busca, tem prazo menor que o padrão), então o middleware
+resolve a rota por conta própria na entrada. O deadline é iniciado e
+encerrado no próprio `__call__`/`__acall__`: em ASGI, hooks sync como
+`process_view` rodam via sync_to_async em uma cópia do contexto, e o token
+da ContextVar criado lá não pode ser desfeito no contexto do middleware.
+
+O cliente pode pedir um prazo menor com `X-Request-Timeout` (em segundos);
+valores maiores que o orçamento da rota são limitados a ele.
+
+Ver core.deadline para a propagação ao banco (statement_timeout).
+"""
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from django.conf import settings
+from django.urls import Resolver404, resolve
+
+from core.deadline import (
+    aend_deadline,
+    end_deadline,
+    enforce_deadline,
+    start_deadline,
+)
+from core.utils.db import ensure_execute_wrappers, register_execute_wrapper
+
+register_execute_wrapper(enforce_deadline)
+
+
+class DeadlineMiddleware:
+    """
+    Middleware que aplica um deadline a cada requisição.
+
+    Configuração (settings):
+    - DEADLINE_DEFAULT_SECONDS: orçamento padrão (0 desliga)
+    - DEADLINE_ROUTE_SECONDS: orçamento por nome de rota
+    """
+
+    HEADER_META_KEY = "HTTP_X_REQUEST_TIMEOUT"
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+
+        ensure_execute_wrappers()
+        token = self._start(request)
+        try:
+            return self.get_response(request)
+        finally:
+            if token is not None:
+                end_deadline(token)
+
+    async def __acall__(self, request):
+        token = self._start(request)
+        try:
+            return await self.get_response(request)
+        finally:
+            if token is not None:
+                await aend_deadline(token)
+
+    def _start(self, request):
+        budget = self._budget(request, self._route_name(request))
+        return start_deadline(budget) if budget else None
+
+    def _route_name(self, request):
+        try:
+            match = resolve(request.path_info, getattr(request, "urlconf", None))
+        except Resolver404:
+            return None
+        return match.view_name
+
+    def _budget(self, request, view_name):
+        """Orçamento da rota, reduzido pelo X-Request-Timeout do cliente."""
+        route_budgets = getattr(settings, "DEADLINE_ROUTE_SECONDS", {})
+        budget = route_budgets.get(
+            view_name, getattr(settings, "DEADLINE_DEFAULT_SECONDS", 0)
+        )
+
+        requested = request.META.get(self.HEADER_META_KEY)
+        if requested:
+            try:
+                requested = float(requested)
+            except ValueError:
+                requested = None
+            if requested and requested > 0:
+                budget = min(budget, requested) if budget else requested
+        return budget
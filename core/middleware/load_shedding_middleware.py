@@ -0,0 +1,147 @@
+"""
+Middleware de load shedding adaptativo.
+
+Decisão técnica: Sob rajadas de tráfego, os workers enfileiram requisições
+até o timeout do gunicorn e todas as rotas degradam juntas. Rejeitar cedo
+(503 + Retry-After) uma parte das requisições de baixa prioridade mantém a
+latência das demais e dá ao cliente um sinal claro para tentar de novo.
+
+Sinais de sobrecarga (por worker, via MetricsCollector):
+- Requisições em andamento acima de LOAD_SHEDDING_MAX_IN_FLIGHT: rejeita
+  as de baixa prioridade; acima de LOAD_SHEDDING_HARD_MAX_IN_FLIGHT,
+  rejeita todas.
+- p95 recente (janela LOAD_SHEDDING_WINDOW_SECONDS) acima de
+  LOAD_SHEDDING_TARGET_P95_MS: rejeita as de baixa prioridade com
+  probabilidade proporcional ao excesso, para que parte do tráfego continue
+  alimentando a medição e o shedding se desligue sozinho quando a latência
+  normaliza.
+
+Com workers sync do gunicorn cada processo atende uma requisição por vez,
+então o sinal efetivo é a latência; o limite de requisições em andamento
+vale para workers com threads (gthread) ou ASGI.
+
+Prioridade: leituras (GET/HEAD/OPTIONS) são de baixa prioridade; escritas e
+autenticação só são rejeitadas no limite rígido. Os probes de saúde
+(LOAD_SHEDDING_EXEMPT_PATHS: liveness, readiness e o HEALTHCHECK do
+container) nunca são rejeitados.
+"""
+
+import json
+import logging
+import random
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from django.conf import settings
+from django.http import HttpResponse
+
+from core.middleware.metrics_middleware import MetricsCollector
+
+logger = logging.getLogger("core.middleware")
+
+LOW_PRIORITY_METHODS = ("GET", "HEAD", "OPTIONS")
+HIGH_PRIORITY_PREFIXES = ("/api/auth/",)
+
+
+class LoadSheddingMiddleware:
+    """
+    Middleware que rejeita requisições de baixa prioridade sob sobrecarga.
+
+    Deve vir logo após o CorrelationIdMiddleware, para que as respostas 503
+    tenham o X-Correlation-ID e o trabalho descartado seja o mínimo.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.collector = MetricsCollector()
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+
+        if self._bypass(request):
+            return self.get_response(request)
+
+        in_flight = self.collector.request_started()
+        try:
+            reason = self._shed_reason(request, in_flight)
+            if reason:
+                return self._reject(request, reason)
+            return self.get_response(request)
+        finally:
+            self.collector.request_finished()
+
+    async def __acall__(self, request):
+        if self._bypass(request):
+            return await self.get_response(request)
+
+        in_flight = self.collector.request_started()
+        try:
+            reason = self._shed_reason(request, in_flight)
+            if reason:
+                return self._reject(request, reason)
+            return await self.get_response(request)
+        finally:
+            self.collector.request_finished()
+
+    def _bypass(self, request):
+        if not getattr(settings, "LOAD_SHEDDING_ENABLED", False):
+            return True
+        return request.path in getattr(settings, "LOAD_SHEDDING_EXEMPT_PATHS", ())
+
+    def _shed_reason(self, request, in_flight):
+        """Retorna o motivo da rejeição, ou None para atender a requisição."""
+        if in_flight > settings.LOAD_SHEDDING_HARD_MAX_IN_FLIGHT:
+            return "hard_limit"
+
+        if not _is_low_priority(request):
+            return None
+
+        if in_flight > settings.LOAD_SHEDDING_MAX_IN_FLIGHT:
+            return "in_flight"
+
+        p95 = self.collector.recent_p95(settings.LOAD_SHEDDING_WINDOW_SECONDS)
+        target = settings.LOAD_SHEDDING_TARGET_P95_MS / 1000
+        if p95 is not None and p95 > target:
+            # 2x o alvo → rejeita tudo de baixa prioridade; 1.5x → metade
+            if random.random() < (p95 - target) / target:
+                return "latency"
+
+        return None
+
+    def _reject(self, request, reason):
+        self.collector.record_shed(reason)
+        retry_after = settings.LOAD_SHEDDING_RETRY_AFTER_SECONDS
+        logger.warning(
+            "Load shedding: %s %s rejeitada (%s)", request.method, request.path, reason
+        )
+
+        # Mesmo formato do custom_exception_handler
+        response = HttpResponse(
+            json.dumps(
+                {
+                    "error": True,
+                    "status_code": 503,
+                    "code": "overloaded",
+                    "message": "Servidor sobrecarregado. Tente novamente em instantes.",
+                    "details": {"reason": reason},
+                },
+                ensure_ascii=False,
+            ),
+            status=503,
+            content_type="application/json",
+        )
+        response["Retry-After"] = str(retry_after)
+        return response
+
+
+def _is_low_priority(request):
+    if request.method not in LOW_PRIORITY_METHODS:
+        return False
+    return not request.path.startswith(HIGH_PRIORITY_PREFIXES)
@@ -4,10 +4,28 @@ Middleware de logging de requisições HTTP.
 Decisão técnica: Implementar logging de acesso e erros diretamente
 no middleware para ter visibilidade completa de todas as requisições,
 independente da view. Isso permite monitoramento e auditoria.
+
+Cada acesso vira um record estruturado (campo `access`), serializado em
+JSON pelo handler file_access. Para reduzir I/O com muitas requisições
+por segundo, sucessos podem ser amostrados (ACCESS_LOG_SAMPLE_RATE);
+erros (status >= 400) e requisições lentas (ACCESS_LOG_SLOW_MS) são
+sempre registrados. Nada é montado se o record não for emitido.
+
+O usuário é lido depois da view: a DRF autentica (JWT) dentro dela e grava
+o usuário resolvido em `request.user`. Se a view não usou o usuário, ele só
+é carregado (sessão) quando o acesso vai de fato ser registrado.
 """
 
 import logging
-import time
+import random
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from django.conf import settings
+from django.utils.functional import SimpleLazyObject, empty
+
+from core.middleware.metrics_middleware import get_route
+from core.utils.timing import RequestTimings
 
 logger = logging.getLogger("core.middleware")
 
@@ -20,51 +38,137 @@ class RequestLoggingMiddleware:
     - Método HTTP, path, IP do cliente
     - Status code da resposta
     - Tempo de processamento
+    - Quantidade de queries SQL e tempo gasto no banco
     - Erros (status >= 400)
+
+    Também cria o `request.timings` (RequestTimings) compartilhado com o
+    MetricsMiddleware e, se SERVER_TIMING_ENABLED, adiciona o header
+    `Server-Timing` com a quebra por fase.
+
+    Suporta execução síncrona (WSGI) e assíncrona (ASGI) sem adaptação.
     """
 
+    sync_capable = True
+    async_capable = True
+
     def __init__(self, get_response):
         self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
 
     def __call__(self, request):
-        start_time = time.time()
-
-        # Captura informações da requisição
-        client_ip = self._get_client_ip(request)
-        method = request.method
-        path = request.get_full_path()
-        user = getattr(request, "user", None)
-        user_info = str(user) if user and user.is_authenticated else "anonymous"
-        correlation_id = getattr(request, "correlation_id", "-")
+        if self.async_mode:
+            return self.__acall__(request)
 
+        self._start(request)
         response = self.get_response(request)
+        duration, level = self._outcome(request, response)
+        # Lazy: a sessão só é consultada se o acesso for de fato logado
+        user = getattr(request, "user", None)
+        return self._finish(request, response, duration, level, user)
 
-        # Calcula tempo de processamento
-        duration = time.time() - start_time
-        status_code = response.status_code
+    async def __acall__(self, request):
+        self._start(request)
+        response = await self.get_response(request)
+        duration, level = self._outcome(request, response)
+        user = getattr(request, "user", None)
+        if level is not None and _is_unevaluated(user) and hasattr(request, "auser"):
+            # Carregar a sessão no event loop não é permitido: `auser()` é async
+            user = await request.auser()
+        return self._finish(request, response, duration, level, user)
 
-        # Log de acesso com correlation ID para rastreamento
-        log_message = (
-            f"{method} {path} | "
-            f"Status: {status_code} | "
-            f"User: {user_info} | "
-            f"IP: {client_ip} | "
-            f"Duration: {duration:.3f}s | "
-            f"CID: {correlation_id}"
-        )
+    def _start(self, request):
+        request.timings = RequestTimings()
 
+    def _outcome(self, request, response):
+        """Duração e nível do log de acesso (None se não será registrado)."""
+        duration = request.timings.elapsed()
+        status_code = response.status_code
         if status_code >= 500:
-            logger.error(log_message)
+            level = logging.ERROR
         elif status_code >= 400:
-            logger.warning(log_message)
+            level = logging.WARNING
         else:
-            logger.info(log_message)
+            level = logging.INFO
+
+        if self._should_log(status_code, duration) and logger.isEnabledFor(level):
+            return duration, level
+        return duration, None
+
+    def _finish(self, request, response, duration, level, user):
+        query_stats = getattr(request, "query_stats", None)
+        if level is not None:
+            self._log_access(
+                request, level, response.status_code, duration, user, query_stats
+            )
+
+        if getattr(settings, "SERVER_TIMING_ENABLED", False):
+            response["Server-Timing"] = request.timings.header_value(
+                duration, query_stats
+            )
 
         return response
 
+    def _should_log(self, status_code, duration):
+        """Erros e requisições lentas sempre; sucessos conforme a amostragem."""
+        if status_code >= 400:
+            return True
+        slow_ms = getattr(settings, "ACCESS_LOG_SLOW_MS", 1000)
+        if duration * 1000 >= slow_ms:
+            return True
+        sample_rate = getattr(settings, "ACCESS_LOG_SAMPLE_RATE", 1.0)
+        return sample_rate >= 1 or random.random() < sample_rate
+
+    def _log_access(self, request, level, status_code, duration, user, query_stats):
+        query_count = query_stats.count if query_stats else 0
+        db_time = query_stats.duration if query_stats else 0.0
+        method = request.method
+        path = request.get_full_path()
+        user_info = str(user) if user and user.is_authenticated else "anonymous"
+        client_ip = self._get_client_ip(request)
+        correlation_id = getattr(request, "correlation_id", "-")
+
+        # Mensagem em texto para o console; os campos estruturados vão em
+        # `access` e são serializados pelo JSONFormatter (file_access).
+        # A formatação com % só acontece se algum handler emitir o record.
+        logger.log(
+            level,
+            "%s %s | Status: %d | User: %s | IP: %s | Duration: %.3fs | "
+            "Queries: %d | DB: %.3fs | CID: %s",
+            method,
+            path,
+            status_code,
+            user_info,
+            client_ip,
+            duration,
+            query_count,
+            db_time,
+            correlation_id,
+            extra={
+                "access": {
+                    "method": method,
+                    "route": get_route(request),
+                    "path": path,
+                    "status": status_code,
+                    "duration_ms": round(duration * 1000, 2),
+                    "user": user_info,
+                    "ip": client_ip,
+                    "cid": correlation_id,
+                    "queries": query_count,
+                    "db_ms": round(db_time * 1000, 2),
+                }
+            },
+        )
+
     def _get_client_ip(self, request):
         """Obtém o IP real do cliente, considerando proxies."""
         x_forwarded_for = request.META.get("HTTP_X_FORWARDED_FOR")
         if x_forwarded_for:
             return x_forwarded_for.split(",")[0].strip()
         return request.META.get("REMOTE_ADDR", "unknown")
+
+
+def _is_unevaluated(user):
+    """Indica se `request.user` ainda é o lazy da sessão, nunca carregado."""
+    return isinstance(user, SimpleLazyObject) and user._wrapped is empty
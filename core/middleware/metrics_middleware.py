@@ -10,13 +10,18 @@ Métricas coletadas:
 - Latência média, p50, p95 e p99
 - Taxa de erros (4xx e 5xx)
 - Uptime da aplicação
+- Por rota: requisições, queries SQL, tempo de banco e suspeitas de N+1
+- Load shedding: requisições em andamento e rejeitadas por motivo
+- Throttling: verificações e rejeições por escopo
 """
 
 import logging
 import statistics
 import threading
 import time
-from collections import defaultdict
+from collections import defaultdict, deque
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
 
 logger = logging.getLogger("core.middleware")
 
@@ -50,11 +55,34 @@ class MetricsCollector:
         self._status_count = defaultdict(int)
         self._latencies = []
         self._error_count = 0
+        self._routes = defaultdict(_new_route_stats)
         self._max_latency_samples = 10000  # Limitar memória
+        # Latências recentes com timestamp, para o p95 da janela deslizante
+        self._recent = deque(maxlen=2000)
+        self._recent_p95_cache = (0.0, None)
+        self._in_flight = 0
+        self._shed_count = defaultdict(int)
+        self._throttle_checks = defaultdict(int)
+        self._throttled = defaultdict(int)
         self._data_lock = threading.Lock()
 
-    def record_request(self, method, path, status_code, duration):
-        """Registra uma requisição processada."""
+    def record_request(
+        self,
+        method,
+        path,
+        status_code,
+        duration,
+        route=None,
+        query_count=0,
+        db_time=0.0,
+        n_plus_one=False,
+    ):
+        """
+        Registra uma requisição processada.
+
+        `route` deve ser o nome da rota (ex: "consulta-detail"), e não o
+        path completo, para manter a cardinalidade das métricas limitada.
+        """
         with self._data_lock:
             self._request_count[method] += 1
             self._status_count[status_code] += 1
@@ -62,10 +90,22 @@ class MetricsCollector:
             if len(self._latencies) >= self._max_latency_samples:
                 self._latencies = self._latencies[-5000:]
             self._latencies.append(duration)
+            self._recent.append((time.monotonic(), duration))
 
             if status_code >= 400:
                 self._error_count += 1
 
+            if route is not None:
+                route_stats = self._routes[route]
+                route_stats["requests"] += 1
+                route_stats["queries"] += query_count
+                route_stats["max_queries"] = max(
+                    route_stats["max_queries"], query_count
+                )
+                route_stats["db_time"] += db_time
+                if n_plus_one:
+                    route_stats["n_plus_one"] += 1
+
     def get_metrics(self):
         """Retorna snapshot das métricas coletadas."""
         with self._data_lock:
@@ -99,40 +139,154 @@ class MetricsCollector:
                     else 0
                 ),
                 "latency": latency_stats,
+                "routes": {
+                    route: _summarize_route(route_stats)
+                    for route, route_stats in self._routes.items()
+                },
+                "load_shedding": {
+                    "in_flight": self._in_flight,
+                    "shed_total": sum(self._shed_count.values()),
+                    "shed_by_reason": dict(self._shed_count),
+                },
+                "throttling": {
+                    "checked_by_scope": dict(self._throttle_checks),
+                    "throttled_by_scope": dict(self._throttled),
+                },
             }
 
+    def recent_p95(self, window_seconds):
+        """
+        p95 (em segundos) das requisições concluídas na janela recente.
+
+        Retorna None sem amostras na janela. O resultado fica em cache por
+        1 segundo, pois é consultado a cada requisição pelo load shedding.
+        """
+        now = time.monotonic()
+        cached_at, cached_value = self._recent_p95_cache
+        if now - cached_at < 1.0:
+            return cached_value
+
+        with self._data_lock:
+            cutoff = now - window_seconds
+            durations = sorted(
+                duration for finished, duration in self._recent if finished >= cutoff
+            )
+        value = durations[int(len(durations) * 0.95)] if durations else None
+        self._recent_p95_cache = (now, value)
+        return value
+
+    def request_started(self):
+        with self._data_lock:
+            self._in_flight += 1
+            return self._in_flight
+
+    def request_finished(self):
+        with self._data_lock:
+            self._in_flight -= 1
+
+    def record_shed(self, reason):
+        with self._data_lock:
+            self._shed_count[reason] += 1
+
+    def record_throttle(self, scope, allowed):
+        with self._data_lock:
+            self._throttle_checks[scope] += 1
+            if not allowed:
+                self._throttled[scope] += 1
+
     def reset(self):
         """Reseta as métricas (útil para testes)."""
         with self._data_lock:
+            self._recent.clear()
+            self._recent_p95_cache = (0.0, None)
+            self._shed_count.clear()
+            self._throttle_checks.clear()
+            self._throttled.clear()
             self._request_count.clear()
             self._status_count.clear()
             self._latencies.clear()
+            self._routes.clear()
             self._error_count = 0
 
 
+def _new_route_stats():
+    return {
+        "requests": 0,
+        "queries": 0,
+        "max_queries": 0,
+        "db_time": 0.0,
+        "n_plus_one": 0,
+    }
+
+
+def _summarize_route(route_stats):
+    requests = route_stats["requests"] or 1
+    return {
+        "requests": route_stats["requests"],
+        "avg_queries": round(route_stats["queries"] / requests, 2),
+        "max_queries": route_stats["max_queries"],
+        "avg_db_ms": round(route_stats["db_time"] / requests * 1000, 2),
+        "n_plus_one_requests": route_stats["n_plus_one"],
+    }
+
+
 class MetricsMiddleware:
     """
     Middleware que coleta métricas de todas as requisições HTTP.
 
     As métricas ficam disponíveis via MetricsCollector.get_metrics()
     e são expostas no endpoint /api/metrics/.
+
+    Reutiliza o `request.timings` criado pelo RequestLoggingMiddleware
+    quando disponível, evitando uma segunda medição de tempo.
+
+    Suporta execução síncrona (WSGI) e assíncrona (ASGI) sem adaptação.
     """
 
+    sync_capable = True
+    async_capable = True
+
     def __init__(self, get_response):
         self.get_response = get_response
         self.collector = MetricsCollector()
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
 
     def __call__(self, request):
-        start_time = time.time()
+        if self.async_mode:
+            return self.__acall__(request)
 
+        start_time = time.time()
         response = self.get_response(request)
+        self._record(request, response, start_time)
+        return response
 
-        duration = time.time() - start_time
+    async def __acall__(self, request):
+        start_time = time.time()
+        response = await self.get_response(request)
+        self._record(request, response, start_time)
+        return response
+
+    def _record(self, request, response, start_time):
+        timings = getattr(request, "timings", None)
+        duration = timings.elapsed() if timings else time.time() - start_time
+        query_stats = getattr(request, "query_stats", None)
         self.collector.record_request(
             method=request.method,
             path=request.get_full_path(),
             status_code=response.status_code,
             duration=duration,
+            route=get_route(request),
+            query_count=query_stats.count if query_stats else 0,
+            db_time=query_stats.duration if query_stats else 0.0,
+            n_plus_one=bool(query_stats and query_stats.n_plus_one()),
         )
 
-        return response
+
+def get_route(request):
+    """Retorna o nome da rota resolvida (baixa cardinalidade)."""
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return "<unmatched>"
+    return match.view_name or match.route
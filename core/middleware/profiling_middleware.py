@@ -0,0 +1,142 @@
+"""
+Middleware de profiling amostral de requisições lentas.
+
+Decisão técnica: Requisições lentas intermitentes são difíceis de reproduzir.
+Uma fração configurável das requisições (PROFILING_SAMPLE_RATE) roda sob
+cProfile, e o profile só é salvo quando a duração ultrapassa o limite
+(PROFILING_THRESHOLD_MS). Requisições rápidas descartam o profile sem I/O.
+
+Os arquivos são gravados em formato pstats em PROFILING_DIR (dentro de
+LOG_DIR), com o Correlation ID no nome para cruzar com os logs, e a
+retenção é limitada por quantidade e tamanho total.
+
+Sob ASGI o profiling é desligado: o cProfile mede a thread inteira e, com
+várias requisições intercaladas no mesmo event loop, o profile misturaria
+requisições diferentes. Nesse modo o middleware só repassa a requisição,
+sem forçar a adaptação sync/async do Django.
+
+Análise:
+    python -m pstats logs/profiles/<arquivo>.prof
+    snakeviz logs/profiles/<arquivo>.prof
+"""
+
+import cProfile
+import logging
+import random
+import re
+import threading
+import time
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from django.conf import settings
+
+logger = logging.getLogger("core.middleware")
+
+_UNSAFE_FILENAME_CHARS = re.compile(r"[^A-Za-z0-9_-]")
+
+
+class ProfilingMiddleware:
+    """
+    Middleware que perfila uma amostra das requisições e guarda as lentas.
+
+    Configuração (settings):
+    - PROFILING_SAMPLE_RATE: fração das requisições perfiladas (0 desliga)
+    - PROFILING_THRESHOLD_MS: duração mínima para salvar o profile
+    - PROFILING_DIR: diretório de destino dos arquivos .prof
+    - PROFILING_MAX_FILES / PROFILING_MAX_TOTAL_MB: limites de retenção
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    _prune_lock = threading.Lock()
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+
+        sample_rate = getattr(settings, "PROFILING_SAMPLE_RATE", 0.0)
+        if sample_rate <= 0 or random.random() >= sample_rate:
+            return self.get_response(request)
+
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Outro profiler já está ativo (ex: outra thread no Python 3.12+)
+            return self.get_response(request)
+
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            profiler.disable()
+
+        duration_ms = (time.perf_counter() - start) * 1000
+        threshold_ms = getattr(settings, "PROFILING_THRESHOLD_MS", 500)
+        if duration_ms >= threshold_ms:
+            self._save_profile(profiler, request, response, duration_ms)
+
+        return response
+
+    async def __acall__(self, request):
+        return await self.get_response(request)
+
+    def _save_profile(self, profiler, request, response, duration_ms):
+        directory = Path(settings.PROFILING_DIR)
+        correlation_id = getattr(request, "correlation_id", None) or "no-cid"
+        correlation_id = _UNSAFE_FILENAME_CHARS.sub("", correlation_id)[:64]
+        filename = (
+            f"{time.strftime('%Y%m%dT%H%M%S')}_{correlation_id}_"
+            f"{request.method}_{response.status_code}_{int(duration_ms)}ms.prof"
+        )
+
+        try:
+            directory.mkdir(parents=True, exist_ok=True)
+            profiler.dump_stats(str(directory / filename))
+        except OSError:
+            logger.exception("Falha ao salvar profile em %s", directory)
+            return
+
+        logger.warning(
+            "Profile salvo: %s %s | Duration: %.0fms | Arquivo: %s",
+            request.method,
+            request.path,
+            duration_ms,
+            filename,
+        )
+        self._prune(directory)
+
+    def _prune(self, directory):
+        """Remove os profiles mais antigos além dos limites de retenção."""
+        max_files = getattr(settings, "PROFILING_MAX_FILES", 50)
+        max_bytes = getattr(settings, "PROFILING_MAX_TOTAL_MB", 200) * 1024 * 1024
+
+        with self._prune_lock:
+            profiles = []
+            for path in directory.glob("*.prof"):
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue
+                profiles.append((stat.st_mtime, stat.st_size, path))
+            profiles.sort(reverse=True)
+
+            kept_bytes = 0
+            for index, (_, size, path) in enumerate(profiles):
+                kept_bytes += size
+                if index < max_files and kept_bytes <= max_bytes:
+                    continue
+                try:
+                    path.unlink()
+                except FileNotFoundError:
+                    # Outro worker já removeu o arquivo
+                    pass
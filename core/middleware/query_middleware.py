@@ -0,0 +1,184 @@
+"""
+Middleware de instrumentação de SQL por requisição.
+
+Decisão técnica: Usa os execute wrappers do Django (API oficial)
+para contar queries, somar o tempo gasto no banco e agrupar statements
+repetidos de cada requisição. O custo por query é um `perf_counter()` e um
+incremento em dicionário — a normalização do SQL (regex) só acontece no
+final da requisição e apenas para statements repetidos, o que permite
+manter a instrumentação ligada em produção.
+
+Os dados ficam em `request.query_stats` e são consumidos pelo
+RequestLoggingMiddleware (linha de log) e pelo MetricsMiddleware (por rota).
+O total também é comparado com o orçamento de queries da view
+(core.query_budget).
+
+O wrapper é instalado de forma permanente nas conexões (core.utils.db) e
+acha o QueryStats da requisição por uma ContextVar, o que funciona tanto
+em WSGI quanto em ASGI (onde o ORM roda em threads de sync_to_async).
+"""
+
+import logging
+import re
+import time
+from collections import defaultdict
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from django.conf import settings
+
+from core.query_budget import budget_for_request
+from core.utils.db import ensure_execute_wrappers, register_execute_wrapper
+
+logger = logging.getLogger("core.middleware")
+
+_IN_LIST_RE = re.compile(r"\bIN\s*\((?:\s*%s\s*,?)+\)", re.IGNORECASE)
+_NUMBER_RE = re.compile(r"\b\d+\b")
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+# QueryStats da requisição atual (None fora de requisições instrumentadas)
+_query_stats = ContextVar("query_stats", default=None)
+
+
+def normalize_sql(sql):
+    """
+    Normaliza um statement SQL para agrupar variações da mesma query.
+
+    Literais numéricos/strings e listas `IN (...)` de tamanho variável
+    viram placeholders, de forma que `WHERE id IN (%s, %s)` e
+    `WHERE id IN (%s)` tenham o mesmo fingerprint.
+    """
+    sql = _STRING_RE.sub("?", sql)
+    sql = _IN_LIST_RE.sub("IN (...)", sql)
+    sql = _NUMBER_RE.sub("?", sql)
+    return _WHITESPACE_RE.sub(" ", sql).strip()
+
+
+class QueryStats:
+    """
+    Acumulador de estatísticas de SQL de uma requisição.
+
+    Também pode ser usado diretamente como callable de
+    `connection.execute_wrapper` (ex: em testes).
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self._statements = defaultdict(int)
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+            self._statements[sql] += 1
+
+    def duplicates(self):
+        """Retorna {sql normalizado: repetições} para statements repetidos."""
+        fingerprints = defaultdict(int)
+        for sql, total in self._statements.items():
+            fingerprints[normalize_sql(sql)] += total
+        return {sql: total for sql, total in fingerprints.items() if total > 1}
+
+    def n_plus_one(self, threshold=None):
+        """
+        Retorna os statements que provavelmente indicam N+1.
+
+        Um statement é suspeito quando o mesmo SQL normalizado se repete
+        mais que `threshold` vezes na mesma requisição.
+        """
+        if threshold is None:
+            threshold = getattr(settings, "QUERY_N_PLUS_ONE_THRESHOLD", 5)
+        if self.count <= threshold:
+            return {}
+        return {
+            sql: total for sql, total in self.duplicates().items() if total > threshold
+        }
+
+
+def record_query(execute, sql, params, many, context):
+    """Execute wrapper permanente que alimenta o QueryStats da requisição."""
+    stats = _query_stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    return stats(execute, sql, params, many, context)
+
+
+register_execute_wrapper(record_query)
+
+
+class QueryInstrumentationMiddleware:
+    """
+    Middleware que instrumenta todas as queries SQL da requisição.
+
+    Disponibiliza `request.query_stats` (QueryStats) para os middlewares
+    de logging e métricas e registra um warning quando detecta um
+    provável padrão N+1 ou quando a view excede o orçamento de queries.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+
+        ensure_execute_wrappers()
+        token = self._start(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            _query_stats.reset(token)
+        self._report(request)
+        return response
+
+    async def __acall__(self, request):
+        token = self._start(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _query_stats.reset(token)
+        self._report(request)
+        return response
+
+    def _start(self, request):
+        stats = QueryStats()
+        request.query_stats = stats
+        return _query_stats.set(stats)
+
+    def _report(self, request):
+        stats = request.query_stats
+        suspects = stats.n_plus_one()
+        if suspects:
+            sql, total = max(suspects.items(), key=lambda item: item[1])
+            logger.warning(
+                "Possível N+1 em %s %s | Queries: %d | Repetições: %d | SQL: %s",
+                request.method,
+                request.path,
+                stats.count,
+                total,
+                sql[:300],
+            )
+
+        if getattr(settings, "QUERY_BUDGET_WARNINGS", True):
+            budget = budget_for_request(request)
+            if budget is not None and stats.count > budget:
+                logger.warning(
+                    "Orçamento de queries excedido em %s %s | Queries: %d | "
+                    "Orçamento: %d",
+                    request.method,
+                    request.path,
+                    stats.count,
+                    budget,
+                )
@@ -0,0 +1,88 @@
+"""
+Middleware de tracing de requisições.
+
+Decisão técnica: Abre o span raiz (SERVER) de cada requisição amostrada e
+instrumenta as queries SQL como spans filhos via execute wrapper permanente
+(core.utils.db), que funciona também sob ASGI. Requisições não amostradas
+passam direto, sem custo além do sorteio.
+"""
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from core.tracing import (
+    SPAN_KIND_SERVER,
+    STATUS_ERROR,
+    end_trace,
+    span,
+    start_trace,
+    trace_db_query,
+)
+from core.utils.db import ensure_execute_wrappers, register_execute_wrapper
+
+register_execute_wrapper(trace_db_query)
+
+
+class TracingMiddleware:
+    """
+    Middleware que cria o trace da requisição (amostragem head-based).
+
+    O trace id é derivado do Correlation ID, portanto este middleware
+    deve vir depois do CorrelationIdMiddleware.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+
+        if not start_trace(getattr(request, "correlation_id", None)):
+            return self.get_response(request)
+
+        ensure_execute_wrappers()
+        try:
+            with self._root_span(request) as root:
+                response = self.get_response(request)
+                self._finish(request, response, root)
+        finally:
+            end_trace()
+        return response
+
+    async def __acall__(self, request):
+        if not start_trace(getattr(request, "correlation_id", None)):
+            return await self.get_response(request)
+
+        try:
+            with self._root_span(request) as root:
+                response = await self.get_response(request)
+                self._finish(request, response, root)
+        finally:
+            end_trace()
+        return response
+
+    def _root_span(self, request):
+        return span(
+            f"{request.method} {request.path}",
+            kind=SPAN_KIND_SERVER,
+            **{
+                "http.method": request.method,
+                "http.target": request.path,
+                "correlation_id": getattr(request, "correlation_id", None),
+            },
+        )
+
+    def _finish(self, request, response, root):
+        match = getattr(request, "resolver_match", None)
+        if match is not None and match.view_name:
+            root.name = f"{request.method} {match.view_name}"
+            root.set_attribute("http.route", match.view_name)
+        root.set_attribute("http.status_code", response.status_code)
+        if response.status_code >= 500:
+            root.status_code = STATUS_ERROR
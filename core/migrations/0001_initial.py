@@ -0,0 +1,59 @@
+# Generated by Django 5.2.18 on 2026-10-19 10:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = []
+
+    operations = [
+        migrations.CreateModel(
+            name="RevokedToken",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "jti",
+                    models.CharField(
+                        help_text="Identificador único (claim jti) do token revogado.",
+                        max_length=255,
+                        unique=True,
+                        verbose_name="JTI",
+                    ),
+                ),
+                (
+                    "expires_at",
+                    models.DateTimeField(
+                        help_text="Expiração do token; depois dela a linha pode ser removida.",
+                        verbose_name="Expira em",
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(auto_now_add=True, verbose_name="Revogado em"),
+                ),
+            ],
+            options={
+                "verbose_name": "Token revogado",
+                "verbose_name_plural": "Tokens revogados",
+                "indexes": [
+                    models.Index(
+                        fields=["expires_at"], name="idx_revoked_token_expires"
+                    ),
+                    models.Index(
+                        fields=["created_at"], name="idx_revoked_token_created"
+                    ),
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 5.2.18 on 2026-10-19 10:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ThrottleCounter",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "key",
+                    models.CharField(
+                        help_text="Escopo e identificação do cliente (usuário ou IP).",
+                        max_length=255,
+                        verbose_name="Chave",
+                    ),
+                ),
+                (
+                    "window_start",
+                    models.BigIntegerField(
+                        help_text="Início da janela fixa, em segundos desde a epoch.",
+                        verbose_name="Início da janela",
+                    ),
+                ),
+                (
+                    "count",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="Custo acumulado"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Contador de throttling",
+                "verbose_name_plural": "Contadores de throttling",
+                "indexes": [
+                    models.Index(
+                        fields=["window_start"], name="idx_throttle_window_start"
+                    )
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("key", "window_start"),
+                        name="uniq_throttle_counter_window",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,95 @@
+# Generated by Django 5.2.18 on 2026-10-19 10:51
+
+import django.core.serializers.json
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0002_throttlecounter"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="IdempotencyKey",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "scope",
+                    models.CharField(
+                        help_text="Endpoint da requisição (ex: consultas:create).",
+                        max_length=100,
+                        verbose_name="Escopo",
+                    ),
+                ),
+                (
+                    "owner",
+                    models.CharField(
+                        help_text="Usuário que enviou a chave.",
+                        max_length=150,
+                        verbose_name="Dono",
+                    ),
+                ),
+                (
+                    "key",
+                    models.CharField(
+                        help_text="Valor do header Idempotency-Key.",
+                        max_length=255,
+                        verbose_name="Chave",
+                    ),
+                ),
+                (
+                    "request_hash",
+                    models.CharField(
+                        help_text="sha256 do corpo; a mesma chave com outro corpo é recusada.",
+                        max_length=64,
+                        verbose_name="Hash da requisição",
+                    ),
+                ),
+                (
+                    "status_code",
+                    models.PositiveSmallIntegerField(
+                        blank=True,
+                        help_text="Vazio enquanto a requisição original está em andamento.",
+                        null=True,
+                        verbose_name="Status da resposta",
+                    ),
+                ),
+                (
+                    "response_body",
+                    models.JSONField(
+                        blank=True,
+                        encoder=django.core.serializers.json.DjangoJSONEncoder,
+                        null=True,
+                        verbose_name="Corpo da resposta",
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(auto_now_add=True, verbose_name="Criado em"),
+                ),
+                ("expires_at", models.DateTimeField(verbose_name="Expira em")),
+            ],
+            options={
+                "verbose_name": "Chave de idempotência",
+                "verbose_name_plural": "Chaves de idempotência",
+                "indexes": [
+                    models.Index(fields=["expires_at"], name="idx_idempotency_expires")
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("scope", "owner", "key"), name="uniq_idempotency_key"
+                    )
+                ],
+            },
+        ),
+    ]
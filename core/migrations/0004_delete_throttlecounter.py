@@ -0,0 +1,16 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:35
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0003_idempotencykey"),
+    ]
+
+    operations = [
+        migrations.DeleteModel(
+            name="ThrottleCounter",
+        ),
+    ]
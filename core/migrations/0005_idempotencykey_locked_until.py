@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0004_delete_throttlecounter"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="idempotencykey",
+            name="locked_until",
+            field=models.DateTimeField(
+                blank=True,
+                help_text="Fim da reserva em andamento; depois dela outra requisição pode assumir a chave.",
+                null=True,
+                verbose_name="Reservada até",
+            ),
+        ),
+    ]
@@ -0,0 +1,114 @@
+"""
+Models da camada de infraestrutura (core).
+
+Decisão técnica: RevokedToken guarda apenas o JTI e a expiração do token
+revogado, não o token em si. A data de revogação (indexada) serve de
+cursor para a sincronização incremental do Bloom filter de cada worker
+(ver core.revocation), e a expiração permite descartar linhas que já não
+protegem nada (comando purge_revoked_tokens).
+
+IdempotencyKey guarda a resposta de uma criação feita com o header
+`Idempotency-Key` (ver core.idempotency). A restrição única em (escopo,
+dono, chave) é o que resolve requisições duplicadas concorrentes: só uma
+consegue inserir a linha e executar a criação. `locked_until` limita a
+reserva: a de um worker que morreu pode ser assumida por uma repetição.
+"""
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+
+
+class RevokedToken(models.Model):
+    """JTI de um token JWT revogado antes da expiração."""
+
+    jti = models.CharField(
+        max_length=255,
+        unique=True,
+        verbose_name="JTI",
+        help_text="Identificador único (claim jti) do token revogado.",
+    )
+    expires_at = models.DateTimeField(
+        verbose_name="Expira em",
+        help_text="Expiração do token; depois dela a linha pode ser removida.",
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name="Revogado em",
+    )
+
+    class Meta:
+        verbose_name = "Token revogado"
+        verbose_name_plural = "Tokens revogados"
+        indexes = [
+            models.Index(fields=["expires_at"], name="idx_revoked_token_expires"),
+            models.Index(fields=["created_at"], name="idx_revoked_token_created"),
+        ]
+
+    def __str__(self):
+        return self.jti
+
+
+class IdempotencyKey(models.Model):
+    """Resultado de uma requisição de criação identificada por Idempotency-Key."""
+
+    scope = models.CharField(
+        max_length=100,
+        verbose_name="Escopo",
+        help_text="Endpoint da requisição (ex: consultas:create).",
+    )
+    owner = models.CharField(
+        max_length=150,
+        verbose_name="Dono",
+        help_text="Usuário que enviou a chave.",
+    )
+    key = models.CharField(
+        max_length=255,
+        verbose_name="Chave",
+        help_text="Valor do header Idempotency-Key.",
+    )
+    request_hash = models.CharField(
+        max_length=64,
+        verbose_name="Hash da requisição",
+        help_text="sha256 do corpo; a mesma chave com outro corpo é recusada.",
+    )
+    status_code = models.PositiveSmallIntegerField(
+        null=True,
+        blank=True,
+        verbose_name="Status da resposta",
+        help_text="Vazio enquanto a requisição original está em andamento.",
+    )
+    locked_until = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name="Reservada até",
+        help_text="Fim da reserva em andamento; depois dela outra requisição "
+        "pode assumir a chave.",
+    )
+    response_body = models.JSONField(
+        null=True,
+        blank=True,
+        encoder=DjangoJSONEncoder,
+        verbose_name="Corpo da resposta",
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name="Criado em",
+    )
+    expires_at = models.DateTimeField(
+        verbose_name="Expira em",
+    )
+
+    class Meta:
+        verbose_name = "Chave de idempotência"
+        verbose_name_plural = "Chaves de idempotência"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["scope", "owner", "key"], name="uniq_idempotency_key"
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["expires_at"], name="idx_idempotency_expires"),
+        ]
+
+    def __str__(self):
+        return f"{self.scope}:{self.key}"
@@ -0,0 +1,36 @@
+"""
+Orçamento de queries por endpoint.
+
+Decisão técnica: Um N+1 novo (ex: um campo de serializer que acessa uma
+relação sem `select_related`) não quebra nada e passa despercebido até
+aparecer na latência. Cada view declara quantas queries uma requisição
+pode fazer, contando autenticação e throttling:
+
+- viewsets: `query_budgets = {"list": 5, "retrieve": 4, ...}` por action
+- views simples: `query_budget = 1`
+
+Os testes (core.tests.QueryBudgetTests) exercitam cada action com várias
+linhas no banco e falham se o orçamento for ultrapassado. Em produção, o
+QueryInstrumentationMiddleware compara o total da requisição com o
+orçamento e registra um warning quando ele é excedido
+(QUERY_BUDGET_WARNINGS).
+"""
+
+
+def get_query_budget(view_class, action=None):
+    """Orçamento da action (ou da view), ou None se não declarado."""
+    budgets = getattr(view_class, "query_budgets", None) or {}
+    if action in budgets:
+        return budgets[action]
+    return getattr(view_class, "query_budget", None)
+
+
+def budget_for_request(request):
+    """Orçamento da view resolvida para a requisição, ou None."""
+    match = getattr(request, "resolver_match", None)
+    view_class = getattr(getattr(match, "func", None), "cls", None)
+    if view_class is None:
+        return None
+    # Viewsets: o mapeamento método → action fica na função da rota
+    actions = getattr(match.func, "actions", None) or {}
+    return get_query_budget(view_class, actions.get(request.method.lower()))
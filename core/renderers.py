@@ -0,0 +1,19 @@
+"""
+Renderers da API.
+
+Decisão técnica: O JSONRenderer padrão do DRF é estendido apenas para
+registrar a fase `render` no Server-Timing da requisição.
+"""
+
+from rest_framework import renderers
+
+from core.utils.timing import timed_phase
+
+
+class JSONRenderer(renderers.JSONRenderer):
+    """JSONRenderer do DRF com medição da fase de renderização."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        request = (renderer_context or {}).get("request")
+        with timed_phase(request, "render"):
+            return super().render(data, accepted_media_type, renderer_context)
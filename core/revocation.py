@@ -0,0 +1,292 @@
+"""
+Revogação de tokens JWT com Bloom filter em memória.
+
+Decisão técnica: Consultar a tabela de tokens revogados a cada validação de
+access token custaria uma query por requisição. Cada worker mantém um Bloom
+filter com os JTIs revogados ainda não expirados: um JTI ausente do filtro
+"certamente não foi revogado" (O(1), sem banco); só um acerto no filtro,
+revogação real ou falso positivo (TOKEN_REVOCATION_BLOOM_ERROR_RATE),
+consulta RevokedToken.
+
+Sincronização incremental: a cada TOKEN_REVOCATION_SYNC_SECONDS o worker
+busca apenas as linhas criadas desde o último sync (com uma margem de
+SYNC_OVERLAP para inserts que confirmaram fora de ordem). Revogações feitas
+pelo próprio worker entram no filtro na hora; as de outros workers, no
+próximo sync. Bloom filters não removem itens, então o filtro é
+reconstruído a partir das linhas não expiradas a cada
+TOKEN_REVOCATION_REBUILD_SECONDS ou quando passa da capacidade.
+
+O filtro é construído no início do worker (`start()`, chamado pelo hook
+post_worker_init do gunicorn) e o sync e a reconstrução rodam em uma
+thread de background: as requisições só leem o filtro, sem query nem
+espera por lock. Sem o hook (runserver, outros servidores), a primeira
+validação constrói o filtro e inicia a thread. As queries rodam fora do
+`_data_lock`, que só protege a troca do filtro e a inclusão de bits.
+"""
+
+import hashlib
+import logging
+import math
+import threading
+import time
+from datetime import datetime, timedelta
+from datetime import timezone as dt_timezone
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+
+from core.db_router import use_primary
+from core.models import RevokedToken
+
+logger = logging.getLogger("core.middleware")
+
+# Margem do sync incremental: um insert pode confirmar depois de outro mais novo
+SYNC_OVERLAP = timedelta(seconds=30)
+
+
+class BloomFilter:
+    """Bloom filter de strings sobre um bytearray (double hashing com sha256)."""
+
+    def __init__(self, capacity, error_rate):
+        self.capacity = max(capacity, 1)
+        self.num_bits = max(
+            int(-self.capacity * math.log(error_rate) / (math.log(2) ** 2)), 8
+        )
+        self.num_hashes = max(
+            int(round(self.num_bits / self.capacity * math.log(2))), 1
+        )
+        self._bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item):
+        digest = hashlib.sha256(item.encode()).digest()
+        h1 = int.from_bytes(digest[:8], "big")
+        h2 = int.from_bytes(digest[8:16], "big") | 1
+        return ((h1 + i * h2) % self.num_bits for i in range(self.num_hashes))
+
+    def add(self, item):
+        if item in self:
+            return
+        for position in self._positions(item):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item):
+        return all(
+            self._bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(item)
+        )
+
+
+class RevocationFilter:
+    """
+    Filtro de JTIs revogados por worker, sincronizado com RevokedToken.
+
+    Configuração (settings):
+    - TOKEN_REVOCATION_ENABLED: liga a checagem na autenticação
+    - TOKEN_REVOCATION_SYNC_SECONDS: intervalo do sync incremental
+    - TOKEN_REVOCATION_REBUILD_SECONDS: intervalo da reconstrução completa
+    - TOKEN_REVOCATION_BLOOM_CAPACITY / _ERROR_RATE: dimensionamento
+    - TOKEN_REVOCATION_BACKGROUND_SYNC: thread de sync (desligada nos testes)
+    """
+
+    _instance = None
+    _lock = threading.Lock()
+
+    def __new__(cls):
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = super().__new__(cls)
+                    cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self):
+        if self._initialized:
+            return
+        self._initialized = True
+        self._data_lock = threading.Lock()
+        # Uma atualização (sync ou reconstrução) por vez; guarda o I/O
+        self._refresh_lock = threading.Lock()
+        self._sync_thread = None
+        self._reset_state()
+
+    def _reset_state(self):
+        self._filter = None
+        self._cursor = None
+        self._synced_at = 0.0
+        self._built_at = 0.0
+        self._db_checks = 0
+        self._false_positives = 0
+        # JTIs revogados por este worker durante uma reconstrução em andamento
+        self._revoked_during_rebuild = None
+
+    def is_revoked(self, jti):
+        """Indica se o JTI foi revogado; só consulta o banco em acerto no filtro."""
+        if not jti:
+            return False
+        if jti not in self._current_filter():
+            return False
+
+        with use_primary():
+            revoked = RevokedToken.objects.filter(jti=jti).exists()
+        with self._data_lock:
+            self._db_checks += 1
+            if not revoked:
+                self._false_positives += 1
+        return revoked
+
+    def revoke(self, jti, expires_at):
+        """Revoga um JTI até `expires_at` (datetime ou timestamp epoch)."""
+        if not isinstance(expires_at, datetime):
+            expires_at = datetime.fromtimestamp(expires_at, tz=dt_timezone.utc)
+        with use_primary():
+            RevokedToken.objects.get_or_create(
+                jti=jti, defaults={"expires_at": expires_at}
+            )
+        self._current_filter()
+        with self._data_lock:
+            self._filter.add(jti)
+            if self._revoked_during_rebuild is not None:
+                self._revoked_during_rebuild.append(jti)
+
+    def revoke_token(self, token):
+        """Revoga um token do simplejwt pelas claims jti e exp."""
+        self.revoke(token["jti"], token["exp"])
+
+    def stats(self):
+        with self._data_lock:
+            bloom = self._filter
+            return {
+                "enabled": getattr(settings, "TOKEN_REVOCATION_ENABLED", False),
+                "items": bloom.count if bloom else 0,
+                "capacity": bloom.capacity if bloom else 0,
+                "bits": bloom.num_bits if bloom else 0,
+                "db_checks": self._db_checks,
+                "false_positives": self._false_positives,
+            }
+
+    def reset(self):
+        """Descarta o filtro; o próximo uso o reconstrói (útil para testes)."""
+        with self._data_lock:
+            self._reset_state()
+
+    def start(self):
+        """
+        Constrói o filtro (se ainda não existe) e inicia a thread de sync.
+
+        Chamado no início do worker; idempotente. Depois de um fork, a
+        thread do processo pai não existe mais e é iniciada de novo.
+        """
+        with self._refresh_lock:
+            if self._filter is None:
+                self._rebuild(time.monotonic())
+
+        if not getattr(settings, "TOKEN_REVOCATION_BACKGROUND_SYNC", True):
+            return
+        with self._data_lock:
+            if self._sync_thread is not None and self._sync_thread.is_alive():
+                return
+            self._sync_thread = threading.Thread(
+                target=self._sync_in_background,
+                name="token-revocation-sync",
+                daemon=True,
+            )
+            self._sync_thread.start()
+
+    def refresh(self):
+        """Faz o sync incremental ou a reconstrução, se algum estiver vencido."""
+        with self._refresh_lock:
+            now = time.monotonic()
+            action = self._refresh_due(now)
+            if action == "rebuild":
+                self._rebuild(now)
+            elif action == "sync":
+                self._sync(now)
+
+    def _current_filter(self):
+        bloom = self._filter
+        if bloom is None:
+            # Worker iniciado sem o hook do gunicorn: constrói aqui, uma vez
+            self.start()
+            bloom = self._filter
+        return bloom
+
+    def _sync_in_background(self):
+        while True:
+            time.sleep(max(getattr(settings, "TOKEN_REVOCATION_SYNC_SECONDS", 5), 1))
+            try:
+                self.refresh()
+            except Exception:
+                logger.exception("Falha ao sincronizar o filtro de revogação")
+            finally:
+                # Conexão desta thread: descarta se quebrada ou velha demais
+                close_old_connections()
+
+    def _refresh_due(self, now=None):
+        """Retorna "rebuild", "sync" ou None conforme o estado do filtro."""
+        now = time.monotonic() if now is None else now
+        rebuild_every = getattr(settings, "TOKEN_REVOCATION_REBUILD_SECONDS", 3600)
+        sync_every = getattr(settings, "TOKEN_REVOCATION_SYNC_SECONDS", 5)
+        with self._data_lock:
+            bloom = self._filter
+            if (
+                bloom is None
+                or bloom.count > bloom.capacity
+                or now - self._built_at >= rebuild_every
+            ):
+                return "rebuild"
+            if now - self._synced_at >= sync_every:
+                return "sync"
+            return None
+
+    def _rebuild(self, now):
+        with self._data_lock:
+            self._revoked_during_rebuild = []
+        bloom = BloomFilter(
+            getattr(settings, "TOKEN_REVOCATION_BLOOM_CAPACITY", 100_000),
+            getattr(settings, "TOKEN_REVOCATION_BLOOM_ERROR_RATE", 0.01),
+        )
+        cursor = timezone.now()
+        try:
+            with use_primary():
+                rows = RevokedToken.objects.filter(expires_at__gt=cursor).values_list(
+                    "jti", flat=True
+                )
+                for jti in rows.iterator():
+                    bloom.add(jti)
+        except Exception:
+            with self._data_lock:
+                self._revoked_during_rebuild = None
+            raise
+
+        with self._data_lock:
+            # Revogações locais feitas durante a query entram no filtro novo
+            for jti in self._revoked_during_rebuild or ():
+                bloom.add(jti)
+            self._revoked_during_rebuild = None
+            self._filter = bloom
+            self._cursor = cursor
+            self._built_at = self._synced_at = now
+
+    def _sync(self, now):
+        with self._data_lock:
+            since = self._cursor - SYNC_OVERLAP
+        cursor = timezone.now()
+        with use_primary():
+            jtis = list(
+                RevokedToken.objects.filter(created_at__gte=since).values_list(
+                    "jti", flat=True
+                )
+            )
+        with self._data_lock:
+            for jti in jtis:
+                self._filter.add(jti)
+            self._cursor = cursor
+            self._synced_at = now
+
+
+def revocation_stats():
+    """Estatísticas do filtro de revogação deste worker (exposto em /api/metrics/)."""
+    return RevocationFilter().stats()
@@ -0,0 +1,119 @@
+"""
+Base de serializers da API.
+
+Decisão técnica: A avaliação de `serializer.data` é medida como fase
+`serialize` do Server-Timing e registrada como span de tracing.
+Serializers de instância usam o mixin e listagens (many=True) usam o
+TimedListSerializer via `Meta.list_serializer_class`.
+
+ExpandableFieldsMixin torna campos aninhados opt-in via `?expand=`
+(ver core.expand).
+
+ClaimsTokenObtainPairSerializer emite tokens com as claims do modo
+JWT_STATELESS_USER (ver core.authentication). Os serializers de refresh e
+revogação integram os tokens com core.revocation.
+"""
+
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.serializers import (
+    TokenObtainPairSerializer,
+    TokenRefreshSerializer,
+)
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from django.conf import settings
+from rest_framework import serializers
+
+from core.authentication import add_user_claims
+from core.revocation import RevocationFilter
+from core.tracing import span
+from core.utils.timing import timed_phase
+
+
+class TimedSerializerMixin:
+    """Mede o tempo de `.data` de um serializer de instância."""
+
+    @property
+    def data(self):
+        with (
+            timed_phase(self.context.get("request"), "serialize"),
+            span(f"serialize {type(self).__name__}"),
+        ):
+            return super().data
+
+
+class TimedListSerializer(serializers.ListSerializer):
+    """ListSerializer que mede o tempo de `.data` de uma listagem."""
+
+    @property
+    def data(self):
+        with (
+            timed_phase(self.context.get("request"), "serialize"),
+            span(f"serialize {type(self.child).__name__}[]"),
+        ):
+            return super().data
+
+
+class ExpandableFieldsMixin:
+    """
+    Campos aninhados só com `?expand=`.
+
+    `Meta.expandable_fields` mapeia o nome aceito em `?expand=` para o campo
+    aninhado. Sem o nome em `context["expand"]`, o campo sai do serializer e
+    a resposta leva só a chave estrangeira.
+    """
+
+    def get_fields(self):
+        fields = super().get_fields()
+        expand = self.context.get("expand", ())
+        for name, field_name in getattr(self.Meta, "expandable_fields", {}).items():
+            if name not in expand:
+                fields.pop(field_name, None)
+        return fields
+
+
+class ClaimsTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """Par de tokens com username, papel e versão de permissões nas claims."""
+
+    @classmethod
+    def get_token(cls, user):
+        # As claims da refresh são copiadas para os access tokens derivados
+        return add_user_claims(super().get_token(user), user)
+
+
+class RevokingTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    Refresh que recusa tokens revogados e, com rotação, revoga o anterior.
+
+    Substitui o BLACKLIST_AFTER_ROTATION do simplejwt, que depende do app
+    token_blacklist (não instalado).
+    """
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs["refresh"])
+        revocation_enabled = getattr(settings, "TOKEN_REVOCATION_ENABLED", False)
+        if revocation_enabled and RevocationFilter().is_revoked(refresh.get("jti")):
+            raise TokenError("Token revogado.")
+
+        data = super().validate(attrs)
+
+        if (
+            revocation_enabled
+            and api_settings.ROTATE_REFRESH_TOKENS
+            and api_settings.BLACKLIST_AFTER_ROTATION
+        ):
+            RevocationFilter().revoke_token(refresh)
+        return data
+
+
+class TokenRevokeSerializer(serializers.Serializer):
+    """Refresh token a revogar (logout)."""
+
+    refresh = serializers.CharField()
+
+    def validate_refresh(self, value):
+        try:
+            return RefreshToken(value)
+        except TokenError as exc:
+            raise serializers.ValidationError(str(exc)) from exc
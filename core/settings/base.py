@@ -6,6 +6,8 @@ Decisão técnica: Separação de settings por ambiente (base, staging, producti
 para facilitar a gestão de configurações e segurança.
 """
 
+import copy
+import importlib.util
 import sys
 from datetime import timedelta
 from pathlib import Path
@@ -37,6 +39,7 @@ INSTALLED_APPS = [
     "django_filters",
     "drf_spectacular",
     # Local apps
+    "core",
     "apps.profissionais",
     "apps.consultas",
 ]
@@ -46,6 +49,12 @@ MIDDLEWARE = [
     "whitenoise.middleware.WhiteNoiseMiddleware",
     # Observabilidade: Correlation ID para rastreamento de requisições
     "core.middleware.correlation_middleware.CorrelationIdMiddleware",
+    # Resiliência: rejeita leituras sob sobrecarga (503 + Retry-After)
+    "core.middleware.load_shedding_middleware.LoadSheddingMiddleware",
+    # Observabilidade: Profiling amostral de requisições lentas
+    "core.middleware.profiling_middleware.ProfilingMiddleware",
+    # Observabilidade: Tracing amostral (spans exportados em OTLP/JSON)
+    "core.middleware.tracing_middleware.TracingMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -53,7 +62,10 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    # Resiliência: deadline por requisição (statement_timeout no PostgreSQL)
+    "core.middleware.deadline_middleware.DeadlineMiddleware",
     # Custom middleware - Observabilidade
+    "core.middleware.query_middleware.QueryInstrumentationMiddleware",
     "core.middleware.logging_middleware.RequestLoggingMiddleware",
     "core.middleware.metrics_middleware.MetricsMiddleware",
 ]
@@ -103,6 +115,84 @@ else:
         }
     }
 
+# =============================================================================
+# Conexões com o banco
+# Decisão técnica: Abrir uma conexão PostgreSQL por requisição custa alguns
+# milissegundos. Com DB_POOL_ENABLED e psycopg 3 + psycopg_pool instalados,
+# usa o pool nativo do Django (5.1+), dimensionado pelo número de threads
+# por worker (GUNICORN_THREADS, a mesma variável que gunicorn.conf.py passa
+# ao gunicorn) mais uma conexão de folga para as threads de background.
+# Caso contrário, usa conexões persistentes (CONN_MAX_AGE) com health check
+# na reutilização. O pool não suporta psycopg2.
+# =============================================================================
+GUNICORN_THREADS = config("GUNICORN_THREADS", default=1, cast=int)
+DB_POOL_ENABLED = config("DB_POOL_ENABLED", default=False, cast=bool)
+DB_POOL_MIN_SIZE = config("DB_POOL_MIN_SIZE", default=1, cast=int)
+DB_POOL_MAX_SIZE = config("DB_POOL_MAX_SIZE", default=GUNICORN_THREADS + 1, cast=int)
+DB_POOL_TIMEOUT_SECONDS = config("DB_POOL_TIMEOUT_SECONDS", default=10, cast=int)
+DB_CONN_MAX_AGE = config("DB_CONN_MAX_AGE", default=60, cast=int)
+
+if DATABASES["default"]["ENGINE"] == "django.db.backends.postgresql":
+    if (
+        DB_POOL_ENABLED
+        and importlib.util.find_spec("psycopg")
+        and importlib.util.find_spec("psycopg_pool")
+    ):
+        DATABASES["default"]["OPTIONS"]["pool"] = {
+            "min_size": DB_POOL_MIN_SIZE,
+            "max_size": DB_POOL_MAX_SIZE,
+            "timeout": DB_POOL_TIMEOUT_SECONDS,
+        }
+    else:
+        DATABASES["default"]["CONN_MAX_AGE"] = DB_CONN_MAX_AGE
+        DATABASES["default"]["CONN_HEALTH_CHECKS"] = True
+
+# =============================================================================
+# Réplica de leitura
+# Decisão técnica: Com DB_REPLICA_HOST definido, listagens e detalhes de
+# profissionais/consultas e as métricas de negócio leem da réplica (alias
+# "replica", mesmas credenciais e opções de conexão do primário). Escritas
+# sempre vão para o primário, e um cliente que escreveu nos últimos
+# READ_REPLICA_STICKY_SECONDS continua lendo do primário (read-your-writes).
+# Ver core.db_router.
+# =============================================================================
+DATABASE_ROUTERS = ["core.db_router.ReadReplicaRouter"]
+READ_REPLICA_STICKY_SECONDS = config("READ_REPLICA_STICKY_SECONDS", default=5, cast=int)
+DB_REPLICA_HOST = config("DB_REPLICA_HOST", default="")
+
+if "test" in sys.argv:
+    # Banco separado (sem MIRROR) para os testes verificarem o roteamento;
+    # desligado por padrão, ativado com override_settings(READ_REPLICA_ALIAS=...)
+    DATABASES["replica"] = {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": BASE_DIR / "db_replica.sqlite3",
+    }
+    READ_REPLICA_ALIAS = None
+elif DB_REPLICA_HOST:
+    DATABASES["replica"] = copy.deepcopy(DATABASES["default"])
+    DATABASES["replica"]["HOST"] = DB_REPLICA_HOST
+    DATABASES["replica"]["PORT"] = config("DB_REPLICA_PORT", default="5432")
+    READ_REPLICA_ALIAS = "replica"
+else:
+    READ_REPLICA_ALIAS = None
+
+# =============================================================================
+# Cache
+# Decisão técnica: Com CACHE_REDIS_URL, o cache do Django é compartilhado
+# entre workers (contadores de throttling, fragmentos serializados, versão
+# de permissões). Sem ele, LocMemCache: cada worker tem o próprio cache.
+# =============================================================================
+CACHE_REDIS_URL = config("CACHE_REDIS_URL", default="")
+if CACHE_REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": CACHE_REDIS_URL,
+        }
+    }
+else:
+    CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -142,7 +232,7 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 # =============================================================================
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "core.authentication.CachedJWTAuthentication",
         "rest_framework.authentication.SessionAuthentication",
     ],
     "DEFAULT_PERMISSION_CLASSES": [
@@ -156,17 +246,22 @@ REST_FRAMEWORK = {
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
     "PAGE_SIZE": 20,
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
+    # Janela deslizante com contadores no cache do Django
+    # (core.throttling); o custo de cada requisição vem da view
     "DEFAULT_THROTTLE_CLASSES": [
-        "rest_framework.throttling.AnonRateThrottle",
-        "rest_framework.throttling.UserRateThrottle",
+        "core.throttling.SlidingWindowAnonThrottle",
+        "core.throttling.SlidingWindowUserThrottle",
+        "core.throttling.SlidingWindowScopedThrottle",
     ],
     "DEFAULT_THROTTLE_RATES": {
         "anon": "50/hour",
         "user": "200/hour",
+        "profissionais": config("THROTTLE_RATE_PROFISSIONAIS", default="300/hour"),
+        "consultas": config("THROTTLE_RATE_CONSULTAS", default="300/hour"),
     },
     "EXCEPTION_HANDLER": "core.exceptions.custom_exception_handler",
     "DEFAULT_RENDERER_CLASSES": [
-        "rest_framework.renderers.JSONRenderer",
+        "core.renderers.JSONRenderer",
     ],
 }
 
@@ -183,8 +278,65 @@ SIMPLE_JWT = {
     "ROTATE_REFRESH_TOKENS": True,
     "BLACKLIST_AFTER_ROTATION": True,
     "AUTH_HEADER_TYPES": ("Bearer",),
+    "TOKEN_OBTAIN_SERIALIZER": "core.serializers.ClaimsTokenObtainPairSerializer",
+    # Com rotação, o refresh anterior é revogado em core.revocation
+    "TOKEN_REFRESH_SERIALIZER": "core.serializers.RevokingTokenRefreshSerializer",
 }
 
+# Cache de tokens verificados por worker (ver core.authentication).
+# JWT_AUTH_CACHE_SIZE=0 desliga; o TTL limita por quanto tempo outros
+# workers aceitam um usuário desativado.
+JWT_AUTH_CACHE_SIZE = config("JWT_AUTH_CACHE_SIZE", default=1024, cast=int)
+JWT_AUTH_CACHE_TTL_SECONDS = config("JWT_AUTH_CACHE_TTL_SECONDS", default=300, cast=int)
+
+# Usuário montado a partir das claims do token, sem query em auth_user
+# (opt-in). A versão de permissões de cada usuário fica no cache do Django.
+JWT_STATELESS_USER = config("JWT_STATELESS_USER", default=False, cast=bool)
+JWT_PERM_VERSION_CACHE_SECONDS = config(
+    "JWT_PERM_VERSION_CACHE_SECONDS", default=60, cast=int
+)
+
+# Revogação de tokens: Bloom filter por worker na frente da tabela
+# RevokedToken (ver core.revocation). Revogações feitas em outro worker
+# valem a partir do próximo sync incremental, feito em background.
+TOKEN_REVOCATION_ENABLED = config("TOKEN_REVOCATION_ENABLED", default=True, cast=bool)
+TOKEN_REVOCATION_SYNC_SECONDS = config(
+    "TOKEN_REVOCATION_SYNC_SECONDS", default=5, cast=int
+)
+TOKEN_REVOCATION_REBUILD_SECONDS = config(
+    "TOKEN_REVOCATION_REBUILD_SECONDS", default=3600, cast=int
+)
+TOKEN_REVOCATION_BLOOM_CAPACITY = config(
+    "TOKEN_REVOCATION_BLOOM_CAPACITY", default=100_000, cast=int
+)
+TOKEN_REVOCATION_BLOOM_ERROR_RATE = config(
+    "TOKEN_REVOCATION_BLOOM_ERROR_RATE", default=0.01, cast=float
+)
+TOKEN_REVOCATION_BACKGROUND_SYNC = "test" not in sys.argv
+
+# =============================================================================
+# Cache de fragmentos serializados
+# Decisão técnica: Representações de profissionais ficam em cache por
+# (serializer, id, updated_at), em um LRU por worker na frente do cache do
+# Django. Ver core.fragment_cache.
+# =============================================================================
+FRAGMENT_CACHE_ENABLED = config("FRAGMENT_CACHE_ENABLED", default=True, cast=bool)
+FRAGMENT_CACHE_LOCAL_SIZE = config("FRAGMENT_CACHE_LOCAL_SIZE", default=2048, cast=int)
+FRAGMENT_CACHE_TTL_SECONDS = config("FRAGMENT_CACHE_TTL_SECONDS", default=300, cast=int)
+
+# =============================================================================
+# Idempotência
+# Decisão técnica: POSTs de criação com o header Idempotency-Key podem ser
+# repetidos com segurança; a resposta original é devolvida durante o TTL.
+# Ver core.idempotency.
+# =============================================================================
+IDEMPOTENCY_KEY_TTL_HOURS = config("IDEMPOTENCY_KEY_TTL_HOURS", default=24, cast=int)
+# Duração da reserva em andamento: acima do --timeout do gunicorn (120s), para
+# que uma requisição viva nunca perca a chave; a de um worker morto é liberada
+IDEMPOTENCY_IN_PROGRESS_TIMEOUT_SECONDS = config(
+    "IDEMPOTENCY_IN_PROGRESS_TIMEOUT_SECONDS", default=150, cast=int
+)
+
 # =============================================================================
 # CORS Configuration
 # Decisão técnica: CORS configurado via variáveis de ambiente para
@@ -210,11 +362,15 @@ CORS_ALLOW_HEADERS = [
     "authorization",
     "content-type",
     "dnt",
+    "idempotency-key",
+    "if-match",
     "origin",
     "user-agent",
     "x-csrftoken",
     "x-requested-with",
 ]
+# ETag precisa ser legível pelo frontend para enviar o If-Match
+CORS_EXPOSE_HEADERS = ["etag"]
 
 # =============================================================================
 # drf-spectacular (OpenAPI / Swagger)
@@ -237,6 +393,32 @@ SPECTACULAR_SETTINGS = {
     ],
 }
 
+# =============================================================================
+# Health Check
+# Decisão técnica: Métricas de negócio (COUNTs) do health check vêm de um
+# snapshot em memória, recalculado em background quando o TTL expira.
+# =============================================================================
+HEALTH_METRICS_TTL_SECONDS = config("HEALTH_METRICS_TTL_SECONDS", default=60, cast=int)
+HEALTH_METRICS_BACKGROUND_REFRESH = "test" not in sys.argv
+
+# =============================================================================
+# Instrumentação de SQL
+# Decisão técnica: Um mesmo SQL normalizado repetido mais vezes que o limite
+# em uma única requisição é reportado como provável N+1 (log + métricas).
+# Requisições acima do orçamento de queries da view (query_budget/
+# query_budgets, ver core.query_budget) geram um warning no log.
+# =============================================================================
+QUERY_N_PLUS_ONE_THRESHOLD = config("QUERY_N_PLUS_ONE_THRESHOLD", default=5, cast=int)
+QUERY_BUDGET_WARNINGS = config("QUERY_BUDGET_WARNINGS", default=True, cast=bool)
+
+# =============================================================================
+# Server-Timing
+# Decisão técnica: Header com a quebra por fase (auth, serialize, render, db,
+# total) para diagnosticar lentidão pelo DevTools/cliente. Habilitado por
+# ambiente, pois expõe detalhes internos de performance.
+# =============================================================================
+SERVER_TIMING_ENABLED = config("SERVER_TIMING_ENABLED", default=DEBUG, cast=bool)
+
 # =============================================================================
 # Security Settings
 # =============================================================================
@@ -253,6 +435,84 @@ X_FRAME_OPTIONS = "DENY"
 LOG_DIR = BASE_DIR / "logs"
 LOG_DIR.mkdir(exist_ok=True)
 
+# =============================================================================
+# Profiling de requisições lentas
+# Decisão técnica: Desligado por padrão (PROFILING_SAMPLE_RATE=0). Quando
+# ligado, apenas requisições acima do limite têm o profile salvo, com
+# retenção limitada para não esgotar o disco.
+# =============================================================================
+PROFILING_SAMPLE_RATE = config("PROFILING_SAMPLE_RATE", default=0.0, cast=float)
+PROFILING_THRESHOLD_MS = config("PROFILING_THRESHOLD_MS", default=500, cast=int)
+PROFILING_DIR = LOG_DIR / "profiles"
+PROFILING_MAX_FILES = config("PROFILING_MAX_FILES", default=50, cast=int)
+PROFILING_MAX_TOTAL_MB = config("PROFILING_MAX_TOTAL_MB", default=200, cast=int)
+
+# =============================================================================
+# Tracing
+# Decisão técnica: Spans em processo com amostragem head-based, exportados
+# em lotes para um JSONL no formato OTLP/JSON (compatível com o file
+# receiver do OpenTelemetry Collector). Desligado por padrão.
+# =============================================================================
+TRACING_SAMPLE_RATE = config("TRACING_SAMPLE_RATE", default=0.0, cast=float)
+TRACING_EXPORT_PATH = LOG_DIR / "traces.jsonl"
+TRACING_BATCH_SIZE = config("TRACING_BATCH_SIZE", default=512, cast=int)
+TRACING_FLUSH_INTERVAL_SECONDS = config(
+    "TRACING_FLUSH_INTERVAL_SECONDS", default=5, cast=int
+)
+TRACING_MAX_FILE_MB = config("TRACING_MAX_FILE_MB", default=50, cast=int)
+TRACING_SERVICE_NAME = "lacrei-saude-api"
+
+# =============================================================================
+# Load shedding
+# Decisão técnica: Sob sobrecarga, leituras são rejeitadas cedo com 503 +
+# Retry-After para preservar escritas, autenticação e os probes de saúde.
+# Limites por worker (ver core.middleware.load_shedding_middleware).
+# =============================================================================
+LOAD_SHEDDING_ENABLED = config("LOAD_SHEDDING_ENABLED", default=True, cast=bool)
+LOAD_SHEDDING_MAX_IN_FLIGHT = config(
+    "LOAD_SHEDDING_MAX_IN_FLIGHT", default=32, cast=int
+)
+LOAD_SHEDDING_HARD_MAX_IN_FLIGHT = config(
+    "LOAD_SHEDDING_HARD_MAX_IN_FLIGHT", default=64, cast=int
+)
+LOAD_SHEDDING_TARGET_P95_MS = config(
+    "LOAD_SHEDDING_TARGET_P95_MS", default=2000, cast=int
+)
+LOAD_SHEDDING_WINDOW_SECONDS = config(
+    "LOAD_SHEDDING_WINDOW_SECONDS", default=10, cast=int
+)
+LOAD_SHEDDING_RETRY_AFTER_SECONDS = config(
+    "LOAD_SHEDDING_RETRY_AFTER_SECONDS", default=5, cast=int
+)
+# Probes de orquestração; /api/health/ é o HEALTHCHECK do Dockerfile
+LOAD_SHEDDING_EXEMPT_PATHS = (
+    "/api/health/",
+    "/api/health/live/",
+    "/api/health/ready/",
+)
+
+# =============================================================================
+# Deadlines por requisição
+# Decisão técnica: Cada requisição tem um orçamento de tempo (padrão ou por
+# nome de rota), que o cliente pode reduzir com X-Request-Timeout. O restante
+# é aplicado como statement_timeout no PostgreSQL; estouros viram 504.
+# Abaixo do --timeout do gunicorn (120s) para liberar o worker antes.
+# =============================================================================
+DEADLINE_DEFAULT_SECONDS = config("DEADLINE_DEFAULT_SECONDS", default=30, cast=float)
+DEADLINE_ROUTE_SECONDS = {
+    # Listagem com busca e filtros: a rota mais sujeita a queries lentas
+    "consulta-list": config("DEADLINE_CONSULTA_LIST_SECONDS", default=10, cast=float),
+}
+
+# =============================================================================
+# Log de acesso
+# Decisão técnica: Sucessos são amostrados para reduzir I/O com muitas
+# requisições por segundo; erros (>= 400) e requisições lentas são sempre
+# registrados. O access.log é gravado em JSON (core.log_formatters).
+# =============================================================================
+ACCESS_LOG_SAMPLE_RATE = config("ACCESS_LOG_SAMPLE_RATE", default=1.0, cast=float)
+ACCESS_LOG_SLOW_MS = config("ACCESS_LOG_SLOW_MS", default=1000, cast=int)
+
 LOGGING = {
     "version": 1,
     "disable_existing_loggers": False,
@@ -266,9 +526,7 @@ LOGGING = {
             "style": "{",
         },
         "json": {
-            "()": "django.utils.log.ServerFormatter",
-            "format": "[{asctime}] {levelname} {name} {message}",
-            "style": "{",
+            "()": "core.log_formatters.JSONFormatter",
         },
     },
     "filters": {
@@ -288,16 +546,16 @@ LOGGING = {
         },
         "file_access": {
             "level": "INFO",
-            "class": "logging.handlers.RotatingFileHandler",
+            "class": "core.log_handlers.ConcurrentRotatingFileHandler",
             "filename": str(LOG_DIR / "access.log"),
             "maxBytes": 10 * 1024 * 1024,  # 10MB
             "backupCount": 5,
-            "formatter": "verbose",
+            "formatter": "json",
             "filters": ["correlation_id"],
         },
         "file_error": {
             "level": "ERROR",
-            "class": "logging.handlers.RotatingFileHandler",
+            "class": "core.log_handlers.ConcurrentRotatingFileHandler",
             "filename": str(LOG_DIR / "error.log"),
             "maxBytes": 10 * 1024 * 1024,  # 10MB
             "backupCount": 5,
@@ -328,3 +586,33 @@ LOGGING = {
         },
     },
 }
+
+# =============================================================================
+# Pipeline de logging
+# Decisão técnica: Em `queue`, as threads de requisição só enfileiram os
+# records e um writer por worker faz formatação e I/O (core.log_handlers).
+# Com a fila cheia, `drop` descarta (a requisição nunca espera pelo log) e
+# `block` espera até LOG_QUEUE_BLOCK_TIMEOUT_SECONDS antes de descartar.
+# =============================================================================
+LOG_PIPELINE = config("LOG_PIPELINE", default="sync")  # sync | queue
+LOG_QUEUE_MAXSIZE = config("LOG_QUEUE_MAXSIZE", default=10000, cast=int)
+LOG_QUEUE_FULL_POLICY = config("LOG_QUEUE_FULL_POLICY", default="drop")
+LOG_QUEUE_BLOCK_TIMEOUT_SECONDS = config(
+    "LOG_QUEUE_BLOCK_TIMEOUT_SECONDS", default=1.0, cast=float
+)
+
+if LOG_PIPELINE == "queue":
+    for _logger_name, _logger_config in LOGGING["loggers"].items():
+        # O prefixo "queue_" garante que os destinos (console, file_*) sejam
+        # criados antes pelo dictConfig, que segue a ordem alfabética.
+        _queue_handler = f"queue_{_logger_name}"
+        LOGGING["handlers"][_queue_handler] = {
+            "()": "core.log_handlers.QueueLogHandler",
+            "targets": _logger_config["handlers"],
+            "maxsize": LOG_QUEUE_MAXSIZE,
+            "full_policy": LOG_QUEUE_FULL_POLICY,
+            "block_timeout": LOG_QUEUE_BLOCK_TIMEOUT_SECONDS,
+            # Capturado na thread da requisição, antes de enfileirar
+            "filters": ["correlation_id"],
+        }
+        _logger_config["handlers"] = [_queue_handler]
@@ -5,6 +5,8 @@ Decisão técnica: Produção tem as configurações de segurança mais restriti
 HSTS longo, SSL obrigatório, e throttling mais conservador.
 """
 
+from django.core.exceptions import ImproperlyConfigured
+
 from .base import *  # noqa: F401,F403
 
 DEBUG = False
@@ -32,11 +34,35 @@ CORS_ALLOWED_ORIGINS = config(  # noqa: F405
     cast=Csv(),  # noqa: F405
 )
 
-# Throttling mais conservador em produção
-REST_FRAMEWORK["DEFAULT_THROTTLE_RATES"] = {  # noqa: F405
-    "anon": "30/hour",
-    "user": "150/hour",
+# Cache compartilhado obrigatório: com LocMemCache cada worker teria os
+# próprios contadores de throttling e o limite efetivo seria multiplicado
+# pelo número de workers.
+if not CACHE_REDIS_URL:  # noqa: F405
+    raise ImproperlyConfigured(
+        "CACHE_REDIS_URL é obrigatório em produção (cache compartilhado "
+        "entre workers para throttling e fragmentos)."
+    )
+
+# Throttling mais conservador em produção. Só anon e user mudam: as taxas
+# por escopo (profissionais, consultas) continuam as da base. Cópias, para
+# não alterar os dicts do módulo base.
+REST_FRAMEWORK = {
+    **REST_FRAMEWORK,  # noqa: F405
+    "DEFAULT_THROTTLE_RATES": {
+        **REST_FRAMEWORK["DEFAULT_THROTTLE_RATES"],  # noqa: F405
+        "anon": "30/hour",
+        "user": "150/hour",
+    },
 }
 
+# Server-Timing desabilitado por padrão (expõe detalhes internos)
+SERVER_TIMING_ENABLED = config(  # noqa: F405
+    "SERVER_TIMING_ENABLED", default=False, cast=bool
+)
+
 # Logging - apenas erros e acessos importantes
+# Log de acesso: 10% dos sucessos (erros e requisições lentas sempre)
+ACCESS_LOG_SAMPLE_RATE = config(  # noqa: F405
+    "ACCESS_LOG_SAMPLE_RATE", default=0.1, cast=float
+)
 LOGGING["loggers"]["apps"]["level"] = "WARNING"  # noqa: F405
@@ -32,5 +32,10 @@ CORS_ALLOWED_ORIGINS = config(  # noqa: F405
     cast=Csv(),  # noqa: F405
 )
 
+# Server-Timing habilitado em staging para diagnóstico de performance
+SERVER_TIMING_ENABLED = config(  # noqa: F405
+    "SERVER_TIMING_ENABLED", default=True, cast=bool
+)
+
 # Logging mais detalhado em staging
 LOGGING["loggers"]["apps"]["level"] = "DEBUG"  # noqa: F405
@@ -0,0 +1,176 @@
+"""
+Sparse fieldsets: `?fields=` e `?omit=` nas leituras dos viewsets.
+
+Decisão técnica: Clientes que só precisam de id/data/profissional_nome
+recebiam (e o banco lia) todas as colunas, inclusive TextFields como
+`endereco` do profissional aninhado. Com `?fields=id,data` (ou
+`?omit=observacoes`), o serializer da action perde os campos não pedidos e
+o queryset ganha `.only()` com as colunas que sobraram, inclusive as da
+relação em `select_related` — que é refeito só com as relações
+necessárias.
+
+As colunas de cada campo vêm do `source` do serializer (serializers
+aninhados viram `relacao__coluna`). Campos que não são colunas (properties,
+anotações) precisam declarar as colunas de que dependem em
+`sparse_field_columns` na view (ex: `{"is_future": ["data"]}`).
+
+Vale só para métodos seguros: escritas sempre validam e respondem com o
+serializer completo. Campos desconhecidos resultam em 400.
+"""
+
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import OpenApiParameter
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import QuerySet
+from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+
+from core.domain import ValidationException
+
+FIELDS_PARAM = "fields"
+OMIT_PARAM = "omit"
+
+SPARSE_FIELDS_PARAMETERS = [
+    OpenApiParameter(
+        FIELDS_PARAM,
+        OpenApiTypes.STR,
+        description="Campos da resposta, separados por vírgula (ex: id,data).",
+    ),
+    OpenApiParameter(
+        OMIT_PARAM,
+        OpenApiTypes.STR,
+        description="Campos a remover da resposta, separados por vírgula.",
+    ),
+]
+
+
+def split_param(value):
+    return [name.strip() for name in value.split(",") if name.strip()]
+
+
+def _concrete_path(model, path):
+    """Indica se `path` (lookup com __) termina em uma coluna do modelo."""
+    parts = path.split("__")
+    for index, part in enumerate(parts):
+        try:
+            field = model._meta.get_field(part)
+        except FieldDoesNotExist:
+            return False
+        if index == len(parts) - 1:
+            return field.concrete
+        if not (field.many_to_one or field.one_to_one) or not field.concrete:
+            return False
+        model = field.related_model
+    return False
+
+
+def serializer_columns(model, serializer, names, overrides=None, prefix=""):
+    """Lookups de `.only()` para os campos `names` do serializer."""
+    overrides = overrides or {}
+    columns = []
+    for name in names:
+        if name in overrides:
+            columns.extend(overrides[name])
+            continue
+        field = serializer.fields[name]
+        if field.source == "*":
+            continue
+        source = prefix + field.source.replace(".", "__")
+        if isinstance(field, serializers.BaseSerializer):
+            nested = getattr(field, "child", field)
+            columns.extend(
+                serializer_columns(
+                    model, nested, list(nested.fields), prefix=f"{source}__"
+                )
+            )
+        elif _concrete_path(model, source):
+            columns.append(source)
+    return columns
+
+
+class SparseFieldsetMixin:
+    """
+    Mixin de viewsets: aplica `?fields=`/`?omit=` ao serializer e ao
+    queryset das leituras.
+    """
+
+    # Colunas de campos que não são colunas do modelo (properties, etc.)
+    sparse_field_columns = {}
+
+    @property
+    def sparse_fields(self):
+        """Campos pedidos, na ordem do serializer, ou None (resposta completa)."""
+        if not hasattr(self, "_sparse_fields"):
+            self._sparse_fields = self._parse_sparse_fields()
+        return self._sparse_fields
+
+    def wants_field(self, name):
+        """Indica se o campo `name` estará na resposta desta requisição."""
+        if name not in self.available_fields():
+            return False
+        return self.sparse_fields is None or name in self.sparse_fields
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        selected = self.sparse_fields
+        if selected is not None:
+            target = getattr(serializer, "child", serializer)
+            for name in list(target.fields):
+                if name not in selected:
+                    target.fields.pop(name)
+        return serializer
+
+    def filter_queryset(self, queryset):
+        return self.narrow_queryset(super().filter_queryset(queryset))
+
+    def narrow_queryset(self, queryset):
+        """`.only()` com as colunas dos campos pedidos."""
+        selected = self.sparse_fields
+        if selected is None or not isinstance(queryset, QuerySet):
+            return queryset
+        if queryset._fields is not None:
+            # Querysets de `.values()` escolhem as próprias colunas
+            return queryset
+
+        serializer = self.get_serializer_class()(context=self.get_serializer_context())
+        columns = serializer_columns(
+            queryset.model, serializer, selected, self.sparse_field_columns
+        )
+        # Ex: updated_at, chave do cache de fragmentos (core.fragment_cache)
+        columns.extend(getattr(serializer, "fragment_columns", ()))
+        relations = sorted(
+            {column.split("__")[0] for column in columns if "__" in column}
+        )
+        queryset = queryset.select_related(None)
+        if relations:
+            queryset = queryset.select_related(*relations)
+        return queryset.only("pk", *relations, *columns)
+
+    def available_fields(self):
+        """Campos do serializer da action (já com os `?expand=` pedidos)."""
+        serializer_class = self.get_serializer_class()
+        return list(serializer_class(context=self.get_serializer_context()).fields)
+
+    def _parse_sparse_fields(self):
+        request = getattr(self, "request", None)
+        # Sem requisição (geração do schema OpenAPI) ou em escritas
+        if request is None or request.method not in SAFE_METHODS:
+            return None
+        params = request.query_params
+        fields = split_param(params.get(FIELDS_PARAM, ""))
+        omit = split_param(params.get(OMIT_PARAM, ""))
+        if not fields and not omit:
+            return None
+
+        available = self.available_fields()
+        unknown = sorted((set(fields) | set(omit)) - set(available))
+        if unknown:
+            raise ValidationException(
+                f"Campos desconhecidos: {', '.join(unknown)}.", field=FIELDS_PARAM
+            )
+        return [
+            name
+            for name in available
+            if (not fields or name in fields) and name not in omit
+        ]
@@ -0,0 +1,1995 @@
+"""
+Testes automatizados da camada de infraestrutura (core).
+
+Cobertura:
+- Health check e snapshot de métricas de negócio
+- Instrumentação de SQL por requisição (contagem, tempo, N+1)
+- Header Server-Timing com quebra por fase
+- Profiling amostral de requisições lentas
+- Tracing com exportação OTLP/JSON em arquivo
+- Correlation ID em contextvars (async e executores)
+- Middlewares de observabilidade em modo async (ASGI)
+- Pipeline de logging com fila e rotação entre processos
+- Log de acesso estruturado (JSON) com amostragem
+- Load shedding adaptativo
+- Deadline por requisição e statement_timeout
+- Estatísticas de conexão com o banco (pool)
+- Leituras na réplica com read-your-writes
+- Cache LRU de tokens JWT verificados
+- Usuário stateless a partir das claims do token
+- Revogação de tokens com Bloom filter
+- Throttling por janela deslizante com custo por endpoint
+- Idempotency-Key na criação de consultas e profissionais
+- Concorrência otimista com versão, ETag e If-Match
+- Orçamento de queries por endpoint
+- Sparse fieldsets (?fields= / ?omit=) na resposta e no SELECT
+- Cache de fragmentos serializados de profissionais
+"""
+
+import asyncio
+import importlib
+import json
+import logging
+import os
+import runpy
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.db import OperationalError, connection
+from django.db.models import F
+from django.http import HttpResponse
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.functional import SimpleLazyObject
+from rest_framework import status
+from rest_framework.test import APIRequestFactory, APITestCase
+from rest_framework.throttling import SimpleRateThrottle
+
+from apps.consultas.models import Consulta
+from apps.consultas.services.consulta_service import ConsultaService
+from apps.consultas.views import ConsultaViewSet
+from apps.profissionais.models import Profissional
+from apps.profissionais.views import ProfissionalViewSet
+from core.authentication import ClaimsUser, TokenAuthCache
+from core.business_metrics import BusinessMetricsSnapshot
+from core.concurrency import check_if_match, parse_if_match
+from core.db_pool import pool_stats
+from core.db_router import STICKY_COOKIE, STICKY_HEADER
+from core.deadline import end_deadline, enforce_deadline, start_deadline
+from core.domain import PreconditionFailedException
+from core.exceptions import custom_exception_handler
+from core.fragment_cache import FragmentCache
+from core.idempotency import IdempotentCreateMixin
+from core.log_formatters import JSONFormatter
+from core.log_handlers import (
+    ConcurrentRotatingFileHandler,
+    LogPipeline,
+    QueueLogHandler,
+)
+from core.middleware.correlation_middleware import (
+    CorrelationIdFilter,
+    CorrelationIdMiddleware,
+    get_correlation_id,
+)
+from core.middleware.deadline_middleware import DeadlineMiddleware
+from core.middleware.logging_middleware import RequestLoggingMiddleware
+from core.middleware.metrics_middleware import MetricsCollector, MetricsMiddleware
+from core.middleware.query_middleware import (
+    QueryInstrumentationMiddleware,
+    QueryStats,
+    normalize_sql,
+)
+from core.models import IdempotencyKey, RevokedToken
+from core.query_budget import get_query_budget
+from core.revocation import BloomFilter, RevocationFilter
+from core.throttling import SlidingWindowScopedThrottle, ThrottleCounterStore
+from core.tracing import BatchFileSpanExporter, end_trace, span, start_trace
+from core.utils.context import submit_with_context
+from core.views import (
+    HealthCheckView,
+    LivenessCheckView,
+    MetricsView,
+    ReadinessCheckView,
+)
+
+
+# =============================================================================
+# TESTES DE HEALTH CHECK
+# =============================================================================
+class HealthCheckTests(APITestCase):
+    """Testes do health check com métricas de negócio em cache."""
+
+    def setUp(self):
+        self.snapshot = BusinessMetricsSnapshot()
+        self.snapshot.reset()
+        self.addCleanup(self.snapshot.reset)
+
+        profissional = Profissional.objects.create(
+            nome_social="Dra. Health",
+            profissao="Medicina",
+            endereco="Rua Health, 1",
+            contato="health@email.com",
+        )
+        Consulta.objects.create(
+            data=timezone.now() + timedelta(days=3),
+            profissional=profissional,
+        )
+        self.url = reverse("health-check")
+
+    def test_health_sem_snapshot_retorna_metricas_nulas(self):
+        """Sem snapshot calculado, deve responder sem consultar contagens."""
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIsNone(response.data["metrics"])
+        self.assertIsNone(response.data["metrics_age_seconds"])
+
+    def test_health_usa_snapshot_em_cache(self):
+        """Deve retornar as métricas do snapshot e sua idade."""
+        self.snapshot.refresh()
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["metrics"]["total_profissionais"], 1)
+        self.assertEqual(response.data["metrics"]["total_consultas"], 1)
+        self.assertEqual(response.data["metrics"]["consultas_futuras"], 1)
+        self.assertGreaterEqual(response.data["metrics_age_seconds"], 0)
+
+    def test_health_executa_apenas_select_1(self):
+        """Com snapshot válido, o health check executa uma única query."""
+        self.snapshot.refresh()
+        with self.assertNumQueries(1):
+            self.client.get(self.url)
+
+    def test_snapshot_expirado_agenda_refresh(self):
+        """Snapshot expirado deve ser servido e o refresh agendado."""
+        self.snapshot.refresh()
+        with (
+            mock.patch.object(
+                BusinessMetricsSnapshot, "_start_background_refresh"
+            ) as start,
+            self.settings(HEALTH_METRICS_TTL_SECONDS=0),
+        ):
+            metrics, _ = self.snapshot.get()
+        self.assertEqual(metrics["total_consultas"], 1)
+        start.assert_called_once()
+
+    def test_metrics_view_usa_snapshot(self):
+        """O endpoint de métricas também deve usar o snapshot."""
+        self.snapshot.refresh()
+        response = self.client.get(reverse("metrics"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["business"]["total_profissionais"], 1)
+        self.assertIn("business_age_seconds", response.data)
+
+
+# =============================================================================
+# TESTES DE INSTRUMENTAÇÃO DE SQL
+# =============================================================================
+class QueryInstrumentationTests(APITestCase):
+    """Testes da instrumentação de queries por requisição."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="sql", password="sqlpass123")
+        refresh = RefreshToken.for_user(self.user)
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {str(refresh.access_token)}"
+        )
+        self.collector = MetricsCollector()
+        self.collector.reset()
+        self.addCleanup(self.collector.reset)
+
+    def test_normalize_sql_agrupa_listas_in(self):
+        """Listas IN de tamanhos diferentes devem ter o mesmo fingerprint."""
+        self.assertEqual(
+            normalize_sql("SELECT * FROM t WHERE id IN (%s, %s)  LIMIT 21"),
+            normalize_sql("SELECT * FROM t WHERE id IN (%s) LIMIT 21"),
+        )
+
+    def test_query_stats_detecta_n_plus_one(self):
+        """Mesmo statement repetido acima do limite deve ser sinalizado."""
+        stats = QueryStats()
+        with connection.execute_wrapper(stats):
+            for _ in range(4):
+                Profissional.objects.filter(pk=1).exists()
+            User.objects.count()
+
+        self.assertEqual(stats.count, 5)
+        self.assertGreater(stats.duration, 0)
+        self.assertEqual(stats.n_plus_one(threshold=5), {})
+        suspects = stats.n_plus_one(threshold=3)
+        self.assertEqual(list(suspects.values()), [4])
+
+    def test_metricas_por_rota(self):
+        """Métricas devem agregar queries por nome de rota."""
+        self.client.get(reverse("profissional-list"))
+        self.client.get(reverse("profissional-list"))
+
+        routes = self.collector.get_metrics()["routes"]
+        self.assertIn("profissional-list", routes)
+        self.assertEqual(routes["profissional-list"]["requests"], 2)
+        self.assertGreaterEqual(routes["profissional-list"]["max_queries"], 1)
+
+    def test_log_de_acesso_inclui_queries(self):
+        """A linha de log de acesso deve conter contagem e tempo de banco."""
+        with self.assertLogs("core.middleware", level="INFO") as logs:
+            self.client.get(reverse("profissional-list"))
+        self.assertTrue(any("Queries:" in line for line in logs.output))
+        self.assertTrue(any("DB:" in line for line in logs.output))
+
+
+# =============================================================================
+# TESTES DE SERVER-TIMING
+# =============================================================================
+class ServerTimingTests(APITestCase):
+    """Testes do header Server-Timing."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="timing", password="pass12345")
+        refresh = RefreshToken.for_user(self.user)
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {str(refresh.access_token)}"
+        )
+        profissional = Profissional.objects.create(
+            nome_social="Dr. Timing",
+            profissao="Medicina",
+            endereco="Rua Timing, 1",
+            contato="timing@email.com",
+        )
+        Consulta.objects.create(
+            data=timezone.now() + timedelta(days=1),
+            profissional=profissional,
+        )
+
+    def test_header_com_fases(self):
+        """Listagem deve expor auth, serialize, render, db e total."""
+        with self.settings(SERVER_TIMING_ENABLED=True):
+            response = self.client.get(reverse("consulta-list"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        header = response["Server-Timing"]
+        for phase in ("auth;", "serialize;", "render;", "db;", "total;"):
+            self.assertIn(phase, header)
+
+    def test_header_desabilitado(self):
+        """Sem a flag, o header não deve ser enviado."""
+        with self.settings(SERVER_TIMING_ENABLED=False):
+            response = self.client.get(reverse("consulta-list"))
+        self.assertFalse(response.has_header("Server-Timing"))
+
+
+# =============================================================================
+# TESTES DE PROFILING
+# =============================================================================
+class ProfilingMiddlewareTests(APITestCase):
+    """Testes do profiling amostral de requisições lentas."""
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.profile_dir = Path(tmp.name)
+        self.url = reverse("liveness-check")
+
+    def _profiles(self):
+        return sorted(self.profile_dir.glob("*.prof"))
+
+    def test_salva_profile_acima_do_limite(self):
+        """Requisição amostrada e lenta deve gerar arquivo com o CID."""
+        with self.settings(
+            PROFILING_SAMPLE_RATE=1.0,
+            PROFILING_THRESHOLD_MS=0,
+            PROFILING_DIR=self.profile_dir,
+        ):
+            response = self.client.get(self.url, HTTP_X_CORRELATION_ID="cid-lento")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        profiles = self._profiles()
+        self.assertEqual(len(profiles), 1)
+        self.assertIn("cid-lento", profiles[0].name)
+
+    def test_descarta_profile_abaixo_do_limite(self):
+        """Requisições rápidas não devem gerar arquivos."""
+        with self.settings(
+            PROFILING_SAMPLE_RATE=1.0,
+            PROFILING_THRESHOLD_MS=60_000,
+            PROFILING_DIR=self.profile_dir,
+        ):
+            self.client.get(self.url)
+        self.assertEqual(self._profiles(), [])
+
+    def test_retencao_limita_quantidade(self):
+        """Deve manter apenas PROFILING_MAX_FILES arquivos."""
+        with self.settings(
+            PROFILING_SAMPLE_RATE=1.0,
+            PROFILING_THRESHOLD_MS=0,
+            PROFILING_DIR=self.profile_dir,
+            PROFILING_MAX_FILES=2,
+        ):
+            for index in range(4):
+                self.client.get(self.url, HTTP_X_CORRELATION_ID=f"cid-{index}")
+        self.assertEqual(len(self._profiles()), 2)
+
+    def test_correlation_id_sanitizado_no_nome(self):
+        """Correlation ID do cliente não pode escapar do diretório."""
+        with self.settings(
+            PROFILING_SAMPLE_RATE=1.0,
+            PROFILING_THRESHOLD_MS=0,
+            PROFILING_DIR=self.profile_dir,
+        ):
+            self.client.get(self.url, HTTP_X_CORRELATION_ID="../../etc/passwd")
+        profiles = self._profiles()
+        self.assertEqual(len(profiles), 1)
+        self.assertEqual(profiles[0].parent, self.profile_dir)
+
+
+# =============================================================================
+# TESTES DE TRACING
+# =============================================================================
+class TracingTests(APITestCase):
+    """Testes de spans e do exportador em arquivo."""
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.export_path = Path(tmp.name) / "traces.jsonl"
+
+        self.user = User.objects.create_user(username="trace", password="pass12345")
+        refresh = RefreshToken.for_user(self.user)
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {str(refresh.access_token)}"
+        )
+        profissional = Profissional.objects.create(
+            nome_social="Dra. Trace",
+            profissao="Medicina",
+            endereco="Rua Trace, 1",
+            contato="trace@email.com",
+        )
+        Consulta.objects.create(
+            data=timezone.now() + timedelta(days=1),
+            profissional=profissional,
+        )
+
+    def _read(self):
+        return self.export_path.read_text() if self.export_path.exists() else ""
+
+    def _exported_spans(self):
+        BatchFileSpanExporter().flush()
+        spans = []
+        for line in self.export_path.read_text().splitlines():
+            for resource in json.loads(line)["resourceSpans"]:
+                for scope in resource["scopeSpans"]:
+                    spans.extend(scope["spans"])
+        return spans
+
+    def test_requisicao_amostrada_exporta_spans(self):
+        """Requisição amostrada deve gerar spans de request, SQL e serialização."""
+        correlation_id = "3f1c2b7e-1d2a-4c5b-9e8f-0a1b2c3d4e5f"
+        with self.settings(
+            TRACING_SAMPLE_RATE=1.0, TRACING_EXPORT_PATH=self.export_path
+        ):
+            self.client.get(
+                reverse("consulta-list"), HTTP_X_CORRELATION_ID=correlation_id
+            )
+            spans = self._exported_spans()
+
+        names = [exported["name"] for exported in spans]
+        self.assertIn("GET consulta-list", names)
+        self.assertIn("ConsultaService.list_consultas", names)
+        self.assertIn("db.query", names)
+        self.assertIn("serialize ConsultaListValuesSerializer[]", names)
+
+        root = next(s for s in spans if s["name"] == "GET consulta-list")
+        self.assertNotIn("parentSpanId", root)
+        self.assertEqual(root["traceId"], correlation_id.replace("-", ""))
+        self.assertTrue(all(s["traceId"] == root["traceId"] for s in spans))
+
+    def test_requisicao_nao_amostrada_nao_exporta(self):
+        """Com amostragem zero, nada deve ser exportado."""
+        with self.settings(
+            TRACING_SAMPLE_RATE=0.0, TRACING_EXPORT_PATH=self.export_path
+        ):
+            self.client.get(reverse("consulta-list"))
+            BatchFileSpanExporter().flush()
+        self.assertFalse(self.export_path.exists())
+
+    def test_span_registra_erro(self):
+        """Exceções dentro do span devem marcar status de erro."""
+        with self.settings(
+            TRACING_SAMPLE_RATE=1.0, TRACING_EXPORT_PATH=self.export_path
+        ):
+            start_trace()
+            with self.assertRaises(ValueError):
+                with span("falha"):
+                    raise ValueError("boom")
+            end_trace()
+            spans = self._exported_spans()
+        self.assertEqual(spans[0]["status"]["code"], 2)
+
+    def test_flush_por_tempo_sem_novos_spans(self):
+        """Spans parados no buffer são gravados pela thread do exportador."""
+        with self.settings(
+            TRACING_SAMPLE_RATE=1.0,
+            TRACING_EXPORT_PATH=self.export_path,
+            TRACING_FLUSH_INTERVAL_SECONDS=0.05,
+        ):
+            start_trace()
+            with span("ocioso"):
+                pass
+            end_trace()
+            deadline = time.monotonic() + 5
+            while time.monotonic() < deadline and "ocioso" not in self._read():
+                time.sleep(0.01)
+
+        self.assertIn("ocioso", self._read())
+        # Escrita sob flock compartilhado pelos workers
+        self.assertTrue(Path(f"{self.export_path}.lock").exists())
+
+
+# =============================================================================
+# TESTES DE CORRELATION ID (CONTEXTVARS)
+# =============================================================================
+class CorrelationIdContextTests(APITestCase):
+    """Isolamento do Correlation ID entre requisições async e threads."""
+
+    def setUp(self):
+        self.factory = APIRequestFactory()
+
+    def test_requisicoes_async_concorrentes_nao_misturam_ids(self):
+        """Cada requisição async deve enxergar apenas o próprio ID."""
+
+        async def view(request):
+            await asyncio.sleep(0.01)
+            return HttpResponse(get_correlation_id())
+
+        middleware = CorrelationIdMiddleware(view)
+
+        async def run_all():
+            requests = [
+                self.factory.get("/", HTTP_X_CORRELATION_ID=f"cid-{index}")
+                for index in range(10)
+            ]
+            return await asyncio.gather(*(middleware(r) for r in requests))
+
+        responses = asyncio.run(run_all())
+        for index, response in enumerate(responses):
+            self.assertEqual(response.content.decode(), f"cid-{index}")
+            self.assertEqual(response["X-Correlation-ID"], f"cid-{index}")
+        self.assertIsNone(get_correlation_id())
+
+    def test_id_limpo_apos_requisicao_sync(self):
+        """Após a resposta, o contexto não deve manter o ID."""
+        middleware = CorrelationIdMiddleware(lambda request: HttpResponse())
+        response = middleware(self.factory.get("/", HTTP_X_CORRELATION_ID="abc"))
+        self.assertEqual(response["X-Correlation-ID"], "abc")
+        self.assertIsNone(get_correlation_id())
+
+    def test_submit_with_context_propaga_id(self):
+        """Executores devem receber o ID da requisição que agendou a tarefa."""
+
+        def view(request):
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                propagated = submit_with_context(executor, get_correlation_id)
+                plain = executor.submit(get_correlation_id)
+                return HttpResponse(f"{propagated.result()}|{plain.result()}")
+
+        middleware = CorrelationIdMiddleware(view)
+        response = middleware(self.factory.get("/", HTTP_X_CORRELATION_ID="job-1"))
+        self.assertEqual(response.content.decode(), "job-1|None")
+
+
+# =============================================================================
+# TESTES DE MIDDLEWARES ASYNC (ASGI)
+# =============================================================================
+class AsyncMiddlewareTests(APITestCase):
+    """Pilha de observabilidade sem adaptação sync/async sob ASGI."""
+
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.collector = MetricsCollector()
+        self.collector.reset()
+
+    def _stack(self, view):
+        return QueryInstrumentationMiddleware(
+            RequestLoggingMiddleware(MetricsMiddleware(view))
+        )
+
+    def test_middlewares_usam_modo_async_com_handler_async(self):
+        """Com handler async, os middlewares devem ser corrotinas nativas."""
+
+        async def view(request):
+            return HttpResponse()
+
+        self.assertTrue(iscoroutinefunction(self._stack(view)))
+        self.assertFalse(iscoroutinefunction(self._stack(lambda r: HttpResponse())))
+
+    def test_queries_em_sync_to_async_sao_contadas(self):
+        """Queries feitas em threads de sync_to_async entram no QueryStats."""
+
+        def query():
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+                cursor.execute("SELECT 2")
+
+        async def view(request):
+            await sync_to_async(query)()
+            return HttpResponse()
+
+        request = self.factory.get("/api/health/live/")
+        with self.assertLogs("core.middleware", level="INFO") as logs:
+            response = asyncio.run(self._stack(view)(request))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(request.query_stats.count, 2)
+        self.assertIn("Queries: 2", logs.output[-1])
+        self.assertEqual(self.collector.get_metrics()["total_requests"], 1)
+
+    async def test_pilha_completa_sob_asgi(self):
+        """Todos os middlewares configurados (inclusive o de deadline) sob ASGI."""
+        response = await self.async_client.get(reverse("liveness-check"))
+
+        self.assertEqual(response.status_code, 200)
+
+    async def test_deadline_sob_asgi_chega_ao_banco(self):
+        """O deadline iniciado no middleware vale nas queries da view sync."""
+        user = await sync_to_async(User.objects.create_user)(
+            username="asgi", password="pass"
+        )
+        headers = {
+            "authorization": f"Bearer {AccessToken.for_user(user)}",
+            "x-request-timeout": "0.000001",
+        }
+        with self.assertLogs("apps", level="WARNING"):
+            response = await self.async_client.get(
+                reverse("profissional-list"), headers=headers
+            )
+
+        self.assertEqual(response.status_code, 504)
+        self.assertEqual(response.json()["code"], "deadline_exceeded")
+
+
+# =============================================================================
+# TESTES DO PIPELINE DE LOGGING
+# =============================================================================
+class _ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+class LogPipelineTests(APITestCase):
+    """QueueLogHandler, política de fila cheia e rotação entre processos."""
+
+    def setUp(self):
+        self.target = _ListHandler()
+        self.target.set_name("test_pipeline_target")
+        self.addCleanup(self.target.close)
+
+    def _record(self, message="mensagem %s", args=("a",)):
+        return logging.LogRecord(
+            "core.middleware", logging.INFO, __file__, 1, message, args, None
+        )
+
+    def test_writer_entrega_ao_destino_com_correlation_id(self):
+        """O ID é capturado na thread da requisição e a mensagem é congelada."""
+        pipeline = LogPipeline(maxsize=100)
+        pipeline.start()
+        self.addCleanup(pipeline.stop)
+        handler = QueueLogHandler(["test_pipeline_target"])
+        handler.addFilter(CorrelationIdFilter())
+
+        def view(request):
+            handler.handle(self._record())
+            return HttpResponse()
+
+        middleware = CorrelationIdMiddleware(view)
+        with mock.patch("core.log_handlers.get_pipeline", return_value=pipeline):
+            middleware(APIRequestFactory().get("/", HTTP_X_CORRELATION_ID="log-1"))
+        pipeline.flush()
+
+        record = self.target.records[0]
+        self.assertEqual(record.getMessage(), "mensagem a")
+        self.assertEqual(record.correlation_id, "log-1")
+
+    def test_fila_cheia_descarta_e_conta(self):
+        """Com a política drop, a requisição não espera e o descarte é contado."""
+        pipeline = LogPipeline(maxsize=1)  # writer parado: a fila enche
+        handler = QueueLogHandler(["test_pipeline_target"], maxsize=1)
+
+        with mock.patch("core.log_handlers.get_pipeline", return_value=pipeline):
+            for _ in range(3):
+                handler.handle(self._record())
+
+        self.assertEqual(pipeline.stats(), {"queue_size": 1, "dropped": 2})
+
+    def test_destino_inexistente_falha_na_configuracao(self):
+        with self.assertRaises(ValueError):
+            QueueLogHandler(["handler_inexistente"])
+
+    def test_rotacao_por_outro_processo_reabre_arquivo(self):
+        """Após outro processo rotacionar, o handler escreve no arquivo novo."""
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = Path(directory.name) / "access.log"
+
+        worker_a = ConcurrentRotatingFileHandler(path, maxBytes=50, backupCount=2)
+        worker_b = ConcurrentRotatingFileHandler(path, maxBytes=50, backupCount=2)
+        self.addCleanup(worker_a.close)
+        self.addCleanup(worker_b.close)
+
+        worker_b.handle(self._record("b-antes", ()))
+        worker_a.handle(self._record("a" * 60, ()))
+        worker_a.handle(self._record("a-rotacionou", ()))
+        worker_b.handle(self._record("b-depois", ()))
+
+        current = path.read_text()
+        self.assertIn("a-rotacionou", current)
+        self.assertIn("b-depois", current)
+        self.assertNotIn("b-depois", (path.parent / "access.log.1").read_text())
+
+
+# =============================================================================
+# TESTES DO LOG DE ACESSO ESTRUTURADO
+# =============================================================================
+class AccessLogTests(APITestCase):
+    """Record estruturado, formatter JSON e amostragem de sucessos."""
+
+    def setUp(self):
+        self.live_url = reverse("liveness-check")
+
+    def test_record_estruturado_renderizado_em_json(self):
+        with self.assertLogs("core.middleware", level="INFO") as logs:
+            self.client.get(self.live_url, HTTP_X_CORRELATION_ID="json-1")
+
+        record = logs.records[-1]
+        record.correlation_id = "json-1"
+        data = json.loads(JSONFormatter().format(record))
+        self.assertEqual(data["route"], "liveness-check")
+        self.assertEqual(data["status"], 200)
+        self.assertEqual(data["cid"], "json-1")
+        self.assertEqual(data["correlation_id"], "json-1")
+        self.assertEqual(data["method"], "GET")
+        self.assertIn("duration_ms", data)
+        self.assertIn("Status: 200", data["message"])
+
+    @override_settings(ACCESS_LOG_SAMPLE_RATE=0, ACCESS_LOG_SLOW_MS=60000)
+    def test_sucesso_fora_da_amostra_nao_e_logado(self):
+        with mock.patch("core.middleware.logging_middleware.logger.log") as log:
+            self.client.get(self.live_url)
+        log.assert_not_called()
+
+    @override_settings(ACCESS_LOG_SAMPLE_RATE=0, ACCESS_LOG_SLOW_MS=60000)
+    def test_erros_sempre_logados(self):
+        with self.assertLogs("core.middleware", level="WARNING") as logs:
+            self.client.get("/api/rota-inexistente/")
+        self.assertEqual(logs.records[-1].access["status"], 404)
+
+    @override_settings(ACCESS_LOG_SAMPLE_RATE=0, ACCESS_LOG_SLOW_MS=0)
+    def test_requisicoes_lentas_sempre_logadas(self):
+        with self.assertLogs("core.middleware", level="INFO") as logs:
+            self.client.get(self.live_url)
+        self.assertEqual(logs.records[-1].access["route"], "liveness-check")
+
+    def test_usuario_jwt_resolvido_pela_view(self):
+        user = User.objects.create_user(username="logado", password="pass")
+        token = AccessToken.for_user(user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+
+        with self.assertLogs("core.middleware", level="INFO") as logs:
+            self.client.get(reverse("profissional-list"))
+
+        self.assertEqual(logs.records[-1].access["user"], "logado")
+
+    def test_async_so_carrega_a_sessao_se_o_acesso_for_logado(self):
+        user = User(username="sessao")
+
+        async def view(request):
+            return HttpResponse()
+
+        def run():
+            request = APIRequestFactory().get(self.live_url)
+            request.user = SimpleLazyObject(lambda: self.fail("sessão no loop"))
+            request.auser = mock.AsyncMock(return_value=user)
+            asyncio.run(RequestLoggingMiddleware(view)(request))
+            return request.auser
+
+        with override_settings(ACCESS_LOG_SAMPLE_RATE=0, ACCESS_LOG_SLOW_MS=60000):
+            run().assert_not_awaited()
+        with self.assertLogs("core.middleware", level="INFO") as logs:
+            run().assert_awaited_once()
+        self.assertEqual(logs.records[-1].access["user"], "sessao")
+
+    def test_nivel_desabilitado_nao_monta_record(self):
+        """Com o nível do logger acima de INFO, nada é montado para 2xx."""
+        with (
+            mock.patch("core.middleware.logging_middleware.logger.log") as log,
+            mock.patch(
+                "core.middleware.logging_middleware.logger.isEnabledFor",
+                return_value=False,
+            ),
+        ):
+            self.client.get(self.live_url)
+        log.assert_not_called()
+
+
+# =============================================================================
+# TESTES DE LOAD SHEDDING
+# =============================================================================
+@override_settings(
+    LOAD_SHEDDING_ENABLED=True,
+    LOAD_SHEDDING_MAX_IN_FLIGHT=0,
+    LOAD_SHEDDING_HARD_MAX_IN_FLIGHT=10,
+)
+class LoadSheddingTests(APITestCase):
+    """Rejeição por prioridade, probes isentos e métricas de shedding."""
+
+    def setUp(self):
+        self.collector = MetricsCollector()
+        self.collector.reset()
+        self.list_url = reverse("profissional-list")
+
+    def test_leitura_acima_do_limite_recebe_503(self):
+        response = self.client.get(self.list_url)
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response["Retry-After"], "5")
+        self.assertEqual(response.json()["code"], "overloaded")
+        self.assertIn("X-Correlation-ID", response)
+        shedding = self.collector.get_metrics()["load_shedding"]
+        self.assertEqual(shedding["shed_by_reason"], {"in_flight": 1})
+        self.assertEqual(shedding["in_flight"], 0)
+
+    def test_probes_nunca_sao_rejeitados(self):
+        for name in ("liveness-check", "readiness-check", "health-check"):
+            response = self.client.get(reverse(name))
+            self.assertNotEqual(response.status_code, 503, name)
+
+    def test_escrita_so_e_rejeitada_no_limite_rigido(self):
+        response = self.client.post(reverse("token_obtain_pair"), {})
+        self.assertEqual(response.status_code, 400)
+
+        with override_settings(LOAD_SHEDDING_HARD_MAX_IN_FLIGHT=0):
+            response = self.client.post(reverse("token_obtain_pair"), {})
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(
+            self.collector.get_metrics()["load_shedding"]["shed_by_reason"],
+            {"hard_limit": 1},
+        )
+
+    @override_settings(LOAD_SHEDDING_MAX_IN_FLIGHT=10, LOAD_SHEDDING_TARGET_P95_MS=100)
+    def test_latencia_recente_alta_rejeita_leituras(self):
+        """p95 em 2x o alvo rejeita todas as leituras."""
+        with mock.patch.object(MetricsCollector, "recent_p95", return_value=0.2):
+            response = self.client.get(self.list_url)
+        self.assertEqual(response.status_code, 503)
+
+        with mock.patch.object(MetricsCollector, "recent_p95", return_value=0.05):
+            response = self.client.get(self.list_url)
+        self.assertNotEqual(response.status_code, 503)
+
+    def test_p95_recente_ignora_amostras_fora_da_janela(self):
+        self.collector.record_request("GET", "/", 200, 3.0)
+        self.assertIsNone(self.collector.recent_p95(window_seconds=0))
+
+        self.collector._recent_p95_cache = (0.0, None)  # descarta o cache de 1s
+        self.assertEqual(self.collector.recent_p95(window_seconds=60), 3.0)
+
+
+# =============================================================================
+# TESTES DE DEADLINE POR REQUISIÇÃO
+# =============================================================================
+class _FakePostgresConnection:
+    vendor = "postgresql"
+    in_atomic_block = False
+
+    def __init__(self):
+        self.connection = mock.MagicMock()
+        self.run_on_commit = []
+
+    def on_commit(self, func):
+        self.run_on_commit.append((set(), func, False))
+
+
+class DeadlineTests(APITestCase):
+    """Orçamento por rota/header, 504 e statement_timeout no PostgreSQL."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="deadline", password="x")
+        self.factory = APIRequestFactory()
+
+    def _budget(self, view_name, header=None):
+        request = self.factory.get("/", HTTP_X_REQUEST_TIMEOUT=header or "")
+        return DeadlineMiddleware(lambda r: HttpResponse())._budget(request, view_name)
+
+    @override_settings(
+        DEADLINE_DEFAULT_SECONDS=30, DEADLINE_ROUTE_SECONDS={"consulta-list": 10}
+    )
+    def test_orcamento_por_rota_e_header_do_cliente(self):
+        self.assertEqual(self._budget("profissional-list"), 30)
+        self.assertEqual(self._budget("consulta-list"), 10)
+        self.assertEqual(self._budget("consulta-list", header="2.5"), 2.5)
+        # O cliente não consegue aumentar o orçamento da rota
+        self.assertEqual(self._budget("consulta-list", header="60"), 10)
+        self.assertEqual(self._budget("consulta-list", header="abc"), 10)
+
+    def test_orcamento_esgotado_retorna_504(self):
+        self.client.force_authenticate(self.user)
+        with self.assertLogs("apps", level="WARNING"):
+            response = self.client.get(
+                reverse("profissional-list"), HTTP_X_REQUEST_TIMEOUT="0.000001"
+            )
+
+        self.assertEqual(response.status_code, 504)
+        self.assertEqual(response.json()["code"], "deadline_exceeded")
+
+    def test_query_cancelada_pelo_postgres_vira_504(self):
+        cause = Exception("canceling statement due to statement timeout")
+        cause.pgcode = "57014"  # psycopg2.errors.QueryCanceled
+        exc = OperationalError(str(cause))
+        exc.__cause__ = cause
+        with self.assertLogs("apps", level="WARNING"):
+            response = custom_exception_handler(exc, {})
+        self.assertEqual(response.status_code, 504)
+
+    def test_statement_timeout_aplicado_e_restaurado(self):
+        connection = _FakePostgresConnection()
+        cursor = mock.Mock()
+        context = {"connection": connection, "cursor": cursor}
+        execute = mock.Mock(return_value="ok")
+
+        with mock.patch("core.deadline.time.monotonic", return_value=100.0):
+            token = start_deadline(10)
+            enforce_deadline(execute, "SELECT 1", None, False, context)
+            # Orçamento quase igual: não reenvia o SET
+            enforce_deadline(execute, "SELECT 2", None, False, context)
+        with mock.patch("core.deadline.time.monotonic", return_value=105.0):
+            # Orçamento caiu pela metade: reaplica
+            enforce_deadline(execute, "SELECT 3", None, False, context)
+
+        self.assertEqual(
+            [c.args[0] for c in cursor.cursor.execute.call_args_list],
+            ["SET statement_timeout = 10000", "SET statement_timeout = 5000"],
+        )
+        self.assertEqual(execute.call_count, 3)
+
+        end_deadline(token)
+        reset_cursor = connection.connection.cursor.return_value.__enter__.return_value
+        reset_cursor.execute.assert_called_once_with("RESET statement_timeout")
+
+    def test_set_local_dentro_de_transacao(self):
+        connection = _FakePostgresConnection()
+        connection.in_atomic_block = True
+        cursor = mock.Mock()
+        context = {"connection": connection, "cursor": cursor}
+
+        token = start_deadline(10)
+        try:
+            enforce_deadline(mock.Mock(), "SELECT 1", None, False, context)
+            enforce_deadline(mock.Mock(), "SELECT 2", None, False, context)
+        finally:
+            end_deadline(token)
+
+        sql = cursor.cursor.execute.call_args.args[0]
+        self.assertTrue(sql.startswith("SET LOCAL statement_timeout = "))
+        self.assertEqual(cursor.cursor.execute.call_count, 1)
+        self.assertEqual(len(connection.run_on_commit), 1)
+        connection.connection.cursor.assert_not_called()
+
+    def test_set_local_reaplicado_apos_rollback(self):
+        connection = _FakePostgresConnection()
+        connection.in_atomic_block = True
+        cursor = mock.Mock()
+        context = {"connection": connection, "cursor": cursor}
+
+        token = start_deadline(10)
+        try:
+            enforce_deadline(mock.Mock(), "SELECT 1", None, False, context)
+            # Rollback: o Django descarta os hooks junto com o SET LOCAL
+            connection.run_on_commit = []
+            enforce_deadline(mock.Mock(), "SELECT 2", None, False, context)
+        finally:
+            end_deadline(token)
+
+        self.assertEqual(cursor.cursor.execute.call_count, 2)
+
+    @override_settings(DEADLINE_DEFAULT_SECONDS=30)
+    def test_reset_async_roda_fora_do_event_loop(self):
+        connection = _FakePostgresConnection()
+        threads = {}
+
+        def query():
+            threads["query"] = threading.current_thread()
+            context = {"connection": connection, "cursor": mock.Mock()}
+            enforce_deadline(mock.Mock(), "SELECT 1", None, False, context)
+
+        async def view(request):
+            threads["loop"] = threading.current_thread()
+            await sync_to_async(query)()
+            return HttpResponse()
+
+        def reset(conn):
+            threads["reset"] = threading.current_thread()
+
+        middleware = DeadlineMiddleware(view)
+        request = self.factory.get("/")
+        with mock.patch("core.deadline._reset_session_timeout", side_effect=reset):
+            asyncio.run(middleware(request))
+
+        self.assertIsNot(threads["reset"], threads["loop"])
+        self.assertIs(threads["reset"], threads["query"])
+
+
+# =============================================================================
+# TESTES DE ESTATÍSTICAS DO POOL DE CONEXÕES
+# =============================================================================
+class DatabasePoolStatsTests(APITestCase):
+    """Estatísticas de conexão em /api/metrics/ e no readiness."""
+
+    def test_readiness_e_metrics_expoem_conexoes(self):
+        ready = self.client.get(reverse("readiness-check")).json()
+        self.assertEqual(ready["database_pool"]["mode"], "per-request")
+        self.assertIn("connections_opened", ready["database_pool"])
+
+        metrics = self.client.get(reverse("metrics")).json()
+        self.assertIn("default", metrics["database_pool"])
+
+    def test_estatisticas_do_pool_psycopg(self):
+        pool = mock.Mock(min_size=1, max_size=3)
+        pool.get_stats.return_value = {
+            "pool_size": 3,
+            "pool_available": 1,
+            "requests_waiting": 2,
+            "requests_num": 4,
+            "requests_wait_ms": 10,
+        }
+        fake_connection = mock.Mock(pool=pool)
+
+        fake_connections = mock.MagicMock()
+        fake_connections.__iter__.return_value = iter(["default"])
+        fake_connections.__getitem__.return_value = fake_connection
+        with mock.patch("core.db_pool.connections", fake_connections):
+            stats = pool_stats()["default"]
+
+        self.assertEqual(stats["mode"], "pool")
+        self.assertEqual(stats["in_use"], 2)
+        self.assertEqual(stats["waiting"], 2)
+        self.assertEqual(stats["avg_wait_ms"], 2.5)
+
+    def test_gunicorn_e_pool_usam_as_mesmas_threads(self):
+        conf = Path(settings.BASE_DIR) / "gunicorn.conf.py"
+        with mock.patch.dict(os.environ, {"GUNICORN_THREADS": "4"}):
+            gunicorn = runpy.run_path(str(conf))
+
+        self.assertEqual(gunicorn["threads"], 4)
+        self.assertEqual(settings.DB_POOL_MAX_SIZE, settings.GUNICORN_THREADS + 1)
+
+
+# =============================================================================
+# TESTES DE ROTEAMENTO PARA A RÉPLICA DE LEITURA
+# =============================================================================
+@override_settings(READ_REPLICA_ALIAS="replica", READ_REPLICA_STICKY_SECONDS=5)
+class ReadReplicaRoutingTests(APITestCase):
+    """Leituras na réplica, escritas e leituras pós-escrita no primário."""
+
+    databases = {"default", "replica"}
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="replica", password="pass")
+        refresh = RefreshToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {refresh.access_token}")
+        self.url = reverse("profissional-list")
+        # Só existe na réplica: aparece apenas em leituras roteadas para ela
+        Profissional.objects.using("replica").create(
+            nome_social="Dra. Replica",
+            profissao="Medicina",
+            endereco="Rua Replica, 1",
+            contato="replica@email.com",
+        )
+
+    def _nomes(self, response):
+        return [item["nome_social"] for item in response.json()["results"]]
+
+    def test_listagem_le_da_replica(self):
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self._nomes(response), ["Dra. Replica"])
+
+    def test_escrita_vai_para_o_primario_e_fixa_leituras(self):
+        response = self.client.post(
+            self.url,
+            {
+                "nome_social": "Dr. Primario",
+                "profissao": "Psicologia",
+                "endereco": "Rua Primario, 2",
+                "contato": "primario@email.com",
+            },
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(Profissional.objects.filter(nome_social="Dr. Primario"))
+        self.assertFalse(
+            Profissional.objects.using("replica").filter(nome_social="Dr. Primario")
+        )
+        self.assertIn(STICKY_HEADER, response)
+        self.assertIn(STICKY_COOKIE, response.cookies)
+
+        # O cookie volta na próxima requisição: leitura no primário
+        response = self.client.get(self.url)
+        self.assertEqual(self._nomes(response), ["Dr. Primario"])
+
+    def test_header_de_janela_expirada_volta_para_a_replica(self):
+        response = self.client.get(self.url, HTTP_X_PRIMARY_UNTIL="1")
+
+        self.assertEqual(self._nomes(response), ["Dra. Replica"])
+
+    def test_escrita_rejeitada_nao_fixa_leituras(self):
+        response = self.client.post(self.url, {}, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertNotIn(STICKY_HEADER, response)
+
+    def test_metricas_de_negocio_leem_da_replica(self):
+        metrics = BusinessMetricsSnapshot().refresh()
+
+        self.assertEqual(metrics["total_profissionais"], 1)
+
+
+# =============================================================================
+# TESTES DO CACHE DE TOKENS JWT
+# =============================================================================
+class TokenAuthCacheTests(APITestCase):
+    """Tokens verificados são reaproveitados sem query de usuário."""
+
+    def setUp(self):
+        TokenAuthCache().reset()
+        self.addCleanup(TokenAuthCache().reset)
+        self.user = User.objects.create_user(username="cached", password="pass")
+        self.url = reverse("profissional-list")
+
+    def _authenticate(self, user):
+        refresh = RefreshToken.for_user(user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {refresh.access_token}")
+
+    def _auth_user_queries(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [q for q in ctx.captured_queries if "auth_user" in q["sql"]]
+
+    def test_segunda_requisicao_nao_consulta_usuario(self):
+        self._authenticate(self.user)
+
+        self.assertEqual(len(self._auth_user_queries()), 1)
+        self.assertEqual(self._auth_user_queries(), [])
+        self.assertEqual(TokenAuthCache().stats()["hits"], 1)
+
+    def test_desativar_usuario_invalida_cache(self):
+        self._authenticate(self.user)
+        self.client.get(self.url)
+
+        self.user.is_active = False
+        self.user.save()
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(JWT_AUTH_CACHE_SIZE=0)
+    def test_tamanho_zero_desliga_cache(self):
+        self._authenticate(self.user)
+        self.client.get(self.url)
+
+        self.assertEqual(len(self._auth_user_queries()), 1)
+        self.assertEqual(TokenAuthCache().stats()["size"], 0)
+
+    @override_settings(JWT_AUTH_CACHE_SIZE=2)
+    def test_lru_descarta_token_menos_recente(self):
+        for index in range(3):
+            user = User.objects.create_user(username=f"lru{index}", password="pass")
+            self._authenticate(user)
+            self.client.get(self.url)
+
+        self.assertEqual(TokenAuthCache().stats()["size"], 2)
+
+    def test_metrics_expoe_cache(self):
+        metrics = self.client.get(reverse("metrics")).json()
+
+        self.assertIn("hits", metrics["auth_cache"])
+
+
+# =============================================================================
+# TESTES DO USUÁRIO STATELESS (CLAIMS DO TOKEN)
+# =============================================================================
+@override_settings(JWT_STATELESS_USER=True, JWT_AUTH_CACHE_SIZE=0)
+class StatelessTokenUserTests(APITestCase):
+    """Requisições autenticadas sem query em auth_user."""
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.user = User.objects.create_user(
+            username="stateless", password="pass", email="stateless@email.com"
+        )
+        self.url = reverse("profissional-list")
+
+    def _login(self):
+        response = self.client.post(
+            reverse("token_obtain_pair"),
+            {"username": "stateless", "password": "pass"},
+            format="json",
+        )
+        access = response.json()["access"]
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {access}")
+
+    def _auth_user_queries(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(self.url)
+        return response, [q for q in ctx.captured_queries if "auth_user" in q["sql"]]
+
+    def test_requisicoes_nao_consultam_usuario(self):
+        self._login()
+        self._auth_user_queries()  # Carrega a versão de permissões no cache
+
+        response, queries = self._auth_user_queries()
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(queries, [])
+
+    def test_troca_de_senha_invalida_tokens(self):
+        self._login()
+        self.client.get(self.url)
+
+        self.user.set_password("nova-senha")
+        self.user.save()
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(response.json()["details"]["code"], "token_outdated")
+
+    def test_token_sem_claims_usa_o_modelo(self):
+        refresh = RefreshToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {refresh.access_token}")
+
+        response, queries = self._auth_user_queries()
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(queries), 1)
+
+    def test_claims_user_carrega_modelo_sob_demanda(self):
+        self._login()
+        token = self.client._credentials["HTTP_AUTHORIZATION"].split()[1]
+        user = ClaimsUser(AccessToken(token))
+
+        with self.assertNumQueries(0):
+            self.assertEqual(str(user), "stateless")
+            self.assertTrue(user.is_authenticated)
+        with self.assertNumQueries(1):
+            self.assertEqual(user.email, "stateless@email.com")
+            self.assertEqual(user.model.pk, self.user.pk)
+
+
+# =============================================================================
+# TESTES DE REVOGAÇÃO DE TOKENS
+# =============================================================================
+class TokenRevocationTests(APITestCase):
+    """Logout, rotação de refresh e Bloom filter de JTIs revogados."""
+
+    def setUp(self):
+        for component in (RevocationFilter(), TokenAuthCache()):
+            component.reset()
+            self.addCleanup(component.reset)
+        User.objects.create_user(username="revoga", password="pass")
+        self.url = reverse("profissional-list")
+
+    def _login(self):
+        tokens = self.client.post(
+            reverse("token_obtain_pair"),
+            {"username": "revoga", "password": "pass"},
+            format="json",
+        ).json()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {tokens['access']}")
+        return tokens
+
+    def test_bloom_filter(self):
+        bloom = BloomFilter(capacity=100, error_rate=0.01)
+        for index in range(100):
+            bloom.add(f"jti-{index}")
+
+        self.assertIn("jti-7", bloom)
+        false_positives = sum(f"outro-{index}" in bloom for index in range(1000))
+        self.assertLess(false_positives, 50)
+
+    def test_logout_revoga_access_e_refresh(self):
+        tokens = self._login()
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_200_OK)
+
+        response = self.client.post(
+            reverse("token_revoke"), {"refresh": tokens["refresh"]}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+
+        # Mesmo com o token no cache de autenticação
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(response.json()["details"]["code"], "token_revoked")
+
+        self.client.credentials()
+        response = self.client.post(
+            reverse("token_refresh"), {"refresh": tokens["refresh"]}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(TOKEN_REVOCATION_SYNC_SECONDS=0)
+    def test_validacao_so_le_o_filtro(self):
+        revocation = RevocationFilter()
+        revocation.start()
+
+        # Mesmo com o sync vencido, a validação não consulta o banco
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertFalse(revocation.is_revoked("jti-livre"))
+        self.assertEqual(len(ctx), 0)
+
+    def test_validacao_nao_espera_atualizacao_em_andamento(self):
+        revocation = RevocationFilter()
+        revocation.revoke("jti-revogado", timezone.now() + timedelta(hours=1))
+        self.assertNotIn("jti-livre", revocation._filter)  # sem ida ao banco
+        results = []
+
+        # Outra thread segura a atualização (query em andamento)
+        with revocation._refresh_lock:
+            checker = threading.Thread(
+                target=lambda: results.append(revocation.is_revoked("jti-livre"))
+            )
+            checker.start()
+            checker.join(timeout=2)
+
+        self.assertFalse(checker.is_alive())
+        self.assertEqual(results, [False])
+
+    def test_logout_com_access_token_revogado_ou_expirado(self):
+        tokens = self._login()
+        RevocationFilter().revoke_token(AccessToken(tokens["access"]))
+
+        response = self.client.post(
+            reverse("token_revoke"), {"refresh": tokens["refresh"]}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+
+        expired = AccessToken.for_user(User.objects.get(username="revoga"))
+        expired.set_exp(lifetime=-timedelta(minutes=1))
+        second = self._login()["refresh"]
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {expired}")
+        response = self.client.post(
+            reverse("token_revoke"), {"refresh": second}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+
+        response = self.client.post(
+            reverse("token_refresh"), {"refresh": second}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_rotacao_revoga_refresh_anterior(self):
+        tokens = self._login()
+        refresh_url = reverse("token_refresh")
+
+        first = self.client.post(refresh_url, {"refresh": tokens["refresh"]})
+        reused = self.client.post(refresh_url, {"refresh": tokens["refresh"]})
+
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertEqual(reused.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_token_valido_nao_consulta_tabela(self):
+        self._login()
+        self.client.get(self.url)  # Constrói o filtro
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(self.url)
+
+        sqls = [q["sql"] for q in ctx.captured_queries]
+        self.assertFalse([sql for sql in sqls if "core_revokedtoken" in sql])
+
+    @override_settings(TOKEN_REVOCATION_SYNC_SECONDS=0)
+    def test_sync_incremental_ve_revogacao_de_outro_worker(self):
+        revocation = RevocationFilter()
+        self.assertFalse(revocation.is_revoked("jti-externo"))
+
+        RevokedToken.objects.create(
+            jti="jti-externo", expires_at=timezone.now() + timedelta(hours=1)
+        )
+        revocation.refresh()  # Feito pela thread de sync fora dos testes
+
+        self.assertTrue(revocation.is_revoked("jti-externo"))
+        self.assertEqual(revocation.stats()["db_checks"], 1)
+
+    @override_settings(TOKEN_REVOCATION_BACKGROUND_SYNC=True)
+    def test_start_constroi_o_filtro_e_inicia_uma_thread(self):
+        revocation = RevocationFilter()
+        self.addCleanup(setattr, revocation, "_sync_thread", None)
+        with mock.patch("core.revocation.threading.Thread") as thread_class:
+            revocation.start()
+            revocation.start()
+
+        self.assertIsNotNone(revocation._filter)
+        thread_class.assert_called_once()
+        self.assertEqual(thread_class.call_args.kwargs["name"], "token-revocation-sync")
+        thread_class.return_value.start.assert_called_once()
+
+    def test_gunicorn_constroi_o_filtro_no_inicio_do_worker(self):
+        conf = runpy.run_path(str(Path(settings.BASE_DIR) / "gunicorn.conf.py"))
+
+        conf["post_worker_init"](mock.Mock())
+
+        self.assertIsNotNone(RevocationFilter()._filter)
+
+    def test_purge_remove_apenas_expirados(self):
+        now = timezone.now()
+        RevokedToken.objects.create(jti="velho", expires_at=now - timedelta(hours=1))
+        RevokedToken.objects.create(jti="novo", expires_at=now + timedelta(hours=1))
+
+        call_command("purge_revoked_tokens", stdout=StringIO())
+
+        self.assertEqual(
+            list(RevokedToken.objects.values_list("jti", flat=True)), ["novo"]
+        )
+
+
+# =============================================================================
+# TESTES DE THROTTLING POR JANELA DESLIZANTE
+# =============================================================================
+class SlidingWindowThrottleTests(APITestCase):
+    """Contadores de janela no cache, custo por action e métricas."""
+
+    def setUp(self):
+        cache.clear()
+        ThrottleCounterStore().reset()
+        self.addCleanup(ThrottleCounterStore().reset)
+        MetricsCollector().reset()
+        self.user = User.objects.create_user(username="throttle", password="pass")
+        refresh = RefreshToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {refresh.access_token}")
+
+    def _count(self, key, window_start):
+        return cache.get(ThrottleCounterStore.cache_key(key, window_start))
+
+    def test_estimativa_pondera_janela_anterior(self):
+        store = ThrottleCounterStore()
+        for _ in range(4):
+            store.hit("k", 100, cost=1, limit=10, now=1050)
+
+        # 25% da janela seguinte decorrida: 4 * 0.75 + 1
+        self.assertEqual(store.hit("k", 100, cost=1, limit=10, now=1125), (True, 4.0))
+        self.assertEqual(self._count("k", 1000), 4)
+
+    def test_contador_e_compartilhado_entre_workers(self):
+        store = ThrottleCounterStore()
+        store.hit("k", 100, cost=2, limit=10, now=1010)
+        store.reset()  # Outro worker: sem estado local
+
+        self.assertEqual(store.hit("k", 100, cost=2, limit=10, now=1020), (True, 4))
+
+    def test_rejeitada_nao_consome_orcamento(self):
+        store = ThrottleCounterStore()
+        self.assertTrue(store.hit("k", 100, cost=2, limit=3, now=1010)[0])
+
+        self.assertEqual(store.hit("k", 100, cost=2, limit=3, now=1020), (False, 2))
+        self.assertEqual(self._count("k", 1000), 2)
+
+    def test_listagem_custa_mais_que_detalhe_sem_escrever_no_banco(self):
+        with (
+            mock.patch.object(
+                SimpleRateThrottle, "timer", mock.Mock(return_value=7300.0)
+            ),
+            CaptureQueriesContext(connection) as ctx,
+        ):
+            self.client.get(reverse("consulta-list"))
+
+        self.assertEqual(self._count(f"throttle_consultas_{self.user.pk}", 7200), 3)
+        self.assertFalse(
+            [query for query in ctx.captured_queries if "throttle" in query["sql"]]
+        )
+
+    def test_excesso_retorna_429_e_metricas(self):
+        rates = {"consultas": "5/hour"}
+        with mock.patch.object(SlidingWindowScopedThrottle, "THROTTLE_RATES", rates):
+            first = self.client.get(reverse("consulta-list"))
+            second = self.client.get(reverse("consulta-list"))
+
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertEqual(second.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn("Retry-After", second)
+
+        throttling = MetricsCollector().get_metrics()["throttling"]
+        self.assertEqual(throttling["checked_by_scope"]["consultas"], 2)
+        self.assertEqual(throttling["throttled_by_scope"]["consultas"], 1)
+
+    def _settings_de_producao(self, redis_url):
+        base = importlib.import_module("core.settings.base")
+        with mock.patch.object(base, "CACHE_REDIS_URL", redis_url):
+            with mock.patch.dict(sys.modules):
+                sys.modules.pop("core.settings.production", None)
+                return importlib.import_module("core.settings.production")
+
+    def test_producao_exige_cache_compartilhado(self):
+        with self.assertRaises(ImproperlyConfigured):
+            self._settings_de_producao("")
+
+    def test_taxas_de_producao_cobrem_os_escopos(self):
+        production = self._settings_de_producao("redis://cache:6379/1")
+        rates = production.REST_FRAMEWORK["DEFAULT_THROTTLE_RATES"]
+        self.assertEqual(rates["anon"], "30/hour")
+
+        with mock.patch.object(SimpleRateThrottle, "THROTTLE_RATES", rates):
+            for name in ("profissional-list", "consulta-list"):
+                response = self.client.get(reverse(name))
+                self.assertEqual(response.status_code, status.HTTP_200_OK, name)
+
+
+# =============================================================================
+# TESTES DE IDEMPOTENCY-KEY
+# =============================================================================
+class IdempotencyKeyTests(APITestCase):
+    """Repetições de POST com a mesma chave não duplicam a consulta."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="idem", password="pass")
+        refresh = RefreshToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {refresh.access_token}")
+        self.profissional = Profissional.objects.create(
+            nome_social="Dra. Idem",
+            profissao="Medicina",
+            endereco="Rua Idem, 1",
+            contato="idem@email.com",
+        )
+        self.url = reverse("consulta-list")
+        self.payload = {
+            "data": (timezone.now() + timedelta(days=2)).isoformat(),
+            "profissional": self.profissional.pk,
+        }
+
+    def _post(self, payload=None, key="chave-1"):
+        return self.client.post(
+            self.url, payload or self.payload, format="json", HTTP_IDEMPOTENCY_KEY=key
+        )
+
+    def test_repeticao_devolve_resposta_gravada_sem_reexecutar(self):
+        first = self._post()
+        with mock.patch.object(
+            ConsultaService, "agendar_consulta", wraps=ConsultaService.agendar_consulta
+        ) as agendar:
+            replay = self._post()
+
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(replay.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(replay.json(), first.json())
+        self.assertEqual(replay["Idempotent-Replayed"], "true")
+        agendar.assert_not_called()
+        self.assertEqual(Consulta.objects.count(), 1)
+
+    def test_mesma_chave_com_outro_corpo_e_recusada(self):
+        self._post()
+        payload = dict(self.payload, observacoes="Outra")
+
+        response = self._post(payload)
+
+        self.assertEqual(response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+        self.assertEqual(response.json()["code"], "idempotency_key_reused")
+
+    def test_requisicao_em_andamento_retorna_409(self):
+        IdempotencyKey.objects.create(
+            scope="consulta:create",
+            owner=str(self.user.pk),
+            key="chave-1",
+            request_hash="qualquer",
+            locked_until=timezone.now() + timedelta(minutes=1),
+            expires_at=timezone.now() + timedelta(hours=1),
+        )
+        with mock.patch("core.idempotency._request_hash", return_value="qualquer"):
+            response = self._post()
+
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response.json()["code"], "idempotency_in_progress")
+        self.assertEqual(Consulta.objects.count(), 0)
+
+    def test_reserva_vencida_e_assumida(self):
+        IdempotencyKey.objects.create(
+            scope="consulta:create",
+            owner=str(self.user.pk),
+            key="chave-1",
+            request_hash="qualquer",
+            locked_until=timezone.now() - timedelta(seconds=1),
+            expires_at=timezone.now() + timedelta(hours=1),
+        )
+        with mock.patch("core.idempotency._request_hash", return_value="qualquer"):
+            response = self._post()
+            replay = self._post()
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(replay["Idempotent-Replayed"], "true")
+        self.assertEqual(Consulta.objects.count(), 1)
+        self.assertIsNone(IdempotencyKey.objects.get().locked_until)
+
+    def test_reserva_perdida_desfaz_a_criacao(self):
+        reserve = IdempotentCreateMixin._reserve_key
+
+        def assumida_por_outra(view, request, key):
+            # Outra requisição assume a reserva enquanto esta cria a consulta
+            record = reserve(view, request, key)
+            IdempotencyKey.objects.update(
+                locked_until=timezone.now() + timedelta(minutes=5)
+            )
+            return record
+
+        with mock.patch.object(
+            IdempotentCreateMixin, "_reserve_key", assumida_por_outra
+        ):
+            response = self._post()
+
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(Consulta.objects.count(), 0)
+        self.assertIsNone(IdempotencyKey.objects.get().status_code)
+
+    def test_erro_libera_a_chave(self):
+        invalid = dict(
+            self.payload, data=(timezone.now() - timedelta(days=1)).isoformat()
+        )
+        self.assertEqual(self._post(invalid).status_code, status.HTTP_400_BAD_REQUEST)
+
+        self.assertFalse(IdempotencyKey.objects.exists())
+        self.assertEqual(self._post(invalid).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_chave_expirada_executa_de_novo(self):
+        self._post()
+        IdempotencyKey.objects.update(expires_at=timezone.now() - timedelta(minutes=1))
+
+        response = self._post()
+
+        self.assertNotIn("Idempotent-Replayed", response)
+        self.assertEqual(Consulta.objects.count(), 2)
+
+    def test_sem_header_cria_normalmente(self):
+        self.client.post(self.url, self.payload, format="json")
+        self.client.post(self.url, self.payload, format="json")
+
+        self.assertEqual(Consulta.objects.count(), 2)
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+
+# =============================================================================
+# TESTES DE CONCORRÊNCIA OTIMISTA (VERSION / IF-MATCH)
+# =============================================================================
+class OptimisticConcurrencyTests(APITestCase):
+    """Edições concorrentes não se sobrescrevem: o perdedor recebe 412."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="versao", password="pass")
+        refresh = RefreshToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {refresh.access_token}")
+        self.profissional = Profissional.objects.create(
+            nome_social="Dra. Versão",
+            profissao="Medicina",
+            endereco="Rua Versão, 1",
+            contato="versao@email.com",
+        )
+        self.url = reverse("profissional-detail", args=[self.profissional.pk])
+
+    def test_detalhe_retorna_etag_com_a_versao(self):
+        response = self.client.get(self.url)
+
+        self.assertEqual(response["ETag"], '"1"')
+        self.assertEqual(response.json()["version"], 1)
+
+    def test_atualizacao_incrementa_versao(self):
+        response = self.client.patch(
+            self.url, {"profissao": "Enfermagem"}, format="json", HTTP_IF_MATCH='"1"'
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["ETag"], '"2"')
+        self.profissional.refresh_from_db()
+        self.assertEqual(self.profissional.version, 2)
+        self.assertEqual(self.profissional.profissao, "Enfermagem")
+
+    def test_if_match_desatualizado_retorna_412(self):
+        self.client.patch(self.url, {"profissao": "Enfermagem"}, format="json")
+
+        response = self.client.patch(
+            self.url, {"profissao": "Psicologia"}, format="json", HTTP_IF_MATCH='"1"'
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        self.assertEqual(response.json()["code"], "precondition_failed")
+        self.profissional.refresh_from_db()
+        self.assertEqual(self.profissional.profissao, "Enfermagem")
+
+    def test_escrita_concorrente_apos_a_leitura_e_detectada(self):
+        consulta = Consulta.objects.create(
+            data=timezone.now() + timedelta(days=1), profissional=self.profissional
+        )
+        stale = Consulta.objects.get(pk=consulta.pk)
+        ConsultaService.atualizar_consulta(consulta, {"observacoes": "Primeira"})
+
+        with self.assertRaises(PreconditionFailedException):
+            ConsultaService.atualizar_consulta(stale, {"observacoes": "Segunda"})
+
+        consulta.refresh_from_db()
+        self.assertEqual(consulta.observacoes, "Primeira")
+        self.assertEqual(consulta.version, 2)
+
+    def _alterar_apos_get_object(self, model, pk):
+        """check_if_match que, depois de aprovar, simula uma escrita concorrente."""
+        original = check_if_match
+
+        def check_and_bump(request, instance):
+            original(request, instance)
+            model.objects.filter(pk=pk).update(version=F("version") + 1)
+
+        return mock.patch("core.concurrency.check_if_match", check_and_bump)
+
+    def test_exclusao_apos_escrita_concorrente_retorna_412(self):
+        with self._alterar_apos_get_object(Profissional, self.profissional.pk):
+            response = self.client.delete(self.url, HTTP_IF_MATCH='"1"')
+
+        self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        self.assertTrue(Profissional.objects.filter(pk=self.profissional.pk).exists())
+
+    def test_cancelamento_apos_escrita_concorrente_retorna_412(self):
+        consulta = Consulta.objects.create(
+            data=timezone.now() + timedelta(days=1), profissional=self.profissional
+        )
+        url = reverse("consulta-detail", args=[consulta.pk])
+
+        with self._alterar_apos_get_object(Consulta, consulta.pk):
+            response = self.client.delete(url, HTTP_IF_MATCH='"1"')
+
+        self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        self.assertTrue(Consulta.objects.filter(pk=consulta.pk).exists())
+
+    def test_sem_if_match_usa_a_versao_lida(self):
+        response = self.client.patch(self.url, {"profissao": "Nutrição"}, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()["version"], 2)
+
+    def test_parse_if_match(self):
+        self.assertIsNone(parse_if_match(None))
+        self.assertIsNone(parse_if_match('"1", *'))
+        self.assertEqual(parse_if_match('"3", W/"4"'), {3, 4})
+        self.assertEqual(parse_if_match("abc"), set())
+
+
+# =============================================================================
+# TESTES DE ORÇAMENTO DE QUERIES
+# =============================================================================
+class QueryBudgetTests(APITestCase):
+    """Cada endpoint fica dentro do orçamento de queries declarado na view."""
+
+    VIEWSET_ACTIONS = (
+        "list",
+        "create",
+        "retrieve",
+        "update",
+        "partial_update",
+        "destroy",
+    )
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="budget", password="pass")
+        refresh = RefreshToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {refresh.access_token}")
+        self.profissionais = [
+            Profissional.objects.create(
+                nome_social=f"Dra. Budget {i}",
+                profissao="Medicina",
+                endereco=f"Rua Budget, {i}",
+                contato=f"budget{i}@email.com",
+            )
+            for i in range(3)
+        ]
+        # Várias linhas por listagem: um N+1 estoura o orçamento
+        self.consultas = [
+            Consulta.objects.create(
+                data=timezone.now() + timedelta(days=i + 1),
+                profissional=self.profissionais[i % 2],
+            )
+            for i in range(6)
+        ]
+        self.future = (timezone.now() + timedelta(days=10)).isoformat()
+
+    def _assert_within_budget(self, view_class, action, method, url, data=None):
+        budget = get_query_budget(view_class, action)
+        self.assertIsNotNone(budget, f"{view_class.__name__}.{action} sem orçamento")
+        # Caches frios: o orçamento cobre a pior requisição do worker
+        for component in (TokenAuthCache(), ThrottleCounterStore(), RevocationFilter()):
+            component.reset()
+        with CaptureQueriesContext(connection) as ctx:
+            response = getattr(self.client, method)(url, data, format="json")
+        self.assertLess(response.status_code, 400, response.content)
+        self.assertLessEqual(
+            len(ctx),
+            budget,
+            "\n".join(query["sql"] for query in ctx.captured_queries),
+        )
+
+    def test_todas_as_actions_tem_orcamento(self):
+        for viewset in (ProfissionalViewSet, ConsultaViewSet):
+            extra = [action.__name__ for action in viewset.get_extra_actions()]
+            for action in (*self.VIEWSET_ACTIONS, *extra):
+                with self.subTest(viewset=viewset.__name__, action=action):
+                    self.assertIsNotNone(get_query_budget(viewset, action))
+
+    def test_profissionais(self):
+        profissional = self.profissionais[2]
+        detail = reverse("profissional-detail", args=[profissional.pk])
+        payload = {
+            "nome_social": "Dra. Orçamento",
+            "profissao": "Psicologia",
+            "endereco": "Rua Orçamento, 10",
+            "contato": "orcamento@email.com",
+        }
+        cases = [
+            ("list", "get", reverse("profissional-list"), None),
+            ("create", "post", reverse("profissional-list"), payload),
+            ("retrieve", "get", detail, None),
+            ("update", "put", detail, payload),
+            ("partial_update", "patch", detail, {"profissao": "Nutrição"}),
+            ("destroy", "delete", detail, None),
+        ]
+        for action, method, url, data in cases:
+            with self.subTest(action=action):
+                self._assert_within_budget(
+                    ProfissionalViewSet, action, method, url, data
+                )
+
+    def test_consultas(self):
+        consulta = self.consultas[0]
+        detail = reverse("consulta-detail", args=[consulta.pk])
+        payload = {"data": self.future, "profissional": self.profissionais[1].pk}
+        por_profissional = reverse(
+            "consulta-por-profissional", args=[self.profissionais[0].pk]
+        )
+        # Leituras com o profissional aninhado: o pior caso de cada action
+        expand = "?expand=profissional"
+        cases = [
+            ("list", "get", reverse("consulta-list") + expand, None),
+            ("create", "post", reverse("consulta-list"), payload),
+            ("retrieve", "get", detail + expand, None),
+            ("update", "put", detail, payload),
+            ("partial_update", "patch", detail, {"observacoes": "Orçamento"}),
+            ("por_profissional", "get", por_profissional + expand, None),
+            ("destroy", "delete", detail, None),
+        ]
+        for action, method, url, data in cases:
+            with self.subTest(action=action):
+                self._assert_within_budget(ConsultaViewSet, action, method, url, data)
+
+    def test_health_e_metricas(self):
+        cases = [
+            (HealthCheckView, reverse("health-check")),
+            (ReadinessCheckView, reverse("readiness-check")),
+            (LivenessCheckView, reverse("liveness-check")),
+            (MetricsView, reverse("metrics")),
+        ]
+        for view_class, url in cases:
+            with self.subTest(view=view_class.__name__):
+                self._assert_within_budget(view_class, None, "get", url)
+
+    def test_orcamento_excedido_gera_warning(self):
+        with mock.patch.object(ProfissionalViewSet, "query_budgets", {"list": 0}):
+            with self.assertLogs("core.middleware", level="WARNING") as logs:
+                self.client.get(reverse("profissional-list"))
+
+        self.assertTrue(
+            any("Orçamento de queries excedido" in line for line in logs.output)
+        )
+
+
+# =============================================================================
+# TESTES DE SPARSE FIELDSETS (?fields= / ?omit=)
+# =============================================================================
+class SparseFieldsetTests(APITestCase):
+    """`?fields=`/`?omit=` reduzem a resposta e as colunas do SELECT."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="sparse", password="pass")
+        refresh = RefreshToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {refresh.access_token}")
+        self.profissional = Profissional.objects.create(
+            nome_social="Dra. Sparse",
+            profissao="Medicina",
+            endereco="Rua Sparse, 1",
+            contato="sparse@email.com",
+        )
+        self.consulta = Consulta.objects.create(
+            data=timezone.now() + timedelta(days=1),
+            profissional=self.profissional,
+            observacoes="Observação longa.",
+        )
+        self.detail = reverse("consulta-detail", args=[self.consulta.pk])
+
+    def _get(self, url, params):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response, ctx.captured_queries
+
+    def _select(self, queries, table):
+        selects = [
+            query["sql"]
+            for query in queries
+            if query["sql"].startswith(f'SELECT "{table}"')
+        ]
+        self.assertEqual(len(selects), 1)
+        return selects[0]
+
+    def test_detalhe_com_fields_le_so_as_colunas_pedidas(self):
+        response, queries = self._get(self.detail, {"fields": "id,data"})
+
+        self.assertEqual(list(response.json()), ["id", "data"])
+        sql = self._select(queries, "consultas_consulta")
+        self.assertNotIn('"observacoes"', sql)
+        self.assertNotIn("profissionais_profissional", sql)
+
+    def test_aninhado_pedido_mantem_o_join(self):
+        response, queries = self._get(
+            self.detail, {"fields": "id,profissional_detail", "expand": "profissional"}
+        )
+
+        body = response.json()
+        self.assertEqual(body["profissional_detail"]["nome_social"], "Dra. Sparse")
+        sql = self._select(queries, "consultas_consulta")
+        self.assertIn("profissionais_profissional", sql)
+        self.assertNotIn('"observacoes"', sql)
+
+    def test_omit_remove_campos(self):
+        response, _ = self._get(
+            self.detail,
+            {"omit": "profissional_detail,observacoes", "expand": "profissional"},
+        )
+
+        body = response.json()
+        self.assertNotIn("profissional_detail", body)
+        self.assertNotIn("observacoes", body)
+        self.assertIn("data", body)
+
+    def test_listagem_de_consultas_com_fields(self):
+        response, queries = self._get(
+            reverse("consulta-list"), {"fields": "id,data,profissional_nome"}
+        )
+
+        self.assertEqual(
+            list(response.json()["results"][0]), ["id", "data", "profissional_nome"]
+        )
+        sql = self._select(queries, "consultas_consulta")
+        self.assertNotIn('"observacoes"', sql)
+
+    def test_listagem_de_profissionais_sem_contagem(self):
+        response, queries = self._get(
+            reverse("profissional-list"), {"fields": "id,nome_social"}
+        )
+
+        self.assertEqual(list(response.json()["results"][0]), ["id", "nome_social"])
+        sql = self._select(queries, "profissionais_profissional")
+        self.assertNotIn("COUNT", sql)
+        self.assertNotIn('"endereco"', sql)
+
+    def test_campo_desconhecido_retorna_400(self):
+        response = self.client.get(self.detail, {"fields": "id,senha"})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("senha", response.json()["message"])
+
+    def test_escritas_ignoram_fields(self):
+        response = self.client.patch(
+            f"{self.detail}?fields=id", {"observacoes": "Nova"}, format="json"
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()["observacoes"], "Nova")
+
+
+# =============================================================================
+# TESTES DE CACHE DE FRAGMENTOS SERIALIZADOS
+# =============================================================================
+class FragmentCacheTests(APITestCase):
+    """Representações de profissionais em cache por (serializer, id, updated_at)."""
+
+    def setUp(self):
+        FragmentCache().reset()
+        cache.clear()
+        self.user = User.objects.create_user(username="fragment", password="pass")
+        refresh = RefreshToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {refresh.access_token}")
+        self.profissional = Profissional.objects.create(
+            nome_social="Dr. Fragmento",
+            profissao="Medicina",
+            endereco="Rua Fragmento, 1",
+            contato="fragmento@email.com",
+        )
+        self.detail = reverse("profissional-detail", args=[self.profissional.pk])
+
+    def _get(self, url, params=None):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.json()
+
+    def test_detalhe_repetido_vem_do_lru_do_worker(self):
+        first = self._get(self.detail)
+        second = self._get(self.detail)
+
+        self.assertEqual(first, second)
+        stats = FragmentCache().stats()
+        self.assertEqual(stats["misses"], 1)
+        self.assertEqual(stats["local_hits"], 1)
+
+    def test_escrita_gera_chave_nova(self):
+        self._get(self.detail)
+        response = self.client.patch(
+            self.detail, {"profissao": "Odontologia"}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.assertEqual(self._get(self.detail)["profissao"], "Odontologia")
+
+    def test_outro_worker_usa_o_cache_compartilhado(self):
+        first = self._get(self.detail)
+        FragmentCache().reset()  # Outro worker: LRU vazio
+
+        self.assertEqual(self._get(self.detail), first)
+        self.assertEqual(FragmentCache().stats()["shared_hits"], 1)
+
+    def test_contagem_de_consultas_fica_fora_do_fragmento(self):
+        url = reverse("profissional-list")
+        self.assertEqual(self._get(url)["results"][0]["total_consultas"], 0)
+
+        Consulta.objects.create(
+            data=timezone.now() + timedelta(days=1), profissional=self.profissional
+        )
+
+        row = self._get(url)["results"][0]
+        self.assertEqual(row["total_consultas"], 1)
+        self.assertEqual(FragmentCache().stats()["local_hits"], 1)
+
+    def test_consultas_expandidas_reusam_o_fragmento(self):
+        for days in (1, 2, 3):
+            Consulta.objects.create(
+                data=timezone.now() + timedelta(days=days),
+                profissional=self.profissional,
+            )
+        body = self._get(reverse("consulta-list"), {"expand": "profissional"})
+
+        nested = [row["profissional_detail"] for row in body["results"]]
+        self.assertEqual(nested[0], self._get(self.detail))
+        self.assertEqual(FragmentCache().stats()["local_hits"], 1)
+
+    def test_variantes_de_campos_nao_se_misturam(self):
+        self._get(self.detail)
+
+        body = self._get(self.detail, {"fields": "id,nome_social"})
+
+        self.assertEqual(list(body), ["id", "nome_social"])
+        self.assertEqual(FragmentCache().stats()["misses"], 2)
+
+    @override_settings(FRAGMENT_CACHE_ENABLED=False)
+    def test_desligado(self):
+        self._get(self.detail)
+        self._get(self.detail)
+
+        stats = FragmentCache().stats()
+        self.assertEqual(stats["local_hits"] + stats["misses"], 0)
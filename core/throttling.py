@@ -0,0 +1,177 @@
+"""
+Throttling por janela deslizante com contadores no cache do Django.
+
+Decisão técnica: Os throttles padrão do DRF guardam no cache a lista de
+timestamps de cada cliente e a serializam de novo a cada requisição. Este
+módulo troca o histórico por contadores de janela fixa (um inteiro por
+chave e janela) e estima a janela deslizante ponderando a janela anterior:
+
+    estimativa = anterior * (1 - fração decorrida da janela atual) + atual
+
+Cada requisição faz um único `incr` no cache, sem escrita no banco. Com um
+backend compartilhado (CACHE_REDIS_URL, obrigatório em produção) o limite
+vale para todos os workers; com o LocMemCache de desenvolvimento, cada
+worker conta separadamente. A
+contagem da janela anterior não muda mais depois que ela fecha e fica em
+um cache local do worker. As chaves expiram sozinhas depois de duas
+janelas.
+
+Custo por endpoint: views definem `throttle_cost` (padrão 1) ou
+`throttle_costs` por action, para que listagens filtradas consumam mais
+do orçamento que um detalhe. Requisições rejeitadas não consomem: o
+incremento é desfeito quando passa do limite.
+"""
+
+import threading
+from collections import OrderedDict
+
+from django.core.cache import cache
+from rest_framework.throttling import (
+    AnonRateThrottle,
+    ScopedRateThrottle,
+    UserRateThrottle,
+)
+
+from core.middleware.metrics_middleware import MetricsCollector
+
+_KEY_PREFIX = "throttle_window"
+
+
+def get_throttle_cost(view):
+    """Custo da requisição: `throttle_costs[action]` ou `throttle_cost`."""
+    default = getattr(view, "throttle_cost", 1)
+    costs = getattr(view, "throttle_costs", None) or {}
+    return costs.get(getattr(view, "action", None), default)
+
+
+class ThrottleCounterStore:
+    """
+    Contadores de janela fixa no cache do Django.
+
+    Uso:
+        allowed, estimate = ThrottleCounterStore().hit(
+            "user_1", 3600, cost=1, limit=200, now=now
+        )
+    """
+
+    _instance = None
+    _lock = threading.Lock()
+
+    # Contagens de janelas já fechadas guardadas localmente
+    MAX_CLOSED_WINDOWS = 10000
+
+    def __new__(cls):
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = super().__new__(cls)
+                    cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self):
+        if self._initialized:
+            return
+        self._initialized = True
+        self._closed_windows = OrderedDict()
+        self._data_lock = threading.Lock()
+
+    def hit(self, key, duration, cost, limit, now):
+        """
+        Soma `cost` à janela atual se a estimativa da janela deslizante
+        continuar dentro de `limit`. Retorna (permitida, estimativa).
+        """
+        window_start = int(now // duration) * duration
+        cache_key = self.cache_key(key, window_start)
+        current = self._increment(cache_key, cost, timeout=2 * duration)
+        previous = self._closed_count(key, window_start - duration)
+        elapsed = (now - window_start) / duration
+        estimate = previous * (1 - elapsed) + current
+        if estimate <= limit:
+            return True, estimate
+        # Rejeitada: não consome o orçamento
+        cache.decr(cache_key, cost)
+        return False, estimate - cost
+
+    @staticmethod
+    def cache_key(key, window_start):
+        return f"{_KEY_PREFIX}:{key}:{window_start}"
+
+    def reset(self):
+        """Descarta as contagens locais (útil para testes)."""
+        with self._data_lock:
+            self._closed_windows.clear()
+
+    def _increment(self, cache_key, cost, timeout):
+        try:
+            return cache.incr(cache_key, cost)
+        except ValueError:
+            # Primeira requisição da janela (ou chave expirada)
+            if cache.add(cache_key, cost, timeout):
+                return cost
+            return cache.incr(cache_key, cost)
+
+    def _closed_count(self, key, window_start):
+        local_key = (key, window_start)
+        with self._data_lock:
+            if local_key in self._closed_windows:
+                self._closed_windows.move_to_end(local_key)
+                return self._closed_windows[local_key]
+
+        count = cache.get(self.cache_key(key, window_start), 0)
+        with self._data_lock:
+            self._closed_windows[local_key] = count
+            while len(self._closed_windows) > self.MAX_CLOSED_WINDOWS:
+                self._closed_windows.popitem(last=False)
+        return count
+
+
+class SlidingWindowThrottleMixin:
+    """
+    Substitui o histórico em cache do SimpleRateThrottle pelos contadores
+    de janela; a chave e o escopo continuam vindo da classe do DRF.
+    """
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        self.now = self.timer()
+        allowed, self.estimate = ThrottleCounterStore().hit(
+            self.key,
+            self.duration,
+            get_throttle_cost(view),
+            self.num_requests,
+            self.now,
+        )
+        MetricsCollector().record_throttle(self.scope, allowed)
+        return allowed
+
+    def wait(self):
+        """Segundos até a janela atual fechar (limite superior da espera)."""
+        return self.duration - (self.now % self.duration)
+
+
+class SlidingWindowAnonThrottle(SlidingWindowThrottleMixin, AnonRateThrottle):
+    """Limite por IP para requisições anônimas (escopo `anon`)."""
+
+
+class SlidingWindowUserThrottle(SlidingWindowThrottleMixin, UserRateThrottle):
+    """Limite por usuário autenticado (escopo `user`)."""
+
+
+class SlidingWindowScopedThrottle(SlidingWindowThrottleMixin, ScopedRateThrottle):
+    """Limite por endpoint, para views com `throttle_scope`."""
+
+    def allow_request(self, request, view):
+        # Como no ScopedRateThrottle, a taxa só é conhecida com a view
+        self.scope = getattr(view, self.scope_attr, None)
+        if not self.scope:
+            return True
+
+        self.rate = self.get_rate()
+        self.num_requests, self.duration = self.parse_rate(self.rate)
+        return super().allow_request(request, view)
@@ -0,0 +1,366 @@
+"""
+Tracing in-process leve com exportação em arquivo local.
+
+Decisão técnica: O Correlation ID identifica a requisição, mas não mostra
+onde o tempo é gasto dentro dela. Este módulo oferece uma API mínima de
+spans (context manager `span()` e decorator `traced()`), sem dependência
+do SDK do OpenTelemetry, e exporta os spans finalizados em lotes para um
+arquivo JSONL no formato OTLP/JSON (uma `ExportTraceServiceRequest` por
+linha), o mesmo formato do file exporter do OpenTelemetry Collector.
+
+Amostragem head-based: a decisão é tomada uma vez no início do trace
+(TRACING_SAMPLE_RATE). Em traces não amostrados, `span()` não cria objetos
+nem lê o relógio, mantendo o overhead desprezível.
+
+O trace e o span atual vivem em ContextVars, então spans abertos em
+`sync_to_async`, tasks asyncio ou executores (via core.utils.context)
+ficam corretamente aninhados no trace da requisição.
+
+Uso:
+    from core.tracing import span, traced
+
+    with span("consulta.validar", consulta_id=consulta.id):
+        ...
+
+    @traced()
+    def agendar_consulta(data):
+        ...
+"""
+
+import atexit
+import functools
+import json
+import logging
+import os
+import random
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+
+from django.conf import settings
+
+try:
+    import fcntl
+except ImportError:  # Windows: sem lock entre processos
+    fcntl = None
+
+logger = logging.getLogger("core.middleware")
+
+# Trace id da requisição atual (None quando o trace não é amostrado)
+_trace_id = ContextVar("trace_id", default=None)
+# Span aberto mais interno no contexto atual
+_current_span = ContextVar("current_span", default=None)
+
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_SERVER = 2
+SPAN_KIND_CLIENT = 3
+
+STATUS_UNSET = 0
+STATUS_ERROR = 2
+
+
+class Span:
+    """Span finalizado ou em andamento, serializável em OTLP/JSON."""
+
+    __slots__ = (
+        "name",
+        "trace_id",
+        "span_id",
+        "parent_span_id",
+        "kind",
+        "start_ns",
+        "end_ns",
+        "attributes",
+        "status_code",
+        "status_message",
+    )
+
+    def __init__(self, name, trace_id, parent_span_id, kind, attributes):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_span_id = parent_span_id
+        self.kind = kind
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.attributes = dict(attributes)
+        self.status_code = STATUS_UNSET
+        self.status_message = ""
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def record_error(self, exc):
+        self.status_code = STATUS_ERROR
+        self.status_message = f"{type(exc).__name__}: {exc}"[:500]
+
+    def to_otlp(self):
+        data = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [
+                {"key": key, "value": _otlp_value(value)}
+                for key, value in self.attributes.items()
+                if value is not None
+            ],
+            "status": {"code": self.status_code},
+        }
+        if self.parent_span_id:
+            data["parentSpanId"] = self.parent_span_id
+        if self.status_message:
+            data["status"]["message"] = self.status_message
+        return data
+
+
+def _otlp_value(value):
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class BatchFileSpanExporter:
+    """
+    Exportador que acumula spans e grava em lote no arquivo JSONL.
+
+    O lote é gravado quando atinge TRACING_BATCH_SIZE spans ou quando o
+    span mais antigo do buffer passa de TRACING_FLUSH_INTERVAL_SECONDS; o
+    prazo é cumprido por uma thread daemon do processo, mesmo sem novos
+    spans. O arquivo é rotacionado (um backup `.1`) ao atingir
+    TRACING_MAX_FILE_MB. Os workers do gunicorn escrevem no mesmo arquivo,
+    então escrita e rotação acontecem sob um `flock` em `<arquivo>.lock`
+    (como no ConcurrentRotatingFileHandler de core.log_handlers).
+    """
+
+    _instance = None
+    _lock = threading.Lock()
+
+    def __new__(cls):
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = super().__new__(cls)
+                    cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self):
+        if self._initialized:
+            return
+        self._initialized = True
+        self._buffer = []
+        self._oldest = None
+        self._buffer_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._pending = threading.Event()
+        self._flusher_pid = None
+        atexit.register(self.flush)
+
+    def export(self, finished_span):
+        batch_size = getattr(settings, "TRACING_BATCH_SIZE", 512)
+        interval = getattr(settings, "TRACING_FLUSH_INTERVAL_SECONDS", 5)
+        self._ensure_flusher()
+
+        with self._buffer_lock:
+            if not self._buffer:
+                self._oldest = time.monotonic()
+                self._pending.set()
+            self._buffer.append(finished_span)
+            should_flush = (
+                len(self._buffer) >= batch_size
+                or time.monotonic() - self._oldest >= interval
+            )
+        if should_flush:
+            self.flush()
+
+    def flush(self):
+        with self._buffer_lock:
+            batch, self._buffer = self._buffer, []
+            self._oldest = None
+            self._pending.clear()
+        if not batch:
+            return
+
+        line = json.dumps(_export_request(batch), separators=(",", ":"))
+        path = Path(settings.TRACING_EXPORT_PATH)
+        with self._write_lock:
+            try:
+                with open(f"{path}.lock", "a") as lock_file:
+                    if fcntl is not None:
+                        fcntl.flock(lock_file, fcntl.LOCK_EX)
+                    self._rotate_if_needed(path)
+                    with open(path, "a", encoding="utf-8") as export_file:
+                        export_file.write(line + "\n")
+            except OSError:
+                logger.exception("Falha ao exportar %d spans", len(batch))
+
+    def _ensure_flusher(self):
+        # Uma thread por processo: a do master não sobrevive ao fork do gunicorn
+        pid = os.getpid()
+        if self._flusher_pid == pid:
+            return
+        with self._lock:
+            if self._flusher_pid == pid:
+                return
+            self._pending = threading.Event()
+            threading.Thread(
+                target=self._flush_periodically, name="span-exporter", daemon=True
+            ).start()
+            self._flusher_pid = pid
+
+    def _flush_periodically(self):
+        pending = self._pending
+        while True:
+            pending.wait()
+            with self._buffer_lock:
+                oldest = self._oldest
+            if oldest is not None:
+                interval = getattr(settings, "TRACING_FLUSH_INTERVAL_SECONDS", 5)
+                delay = oldest + interval - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+            self.flush()
+
+    def _rotate_if_needed(self, path):
+        max_bytes = getattr(settings, "TRACING_MAX_FILE_MB", 50) * 1024 * 1024
+        try:
+            if path.stat().st_size < max_bytes:
+                return
+        except FileNotFoundError:
+            return
+        os.replace(path, path.with_name(path.name + ".1"))
+
+
+def _export_request(batch):
+    """Agrupa spans no envelope OTLP `ExportTraceServiceRequest`."""
+    return {
+        "resourceSpans": [
+            {
+                "resource": {
+                    "attributes": [
+                        {
+                            "key": "service.name",
+                            "value": {
+                                "stringValue": getattr(
+                                    settings, "TRACING_SERVICE_NAME", "lacrei-saude-api"
+                                )
+                            },
+                        }
+                    ]
+                },
+                "scopeSpans": [
+                    {
+                        "scope": {"name": "core.tracing"},
+                        "spans": [finished.to_otlp() for finished in batch],
+                    }
+                ],
+            }
+        ]
+    }
+
+
+def start_trace(correlation_id=None):
+    """
+    Inicia o trace da requisição atual e decide a amostragem (head-based).
+
+    O trace id é derivado do Correlation ID quando ele é um UUID, para que
+    logs e traces possam ser cruzados pelo mesmo identificador.
+    """
+    sample_rate = getattr(settings, "TRACING_SAMPLE_RATE", 0.0)
+    sampled = sample_rate > 0 and random.random() < sample_rate
+    _trace_id.set(_trace_id_from(correlation_id) if sampled else None)
+    _current_span.set(None)
+    return sampled
+
+
+def end_trace():
+    """Encerra o trace da requisição atual."""
+    _trace_id.set(None)
+    _current_span.set(None)
+
+
+def is_sampled():
+    return _trace_id.get() is not None
+
+
+def _trace_id_from(correlation_id):
+    try:
+        return uuid.UUID(str(correlation_id)).hex
+    except ValueError:
+        return uuid.uuid4().hex
+
+
+@contextmanager
+def span(name, kind=SPAN_KIND_INTERNAL, **attributes):
+    """
+    Abre um span filho do span atual.
+
+    Fora de um trace amostrado, é um no-op e produz `None`.
+    """
+    trace_id = _trace_id.get()
+    if trace_id is None:
+        yield None
+        return
+
+    parent = _current_span.get()
+    parent_id = parent.span_id if parent is not None else None
+    current = Span(name, trace_id, parent_id, kind, attributes)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as exc:
+        current.record_error(exc)
+        raise
+    finally:
+        current.end_ns = time.time_ns()
+        _current_span.reset(token)
+        BatchFileSpanExporter().export(current)
+
+
+def traced(name=None, **attributes):
+    """Decorator que executa a função dentro de um span."""
+
+    def decorator(func):
+        span_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not is_sampled():
+                return func(*args, **kwargs)
+            with span(span_name, **attributes):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def trace_db_query(execute, sql, params, many, context):
+    """
+    Execute wrapper que registra cada query SQL como span cliente.
+
+    Fica instalado permanentemente nas conexões (core.utils.db), então o
+    caminho sem trace amostrado precisa ser o mais curto possível.
+    """
+    if _trace_id.get() is None:
+        return execute(sql, params, many, context)
+    connection = context["connection"]
+    with span(
+        "db.query",
+        kind=SPAN_KIND_CLIENT,
+        **{
+            "db.system": connection.vendor,
+            "db.name": connection.alias,
+            "db.statement": sql[:1000],
+        },
+    ):
+        return execute(sql, params, many, context)
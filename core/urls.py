@@ -28,6 +28,7 @@ from core.views import (
     LivenessCheckView,
     MetricsView,
     ReadinessCheckView,
+    TokenRevokeView,
 )
 
 urlpatterns = [
@@ -54,6 +55,11 @@ urlpatterns = [
         TokenVerifyView.as_view(),
         name="token_verify",
     ),
+    path(
+        "api/auth/token/revoke/",
+        TokenRevokeView.as_view(),
+        name="token_revoke",
+    ),
     # API Documentation - Swagger / Redoc
     path("api/schema/", SpectacularAPIView.as_view(), name="schema"),
     path(
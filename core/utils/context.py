@@ -0,0 +1,58 @@
+"""
+Propagação do contexto da requisição para threads, executores e tasks.
+
+Decisão técnica: Estado por requisição (Correlation ID, trace atual) vive em
+ContextVars. `sync_to_async`, `async_to_sync` e `asyncio.create_task` já
+copiam o contexto, mas `ThreadPoolExecutor.submit`, `loop.run_in_executor`
+e `threading.Thread` não: o código nessas threads veria o contexto vazio
+(ou o de outra requisição). Estes helpers capturam uma cópia do contexto no
+momento do agendamento e executam a função dentro dela.
+
+Uso:
+    from core.utils.context import submit_with_context
+
+    future = submit_with_context(executor, enviar_notificacao, consulta.id)
+"""
+
+import contextvars
+import functools
+import threading
+
+
+def bind_context(func):
+    """
+    Retorna `func` amarrada a uma cópia do contexto atual.
+
+    Cada chamada roda em uma nova cópia desse contexto, então alterações
+    feitas pela função não vazam entre chamadas nem para o chamador.
+    """
+    context = contextvars.copy_context()
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        return context.copy().run(func, *args, **kwargs)
+
+    return wrapper
+
+
+def submit_with_context(executor, func, *args, **kwargs):
+    """`executor.submit` preservando o contexto (Correlation ID, trace)."""
+    return executor.submit(bind_context(func), *args, **kwargs)
+
+
+def run_in_executor_with_context(loop, executor, func, *args):
+    """`loop.run_in_executor` preservando o contexto."""
+    return loop.run_in_executor(executor, bind_context(func), *args)
+
+
+def start_thread_with_context(target, *args, name=None, daemon=True, **kwargs):
+    """Inicia uma thread de background que herda o contexto atual."""
+    thread = threading.Thread(
+        target=bind_context(target),
+        args=args,
+        kwargs=kwargs,
+        name=name,
+        daemon=daemon,
+    )
+    thread.start()
+    return thread
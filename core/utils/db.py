@@ -0,0 +1,47 @@
+"""
+Registro de execute wrappers persistentes nas conexões do Django.
+
+Decisão técnica: `with connection.execute_wrapper(...)` instala o wrapper
+apenas na conexão da thread atual. Sob ASGI, o ORM roda em threads de
+`sync_to_async`, diferentes da thread que executa o middleware async, e o
+wrapper nunca seria chamado. Por isso os wrappers de instrumentação são
+instalados de forma permanente em todas as conexões (na criação, via signal
+`connection_created`) e leem o estado da requisição atual de ContextVars,
+que o asgiref propaga para essas threads.
+"""
+
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+_registered_wrappers = []
+
+
+def register_execute_wrapper(wrapper):
+    """
+    Registra um wrapper para todas as conexões, atuais e futuras.
+
+    O wrapper deve ser barato quando não há requisição instrumentada
+    (ex: ContextVar vazia), pois roda em todas as queries do processo.
+    """
+    if wrapper not in _registered_wrappers:
+        _registered_wrappers.append(wrapper)
+    ensure_execute_wrappers()
+
+
+def ensure_execute_wrappers():
+    """Instala os wrappers registrados nas conexões já abertas nesta thread."""
+    for connection in connections.all(initialized_only=True):
+        _install(connection)
+
+
+def _install(connection):
+    for wrapper in _registered_wrappers:
+        if wrapper not in connection.execute_wrappers:
+            connection.execute_wrappers.append(wrapper)
+
+
+def _on_connection_created(sender, connection, **kwargs):
+    _install(connection)
+
+
+connection_created.connect(_on_connection_created)
@@ -0,0 +1,65 @@
+"""
+Medição de fases de uma requisição (Server-Timing).
+
+Decisão técnica: Um único objeto `RequestTimings` por requisição é criado
+pelo RequestLoggingMiddleware e reaproveitado pelo MetricsMiddleware, em vez
+de cada camada medir o próprio tempo. Os pontos instrumentados (autenticação,
+serialização, renderização) só registram a duração da sua fase nesse objeto;
+o tempo de banco vem da instrumentação de SQL (request.query_stats).
+"""
+
+import time
+from contextlib import contextmanager
+
+
+class RequestTimings:
+    """Acumula a duração (em segundos) de cada fase de uma requisição."""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.phases = {}
+
+    def elapsed(self):
+        """Tempo total decorrido desde o início da requisição."""
+        return time.perf_counter() - self.start
+
+    def add(self, name, duration):
+        self.phases[name] = self.phases.get(name, 0.0) + duration
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def header_value(self, total, query_stats=None):
+        """Monta o valor do header `Server-Timing`."""
+        entries = [
+            f"{name};dur={duration * 1000:.2f}"
+            for name, duration in self.phases.items()
+        ]
+        if query_stats is not None:
+            entries.append(
+                f"db;dur={query_stats.duration * 1000:.2f};"
+                f'desc="{query_stats.count} queries"'
+            )
+        entries.append(f"total;dur={total * 1000:.2f}")
+        return ", ".join(entries)
+
+
+@contextmanager
+def timed_phase(request, name):
+    """
+    Mede uma fase da requisição, se ela estiver sendo cronometrada.
+
+    Aceita tanto o HttpRequest do Django quanto o Request do DRF
+    (que delega atributos desconhecidos para o HttpRequest).
+    """
+    timings = getattr(request, "timings", None) if request is not None else None
+    if timings is None:
+        yield
+        return
+    with timings.phase(name):
+        yield
@@ -4,11 +4,16 @@ Health check e métricas views para monitoramento e observabilidade.
 Decisão técnica: Separar endpoints de health check (liveness/readiness)
 e métricas para melhor integração com orquestradores (K8s, ECS) e
 ferramentas de monitoramento.
+
+Inclui também a revogação de tokens (logout), que pertence à
+infraestrutura de autenticação do core e não a um app de domínio.
 """
 
 import platform
 import time
 
+from drf_spectacular.utils import extend_schema
+
 from django.conf import settings
 from django.db import connection
 from rest_framework import status
@@ -16,6 +21,14 @@ from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from core.authentication import OptionalJWTAuthentication, token_cache_stats
+from core.business_metrics import BusinessMetricsSnapshot
+from core.db_pool import pool_stats
+from core.fragment_cache import fragment_cache_stats
+from core.log_handlers import pipeline_stats
+from core.revocation import RevocationFilter, revocation_stats
+from core.serializers import TokenRevokeSerializer
+
 
 class HealthCheckView(APIView):
     """
@@ -26,10 +39,19 @@ class HealthCheckView(APIView):
     - Readiness: A aplicação está pronta para receber tráfego? (banco OK)
 
     Usado pelo AWS ALB/ECS para Blue/Green deploy e auto-healing.
+
+    Apenas a checagem de conectividade/latência do banco é síncrona.
+    As métricas de negócio vêm de um snapshot com TTL, recalculado em
+    background (ver core.business_metrics), e `metrics_age_seconds`
+    informa a idade desse snapshot.
     """
 
     permission_classes = [AllowAny]
     authentication_classes = []
+    # Probes e métricas ficam fora do throttling (sem escrita de contadores)
+    throttle_classes = []
+    # Só o SELECT 1 (métricas de negócio vêm do snapshot)
+    query_budget = 1
 
     def get(self, request):
         health = {
@@ -47,34 +69,12 @@ class HealthCheckView(APIView):
         }
 
         try:
-            # Verifica conexão e latência do banco
+            # Verifica conexão e latência do banco (única checagem síncrona)
             db_start = time.time()
             with connection.cursor() as cursor:
                 cursor.execute("SELECT 1")
             db_latency = (time.time() - db_start) * 1000
             health["checks"]["database"]["latency_ms"] = round(db_latency, 2)
-
-            # Contagem para métricas de negócio
-            from apps.consultas.models import Consulta
-            from apps.profissionais.models import Profissional
-
-            health["metrics"] = {
-                "total_profissionais": Profissional.objects.count(),
-                "total_consultas": Consulta.objects.count(),
-                "consultas_futuras": (
-                    Consulta.objects.filter(data__gte=time.time()).count()
-                    if False
-                    else None
-                ),  # Placeholder para query futura
-            }
-
-            # Métricas de consultas futuras usando timezone
-            from django.utils import timezone
-
-            health["metrics"]["consultas_futuras"] = Consulta.objects.filter(
-                data__gte=timezone.now()
-            ).count()
-
         except Exception as e:
             health["status"] = "unhealthy"
             health["checks"]["database"] = {
@@ -83,6 +83,11 @@ class HealthCheckView(APIView):
             }
             return Response(health, status=status.HTTP_503_SERVICE_UNAVAILABLE)
 
+        # Métricas de negócio vêm do snapshot em cache (refresh em background)
+        metrics, age_seconds = BusinessMetricsSnapshot().get()
+        health["metrics"] = metrics
+        health["metrics_age_seconds"] = age_seconds
+
         return Response(health, status=status.HTTP_200_OK)
 
 
@@ -92,16 +97,22 @@ class ReadinessCheckView(APIView):
 
     Retorna 200 se o banco está acessível, 503 caso contrário.
     Sem payload pesado - otimizado para alta frequência de polling.
+    Inclui as estatísticas de conexão do worker (pool ou persistentes).
     """
 
     permission_classes = [AllowAny]
     authentication_classes = []
+    throttle_classes = []
+    query_budget = 1
 
     def get(self, request):
         try:
             with connection.cursor() as cursor:
                 cursor.execute("SELECT 1")
-            return Response({"ready": True}, status=status.HTTP_200_OK)
+            return Response(
+                {"ready": True, "database_pool": pool_stats()["default"]},
+                status=status.HTTP_200_OK,
+            )
         except Exception:
             return Response(
                 {"ready": False}, status=status.HTTP_503_SERVICE_UNAVAILABLE
@@ -118,6 +129,8 @@ class LivenessCheckView(APIView):
 
     permission_classes = [AllowAny]
     authentication_classes = []
+    throttle_classes = []
+    query_budget = 0
 
     def get(self, request):
         return Response({"alive": True}, status=status.HTTP_200_OK)
@@ -138,6 +151,8 @@ class MetricsView(APIView):
 
     permission_classes = [AllowAny]
     authentication_classes = []
+    throttle_classes = []
+    query_budget = 0
 
     def get(self, request):
         try:
@@ -146,19 +161,25 @@ class MetricsView(APIView):
             collector = MetricsCollector()
             metrics = collector.get_metrics()
 
-            # Adicionar métricas de negócio
-            from django.utils import timezone
+            # Adicionar métricas de negócio (snapshot em cache)
+            business, age_seconds = BusinessMetricsSnapshot().get()
+            metrics["business"] = business
+            metrics["business_age_seconds"] = age_seconds
 
-            from apps.consultas.models import Consulta
-            from apps.profissionais.models import Profissional
+            # Conexões com o banco deste worker (pool ou persistentes)
+            metrics["database_pool"] = pool_stats()
 
-            metrics["business"] = {
-                "total_profissionais": Profissional.objects.count(),
-                "total_consultas": Consulta.objects.count(),
-                "consultas_futuras": Consulta.objects.filter(
-                    data__gte=timezone.now()
-                ).count(),
-            }
+            # Fila do pipeline de logging (None no modo síncrono)
+            metrics["logging"] = pipeline_stats()
+
+            # Cache de tokens JWT verificados deste worker
+            metrics["auth_cache"] = token_cache_stats()
+
+            # Bloom filter de tokens revogados deste worker
+            metrics["token_revocation"] = revocation_stats()
+
+            # Cache de fragmentos serializados deste worker
+            metrics["fragment_cache"] = fragment_cache_stats()
 
             return Response(metrics, status=status.HTTP_200_OK)
         except Exception as e:
@@ -166,3 +187,34 @@ class MetricsView(APIView):
                 {"error": str(e)},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR,
             )
+
+
+class TokenRevokeView(APIView):
+    """
+    Revoga um refresh token (logout).
+
+    Quem tem o refresh token pode revogá-lo, então o endpoint não exige
+    autenticação; se a requisição vier com um access token válido, ele
+    também é revogado. Um access token já expirado ou revogado não impede
+    a revogação do refresh token.
+    """
+
+    permission_classes = [AllowAny]
+    authentication_classes = [OptionalJWTAuthentication]
+
+    @extend_schema(
+        summary="Revogar token",
+        description="Revoga o refresh token informado e o access token da requisição.",
+        request=TokenRevokeSerializer,
+        responses={204: None},
+        tags=["Autenticação"],
+    )
+    def post(self, request):
+        serializer = TokenRevokeSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        revocation = RevocationFilter()
+        revocation.revoke_token(serializer.validated_data["refresh"])
+        if request.auth is not None:
+            revocation.revoke_token(request.auth)
+        return Response(status=status.HTTP_204_NO_CONTENT)
@@ -0,0 +1,36 @@
+"""
+Configuração do gunicorn (carregada automaticamente de ./gunicorn.conf.py).
+
+Decisão técnica: Workers e threads vêm das mesmas variáveis de ambiente que
+core.settings.base usa para dimensionar o pool de conexões
+(DB_POOL_MAX_SIZE = GUNICORN_THREADS + 1): mudar o número de threads ajusta
+o servidor e o pool juntos. Com mais de uma thread, o gunicorn usa o worker
+gthread.
+
+Cada worker constrói o filtro de revogação de tokens ao iniciar
+(post_worker_init), antes da primeira requisição.
+"""
+
+from decouple import config
+
+bind = config("GUNICORN_BIND", default="0.0.0.0:8000")
+workers = config("GUNICORN_WORKERS", default=3, cast=int)
+threads = config("GUNICORN_THREADS", default=1, cast=int)
+# Os deadlines por requisição (DEADLINE_DEFAULT_SECONDS) ficam abaixo deste valor
+timeout = 120
+accesslog = "-"
+errorlog = "-"
+
+
+def post_worker_init(worker):
+    from django.conf import settings
+
+    from core.revocation import RevocationFilter
+
+    if not settings.TOKEN_REVOCATION_ENABLED:
+        return
+    try:
+        RevocationFilter().start()
+    except Exception:
+        # Banco indisponível: a primeira validação tenta de novo
+        worker.log.exception("Falha ao construir o filtro de revogação")
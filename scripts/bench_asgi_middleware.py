@@ -0,0 +1,179 @@
+"""
+Benchmark de throughput ASGI da pilha de middlewares de observabilidade.
+
+Compara a pilha atual (middlewares sync + async) com a mesma pilha forçada
+a sync-only, cenário em que o Django adapta cada middleware com
+`sync_to_async`/`async_to_sync` (uma troca de thread por middleware em cada
+requisição).
+
+As requisições são enviadas diretamente ao ASGIHandler, sem servidor nem
+rede, para isolar o custo da pilha. Usa SQLite em memória, como o
+script de migrações.
+
+Leitura do resultado: o Django decide o modo de cada middleware pelo modo
+do handler interno. Com views síncronas (todas as views DRF atuais), os
+middlewares do Django baseados em MiddlewareMixin (Session, Csrf, Auth,
+...) também entram em modo async e executam process_request/process_response
+via `sync_to_async`, o que pode custar mais do que a única adaptação da
+pilha sync-only. O ganho aparece com views async e middlewares nativamente
+async; em WSGI (gunicorn, produção) o caminho síncrono não muda.
+
+Uso:
+    python scripts/bench_asgi_middleware.py [--requests 2000] [--concurrency 4]
+
+Na pilha sync-only cada requisição em andamento prende threads do executor
+padrão do asyncio (min(32, CPUs + 4)); concorrência acima desse limite pode
+travar esse cenário, por isso o padrão é conservador.
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import sys
+import time
+import warnings
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings.base")
+
+import django  # noqa: E402
+
+from core.settings import base  # noqa: E402
+
+base.DATABASES = {
+    "default": {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": ":memory:",
+    }
+}
+base.ALLOWED_HOSTS = ["*"]
+# Throttling de anônimos devolveria 429 no meio da medição
+base.REST_FRAMEWORK = {**base.REST_FRAMEWORK, "DEFAULT_THROTTLE_CLASSES": []}
+
+django.setup()
+
+from django.core.handlers.asgi import ASGIHandler  # noqa: E402
+
+from core.middleware.correlation_middleware import (  # noqa: E402
+    CorrelationIdMiddleware,
+)
+from core.middleware.logging_middleware import RequestLoggingMiddleware  # noqa: E402
+from core.middleware.metrics_middleware import MetricsMiddleware  # noqa: E402
+from core.middleware.profiling_middleware import ProfilingMiddleware  # noqa: E402
+from core.middleware.query_middleware import (  # noqa: E402
+    QueryInstrumentationMiddleware,
+)
+from core.middleware.tracing_middleware import TracingMiddleware  # noqa: E402
+
+CUSTOM_MIDDLEWARE = [
+    CorrelationIdMiddleware,
+    ProfilingMiddleware,
+    TracingMiddleware,
+    QueryInstrumentationMiddleware,
+    RequestLoggingMiddleware,
+    MetricsMiddleware,
+]
+
+PATH = "/api/health/live/"
+
+
+def _scope():
+    return {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": PATH,
+        "raw_path": PATH.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"host", b"localhost")],
+        "client": ("127.0.0.1", 50000),
+        "server": ("localhost", 80),
+    }
+
+
+async def _request(app):
+    sent = []
+    messages = [{"type": "http.request", "body": b"", "more_body": False}]
+    finished = asyncio.Event()
+
+    async def receive():
+        if messages:
+            return messages.pop()
+        # Depois do corpo, o Django só espera por http.disconnect
+        await finished.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    start = time.perf_counter()
+    await app(_scope(), receive, send)
+    elapsed = time.perf_counter() - start
+    finished.set()
+    assert sent[0]["status"] == 200, sent[0]
+    return elapsed
+
+
+async def _run(app, total, concurrency):
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def worker():
+        async with semaphore:
+            latencies.append(await _request(app))
+
+    # Aquecimento (carga de URLconf, views, conexões)
+    await asyncio.gather(*(_request(app) for _ in range(concurrency)))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(total)))
+    wall = time.perf_counter() - start
+    return wall, sorted(latencies)
+
+
+def _build_app(async_capable):
+    for middleware_class in CUSTOM_MIDDLEWARE:
+        middleware_class.async_capable = async_capable
+    # load_middleware() lê os atributos no momento da construção
+    return ASGIHandler()
+
+
+def _report(label, wall, latencies):
+    total = len(latencies)
+    print(
+        f"{label:<12} {total / wall:>10.1f} req/s | "
+        f"p50 {statistics.median(latencies) * 1000:>7.2f}ms | "
+        f"p99 {latencies[int(total * 0.99) - 1] * 1000:>7.2f}ms"
+    )
+    return total / wall
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=4)
+    args = parser.parse_args()
+
+    # O log de acesso não deve dominar a medição
+    logging.disable(logging.CRITICAL)
+    # STATIC_ROOT não existe fora do build da imagem
+    warnings.filterwarnings("ignore", message="No directory at")
+
+    results = {}
+    for label, async_capable in (("sync-only", False), ("sync+async", True)):
+        app = _build_app(async_capable)
+        wall, latencies = asyncio.run(_run(app, args.requests, args.concurrency))
+        results[label] = _report(label, wall, latencies)
+
+    gain = (results["sync+async"] / results["sync-only"] - 1) * 100
+    print(f"\nGanho de throughput: {gain:+.1f}%")
+
+
+if __name__ == "__main__":
+    main()
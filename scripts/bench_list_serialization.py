@@ -0,0 +1,114 @@
+"""
+Benchmark da listagem de consultas: ConsultaListSerializer x `.values()`.
+
+Compara, para cada tamanho de página, o caminho serializado (instâncias de
+Consulta e Profissional via select_related + campos do DRF + property
+`is_future`) com o ConsultaListValuesSerializer (`.values()` com
+`is_future` calculado no SQL). Os dois tempos incluem a query e a montagem
+das linhas, como na view; a renderização JSON é igual nos dois e fica de
+fora. Usa SQLite em memória, como o script de migrações.
+
+Uso:
+    python scripts/bench_list_serialization.py [--rows 2000] [--repeat 20]
+"""
+
+import argparse
+import logging
+import os
+import sys
+import time
+from datetime import timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings.base")
+
+import django  # noqa: E402
+
+from core.settings import base  # noqa: E402
+
+base.DATABASES = {
+    "default": {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": ":memory:",
+    }
+}
+base.DATABASE_ROUTERS = []
+
+django.setup()
+
+from django.core.management import call_command  # noqa: E402
+from django.utils import timezone  # noqa: E402
+
+from apps.consultas.models import Consulta  # noqa: E402
+from apps.consultas.serializers import (  # noqa: E402
+    ConsultaListSerializer,
+    ConsultaListValuesSerializer,
+)
+from apps.consultas.services.consulta_service import ConsultaService  # noqa: E402
+from apps.profissionais.models import Profissional  # noqa: E402
+
+PAGE_SIZES = (20, 50, 100, 200, 500)
+
+
+def _seed(total):
+    profissionais = Profissional.objects.bulk_create(
+        Profissional(
+            nome_social=f"Profissional {i}",
+            profissao="Medicina",
+            endereco=f"Rua Benchmark, {i} - " + "complemento " * 20,
+            contato=f"bench{i}@email.com",
+        )
+        for i in range(50)
+    )
+    now = timezone.now()
+    Consulta.objects.bulk_create(
+        Consulta(
+            data=now + timedelta(hours=i - total // 2),
+            profissional=profissionais[i % len(profissionais)],
+            observacoes=f"Observação da consulta {i}.",
+        )
+        for i in range(total)
+    )
+
+
+def _serializer(page_size):
+    page = ConsultaService.list_consultas()[:page_size]
+    return ConsultaListSerializer(page, many=True).data
+
+
+def _values(page_size):
+    rows = ConsultaListValuesSerializer.values(ConsultaService.list_consultas())
+    return ConsultaListValuesSerializer(rows[:page_size]).data
+
+
+def _rows_per_second(build, page_size, repeat):
+    build(page_size)  # aquecimento
+    start = time.perf_counter()
+    for _ in range(repeat):
+        build(page_size)
+    return page_size * repeat / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    call_command("migrate", verbosity=0)
+    _seed(max(args.rows, max(PAGE_SIZES)))
+
+    print(f"{'página':>7} {'serializer':>14} {'values':>14} {'ganho':>8}")
+    for page_size in PAGE_SIZES:
+        slow = _rows_per_second(_serializer, page_size, args.repeat)
+        fast = _rows_per_second(_values, page_size, args.repeat)
+        print(
+            f"{page_size:>7} {slow:>10.0f} r/s {fast:>10.0f} r/s "
+            f"{fast / slow:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()